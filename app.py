@@ -1,8 +1,5 @@
 import streamlit as st
 from ui.auth import login_page, signup_page, signout_page
-from ui.accounts_view import show_accounts_view
-from ui.balances_view import show_balances_view
-from ui.transactions_view import show_transactions_view
 
 st.set_page_config(
     page_title="Money Magic Lite",
@@ -156,19 +153,42 @@ if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
 
 def main_page():
+    # The views pull in pandas, plotly and the storage layer; importing them
+    # here keeps the login page's cold start down to streamlit and ui.auth
+    # (see benchmarks/import_time.py).
+    from core.loader import load_page
+    from core.prefetch import cancel_prefetch, prefetch_adjacent
+    from core.writeback import flush
+    from ui.accounts_view import show_accounts_view
+    from ui.balances_view import show_balances_view
+    from ui.dev_panel import begin_dev_trace, show_dev_panel
+    from ui.transactions_view import show_transactions_view, month_selection
+
     st.title("MoneyMagic Lite")
     st.caption("Personal Finance Management App - Version 2.0")
     user = st.session_state.user
     if user is not None:
+        trace = begin_dev_trace()
+        # Start every read of this rerun at once; the views pick them up.
+        # The views are fragments: their own reruns reuse this PageData and
+        # so refetch nothing until queued writes land (core.writeback).
+        data = load_page(user["id"], month_selection())
         with st.sidebar:
             st.write(f"Welcome {st.session_state.user['email']}!")
-            show_accounts_view(user)
-            show_balances_view(user)
+            show_accounts_view(user, data)
+            show_balances_view(user, data)
             if st.button("Logout"):
+                cancel_prefetch(user["id"])
+                # Write queued transactions now; failures stay queued
+                flush(user["id"])
                 signout_page()
                 st.rerun()
             st.info("Developed with ❤️ by :green[Pavan Gontina]")
-        show_transactions_view(user)
+        show_transactions_view(user, data)
+        with st.sidebar:
+            show_dev_panel(trace)
+        # The month is on screen; warm its neighbours for the next step
+        prefetch_adjacent(user["id"], month_selection())
 
 
 # Toggle between login and signup pages
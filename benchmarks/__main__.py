@@ -0,0 +1,124 @@
+"""
+Run the benchmark scenarios against a synthetic ledger.
+
+    python -m benchmarks --transactions 100000 --years 3
+    python -m benchmarks --backend sqlite --only fetch_month,bulk_save
+    python -m benchmarks --latency 30 --only rerun_sequential,rerun_concurrent
+
+Results are written as JSON (default: benchmarks/results/<timestamp>.json)
+so runs can be compared over time.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import time
+
+import pandas as pd
+
+from benchmarks.fake_backend import LatencyBackend, MemoryBackend
+from benchmarks.generator import generate_ledger, load_ledger
+from benchmarks.scenarios import SCENARIOS, prepare
+from core.storage import create_backend, set_backend
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def time_scenario(body, setup=None, repeat=5, warmup=1):
+    """
+    Time body() `repeat` times (after `warmup` untimed runs).
+    Returns min/median/mean/max in seconds.
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        body()
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        body()
+        timings.append(time.perf_counter() - started)
+    return {
+        'repeat': repeat,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.fmean(timings),
+        'max': max(timings),
+    }
+
+
+def run(users=1, accounts=8, transactions=10_000, years=2, seed=42,
+        backend="memory", only=None, repeat=5, latency=0.0):
+    """
+    Generate a ledger, load it into the chosen backend and time every
+    (or the selected) scenario. Returns the result document.
+    """
+    ledger = generate_ledger(
+        users=users, accounts_per_user=accounts,
+        transactions_per_user=transactions, years=years, seed=seed,
+    )
+    store = MemoryBackend() if backend == "memory" else create_backend("sqlite", path=":memory:")
+    load_ledger(store, ledger)
+    if latency:
+        store = LatencyBackend(store, latency / 1000)
+    previous = set_backend(store)
+    try:
+        ctx = prepare(store, ledger)
+        results = {}
+        for name, scenario in SCENARIOS.items():
+            if only and name not in only:
+                continue
+            body, setup = scenario(ctx)
+            results[name] = time_scenario(body, setup, repeat=repeat)
+            print(f"{name:<20} median {results[name]['median'] * 1000:9.2f} ms")
+    finally:
+        set_backend(previous)
+
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'params': {
+            'users': users, 'accounts': accounts, 'transactions': transactions,
+            'years': years, 'seed': seed, 'backend': backend, 'repeat': repeat, 'latency_ms': latency,
+            'month_rows': len(ctx.month_records),
+        },
+        'scenarios': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.split("\n")[1])
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--accounts", type=int, default=8, help="accounts per user")
+    parser.add_argument("--transactions", type=int, default=10_000, help="transactions per user")
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated milliseconds per storage call")
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    doc = run(
+        users=args.users, accounts=args.accounts, transactions=args.transactions,
+        years=args.years, seed=args.seed, backend=args.backend,
+        only=set(args.only.split(",")) if args.only else None, repeat=args.repeat,
+        latency=args.latency,
+    )
+    output = args.output or os.path.join(
+        RESULTS_DIR, datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as fh:
+        json.dump(doc, fh, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
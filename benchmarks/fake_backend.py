@@ -0,0 +1,351 @@
+import bisect
+import datetime
+import threading
+import time
+import uuid
+
+from core.storage.base import StorageBackend
+
+TX_FIELDS = ['tx_uuid', 'date', 'account_id', 'category', 'description', 'type', 'amount', 'user_id']
+
+
+def _now():
+    # Same fixed-width UTC format as the SQLite backend's triggers
+    return datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f+00:00')
+
+
+class MemoryBackend(StorageBackend):
+    """
+    In-process fake backend keeping every table in Python dicts.
+    It has no I/O at all, so benchmarks against it measure only the
+    application-side cost of a code path.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.accounts = {}
+        self.balances = []
+        self.transactions = {}
+        self.tombstones = {}  # tx_uuid -> tombstone row
+        self._sorted = {}   # user_id -> (rows, keys) ordered by (date, tx_uuid)
+        self.rollups = {}   # (user_id, account_id, date, category, type) -> [amount, tx_count]
+
+    # ------------- Accounts -------------
+
+    def list_accounts(self, user_id):
+        with self._lock:
+            rows = [dict(a) for a in self.accounts.values() if a['user_id'] == user_id]
+        return sorted(rows, key=lambda a: a['name'])
+
+    def insert_account(self, data):
+        with self._lock:
+            account_id = data.get('id') or max(self.accounts, default=0) + 1
+            row = {'id': account_id, 'notes': '', **data}
+            self.accounts[account_id] = row
+            return dict(row)
+
+    def update_account(self, account_id, user_id, data):
+        with self._lock:
+            row = self.accounts.get(account_id)
+            if row is None or row['user_id'] != user_id:
+                return None
+            row.update(data)
+            self._sorted.clear()
+            return dict(row)
+
+    def delete_account(self, account_id, user_id):
+        with self._lock:
+            row = self.accounts.get(account_id)
+            if row is None or row['user_id'] != user_id:
+                return None
+            return self.accounts.pop(account_id)
+
+    def account_has_transactions(self, account_id):
+        with self._lock:
+            return any(t['account_id'] == account_id for t in self.transactions.values())
+
+    # ------------- Balances -------------
+
+    def list_balances(self, user_id):
+        with self._lock:
+            rows = [dict(b) for b in self.balances if b['user_id'] == user_id]
+        return sorted(rows, key=lambda b: int(b['month']))
+
+    def get_opening(self, month, account_id, user_id):
+        with self._lock:
+            for row in reversed(self.balances):
+                if int(row['month']) == int(month) and row['account_id'] == account_id \
+                        and row['user_id'] == user_id:
+                    return {'opening': row['opening']}
+        return None
+
+    def list_openings(self, user_id, months):
+        months = {int(m) for m in months}
+        with self._lock:
+            return [
+                {'month': b['month'], 'account_id': b['account_id'], 'opening': b['opening']}
+                for b in self.balances
+                if b['user_id'] == user_id and int(b['month']) in months
+            ]
+
+    def save_opening(self, month, account_id, user_id, opening):
+        with self._lock:
+            for row in self.balances:
+                if int(row['month']) == int(month) and row['account_id'] == account_id \
+                        and row['user_id'] == user_id:
+                    row['opening'] = float(opening)
+                    return dict(row)
+            row = {
+                'id': len(self.balances) + 1,
+                'month': int(month),
+                'account_id': account_id,
+                'user_id': user_id,
+                'opening': float(opening),
+            }
+            self.balances.append(row)
+            return dict(row)
+
+    # ------------- Transactions -------------
+
+    def get_transactions(self, tx_uuids):
+        with self._lock:
+            return [dict(self.transactions[t]) for t in tx_uuids if t in self.transactions]
+
+    def insert_transactions(self, rows):
+        stored = []
+        with self._lock:
+            for row in rows:
+                record = {f: row.get(f) for f in TX_FIELDS}
+                record['tx_uuid'] = record['tx_uuid'] or str(uuid.uuid4())
+                record['updated_at'] = _now()
+                self._roll(self.transactions.get(record['tx_uuid']), -1)
+                self.transactions[record['tx_uuid']] = record
+                self._roll(record, 1)
+                self.tombstones.pop(record['tx_uuid'], None)
+                stored.append(dict(record))
+            self._sorted.clear()
+        return stored
+
+    def update_transaction(self, tx_uuid, updates):
+        with self._lock:
+            row = self.transactions.get(tx_uuid)
+            if row is None:
+                return None
+            self._roll(row, -1)
+            row.update({k: v for k, v in updates.items() if k in TX_FIELDS and k != 'tx_uuid'})
+            self._roll(row, 1)
+            row['updated_at'] = _now()
+            self._sorted.clear()
+            return dict(row)
+
+    def upsert_transactions(self, rows):
+        stored = []
+        with self._lock:
+            for row in rows:
+                record = {f: row.get(f) for f in TX_FIELDS}
+                record['updated_at'] = _now()
+                self._roll(self.transactions.get(record['tx_uuid']), -1)
+                self.transactions[record['tx_uuid']] = record
+                self._roll(record, 1)
+                self.tombstones.pop(record['tx_uuid'], None)
+                stored.append(dict(record))
+            self._sorted.clear()
+        return stored
+
+    def delete_transactions(self, tx_uuids):
+        deleted = []
+        with self._lock:
+            for tx_uuid in tx_uuids:
+                row = self.transactions.pop(tx_uuid, None)
+                if row is not None:
+                    self._roll(row, -1)
+                    deleted.append(row)
+                    self.tombstones[tx_uuid] = {
+                        **{f: None for f in TX_FIELDS},
+                        'tx_uuid': tx_uuid, 'user_id': row['user_id'],
+                        'updated_at': _now(), 'deleted': True,
+                    }
+            self._sorted.clear()
+        return deleted
+
+    def _user_rows(self, user_id):
+        """
+        A user's rows sorted by (date, tx_uuid) ascending, plus their keys.
+        """
+        cached = self._sorted.get(user_id)
+        if cached is None:
+            rows = [t for t in self.transactions.values() if user_id is None or t['user_id'] == user_id]
+            rows.sort(key=lambda t: (t['date'], t['tx_uuid']))
+            cached = (rows, [(t['date'], t['tx_uuid']) for t in rows])
+            self._sorted[user_id] = cached
+        return cached
+
+    def select_transactions(
+        self, user_id=None, start_date=None, end_date=None,
+        account_ids=None, types=None, after=None, limit=None
+    ):
+        account_ids = set(account_ids) if account_ids else None
+        types = set(types) if types else None
+        result = []
+        with self._lock:
+            rows, keys = self._user_rows(user_id)
+            # Walk backwards (newest first) from the first key below the cursor
+            hi = len(rows)
+            if after is not None:
+                hi = bisect.bisect_left(keys, tuple(after))
+            if end_date:
+                hi = min(hi, bisect.bisect_right(keys, (end_date, '\uffff')))
+            for i in range(hi - 1, -1, -1):
+                t = rows[i]
+                if start_date and t['date'] < start_date:
+                    break
+                if account_ids and t['account_id'] not in account_ids:
+                    continue
+                if types and t['type'] not in types:
+                    continue
+                account = self.accounts.get(t['account_id'])
+                if account is None:
+                    continue
+                result.append({**t, 'accounts': {'name': account['name']}})
+                if limit is not None and len(result) >= limit:
+                    break
+        return result
+
+    def dashboard_aggregates(self, user_id, start_date=None, end_date=None, account_ids=None, types=None):
+        groupings = {
+            'by_account': ('account', 'type'),
+            'by_category': ('category', 'type'),
+            'by_day': ('date', 'type'),
+            'by_type': ('type',),
+        }
+        sums = {name: {} for name in groupings}
+        rows = self.select_transactions(user_id, start_date, end_date, account_ids, types)
+        for row in rows:
+            row['account'] = row['accounts']['name']
+            for name, keys in groupings.items():
+                if name == 'by_category' and row['category'] is None:
+                    continue
+                key = tuple(row[k] for k in keys)
+                entry = sums[name].setdefault(key, [0.0, 0])
+                entry[0] += float(row['amount'])
+                entry[1] += 1
+        return {
+            name: [
+                {**dict(zip(groupings[name], key)), 'amount': amount, 'tx_count': count}
+                for key, (amount, count) in sorted(sums[name].items())
+            ]
+            for name in groupings
+        }
+
+    def select_changes(self, user_id, since=None, after=None, limit=None):
+        with self._lock:
+            rows = [
+                {**t, 'deleted': False} for t in self.transactions.values()
+                if t['user_id'] == user_id and (since is None or t['updated_at'] >= since)
+            ]
+            if since is not None:
+                rows.extend(
+                    dict(t) for t in self.tombstones.values()
+                    if t['user_id'] == user_id and t['updated_at'] >= since
+                )
+        rows.sort(key=lambda t: (t['updated_at'], t['tx_uuid']))
+        if after is not None:
+            start = bisect.bisect_right([(t['updated_at'], t['tx_uuid']) for t in rows], tuple(after))
+            rows = rows[start:]
+        return rows[:limit] if limit is not None else rows
+
+    # ------------- Rollups -------------
+
+    def _roll(self, row, sign):
+        """
+        Add (sign=1) or remove (sign=-1) a stored row's share of the
+        rollups, as the database triggers do on every write.
+        """
+        if row is None:
+            return
+        key = (row['user_id'], row['account_id'], str(row['date'])[:10], row['category'] or '', row['type'])
+        entry = self.rollups.setdefault(key, [0.0, 0])
+        entry[0] = round(entry[0] + sign * float(row['amount']), 2)
+        entry[1] += sign
+        if entry[1] <= 0:
+            del self.rollups[key]
+
+    def select_rollups(self, user_id, start_date=None, end_date=None, account_ids=None):
+        account_ids = set(account_ids) if account_ids else None
+        with self._lock:
+            rows = [
+                {'date': k[2], 'account_id': k[1], 'category': k[3], 'type': k[4],
+                 'amount': v[0], 'tx_count': v[1]}
+                for k, v in self.rollups.items()
+                if k[0] == user_id
+                and (not start_date or k[2] >= start_date)
+                and (not end_date or k[2] <= end_date)
+                and (not account_ids or k[1] in account_ids)
+            ]
+        return sorted(rows, key=lambda r: r['date'])
+
+    def rebuild_rollups(self, user_id):
+        with self._lock:
+            for key in [k for k in self.rollups if k[0] == user_id]:
+                del self.rollups[key]
+            rows = [t for t in self.transactions.values() if t['user_id'] == user_id]
+            for t in rows:
+                self._roll(t, 1)
+            return len(rows)
+
+
+class LatencyBackend:
+    """
+    Wraps a backend and sleeps `latency` seconds before every storage call,
+    standing in for the network round trip to a hosted database.
+    """
+
+    def __init__(self, inner, latency):
+        self.inner = inner
+        self.name = inner.name
+        self.latency = latency
+
+    def __getattr__(self, name):
+        attr = getattr(self.inner, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        def delayed(*args, **kwargs):
+            time.sleep(self.latency)
+            return attr(*args, **kwargs)
+
+        delayed.__name__ = name
+        self.__dict__[name] = delayed
+        return delayed
+
+
+StorageBackend.register(LatencyBackend)
+
+
+class CappedBackend:
+    """
+    Wraps a backend and, like PostgREST's max-rows, never returns more than
+    `max_rows` rows from a select, whatever limit was asked for.
+    """
+
+    def __init__(self, inner, max_rows=1000):
+        self.inner = inner
+        self.name = inner.name
+        self.max_rows = max_rows
+
+    def __getattr__(self, name):
+        attr = getattr(self.inner, name)
+        if not name.startswith('select_') or not callable(attr):
+            return attr
+
+        def capped(*args, **kwargs):
+            return attr(*args, **kwargs)[:self.max_rows]
+
+        capped.__name__ = name
+        self.__dict__[name] = capped
+        return capped
+
+
+StorageBackend.register(CappedBackend)
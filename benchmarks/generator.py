@@ -0,0 +1,79 @@
+import datetime
+import random
+import uuid
+
+CATEGORIES = [
+    "Food", "Transport", "Bills", "Shopping", "Rent", "Salary",
+    "Payment", "Investment", "Entertainment", "Health",
+    "Education", "Other"
+]
+BANKS = ["HDFC", "ICICI", "SBI", "Axis", "Kotak", "Yes", "IDFC", "Federal"]
+
+
+def generate_ledger(users=1, accounts_per_user=8, transactions_per_user=10_000,
+                    years=2, end_date=None, seed=42):
+    """
+    Build a reproducible synthetic ledger.
+    Returns a dict with 'accounts', 'balances' and 'transactions' lists of
+    rows shaped like the database tables. Account ids are unique across
+    users; dates span `years` years ending at `end_date` (default today).
+    """
+    rng = random.Random(seed)
+    end_date = end_date or datetime.date.today()
+    start_date = end_date - datetime.timedelta(days=365 * years)
+    span = (end_date - start_date).days
+
+    accounts, balances, transactions = [], [], []
+    next_account_id = 1
+    for u in range(users):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        user_accounts = []
+        for i in range(accounts_per_user):
+            atype = "Credit" if i % 3 == 2 else "Debit"
+            account = {
+                'id': next_account_id,
+                'name': f"{BANKS[i % len(BANKS)]} {'Card' if atype == 'Credit' else 'Bank'} {i + 1}",
+                'type': atype,
+                'notes': '',
+                'user_id': user_id,
+            }
+            next_account_id += 1
+            accounts.append(account)
+            user_accounts.append(account)
+            for month in range(1, 13):
+                balances.append({
+                    'id': len(balances) + 1,
+                    'month': month,
+                    'account_id': account['id'],
+                    'opening': round(rng.uniform(0, 100_000), 2),
+                    'user_id': user_id,
+                })
+
+        for _ in range(transactions_per_user):
+            account = rng.choice(user_accounts)
+            is_income = rng.random() < 0.15
+            transactions.append({
+                'tx_uuid': str(uuid.UUID(int=rng.getrandbits(128))),
+                'date': (start_date + datetime.timedelta(days=rng.randrange(span + 1))).isoformat(),
+                'account_id': account['id'],
+                'category': "Salary" if is_income else rng.choice(CATEGORIES),
+                'description': f"txn {rng.randrange(1_000_000)}",
+                'type': "Income" if is_income else "Expense",
+                'amount': round(rng.uniform(50, 50_000 if is_income else 5_000), 2),
+                'user_id': user_id,
+            })
+
+    return {'accounts': accounts, 'balances': balances, 'transactions': transactions}
+
+
+def load_ledger(backend, ledger):
+    """
+    Write a generated ledger into a storage backend.
+    Account rows keep their generated ids on backends that accept them.
+    """
+    for account in ledger['accounts']:
+        backend.insert_account(dict(account))
+    for row in ledger['balances']:
+        backend.save_opening(row['month'], row['account_id'], row['user_id'], row['opening'])
+    backend.insert_transactions(ledger['transactions'])
+    return backend
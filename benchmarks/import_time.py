@@ -0,0 +1,139 @@
+"""
+Measure what the app imports before it can draw, using python -X importtime.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget-ms 80 --top 20
+
+Every target is imported in a fresh interpreter after its preloads (which
+are not counted), a few times, keeping the fastest run. A target fails when
+it takes longer than its budget or pulls in one of its forbidden modules;
+the exit status is 1 if any target failed, so this can run in CI.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries the login page must not wait for
+HEAVY_MODULES = ['pandas', 'numpy', 'plotly', 'supabase', 'httpx', 'pyarrow']
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+@dataclass
+class Target:
+    name: str
+    modules: List[str]
+    preload: List[str] = field(default_factory=list)
+    # Milliseconds; None only reports
+    budget_ms: Optional[float] = None
+    forbidden: List[str] = field(default_factory=list)
+
+
+TARGETS = [
+    # Everything app.py imports before the login page renders
+    Target("login", ["ui.auth"], preload=["streamlit"], budget_ms=100, forbidden=HEAVY_MODULES),
+    # What main_page() adds once a user is signed in
+    Target("main_page", ["core.loader", "ui.accounts_view", "ui.balances_view",
+                         "ui.dev_panel", "ui.transactions_view"], preload=["streamlit", "ui.auth"]),
+]
+
+
+@dataclass
+class Measurement:
+    target: Target
+    total_ms: float
+    modules: dict  # module -> (self ms, cumulative ms)
+    forbidden: List[str]
+
+    @property
+    def failed(self):
+        over = self.target.budget_ms is not None and self.total_ms > self.target.budget_ms
+        return over or bool(self.forbidden)
+
+
+def parse_importtime(stderr, preload=()):
+    """
+    Top-level cumulative time (ms) of the imports made after the preloads,
+    and {module: (self ms, cumulative ms)} of every module they loaded.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            entries.append((module, len(indent), int(own) / 1000, int(cumulative) / 1000))
+    # -X importtime lists a module after its dependencies, so the preloads
+    # end at the last top-level line of a preloaded module
+    start = 0
+    for i, (module, depth, _, _) in enumerate(entries):
+        if depth == 1 and module in preload:
+            start = i + 1
+    entries = entries[start:]
+    total = sum(cumulative for _, depth, _, cumulative in entries if depth == 1)
+    return total, {module: (own, cumulative) for module, _, own, cumulative in entries}
+
+
+def measure(target, repeat=3):
+    """
+    Import the target in `repeat` fresh interpreters; the fastest run wins.
+    """
+    code = "; ".join(f"import {m}" for m in target.preload + target.modules)
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise Exception(f"Importing {target.name} failed:\n{proc.stderr[-2000:]}")
+        total, modules = parse_importtime(proc.stderr, target.preload)
+        if best is None or total < best[0]:
+            best = (total, modules)
+    total, modules = best
+    forbidden = sorted(
+        name for name in target.forbidden
+        if any(m == name or m.startswith(name + ".") for m in modules)
+    )
+    return Measurement(target, total, modules, forbidden)
+
+
+def report(measurement, top=10):
+    target = measurement.target
+    budget = f" (budget {target.budget_ms:.0f} ms)" if target.budget_ms is not None else ""
+    status = "FAIL" if measurement.failed else "ok"
+    print(f"{target.name:<12} {measurement.total_ms:9.1f} ms{budget}  {status}")
+    if measurement.forbidden:
+        print(f"  imports {', '.join(measurement.forbidden)}")
+    slowest = sorted(measurement.modules.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    for module, (own, cumulative) in slowest:
+        print(f"  {own:8.1f} ms self {cumulative:9.1f} ms cumulative  {module}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.import_time", description=__doc__.split("\n")[1])
+    parser.add_argument("--only", help="comma-separated target names")
+    parser.add_argument("--budget-ms", type=float, help="override the login budget")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list per target")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for target in TARGETS:
+        if args.only and target.name not in args.only.split(","):
+            continue
+        if args.budget_ms is not None and target.budget_ms is not None:
+            target.budget_ms = args.budget_ms
+        measurement = measure(target, repeat=args.repeat)
+        report(measurement, top=args.top)
+        failed = failed or measurement.failed
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
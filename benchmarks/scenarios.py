@@ -0,0 +1,434 @@
+"""
+Timed scenarios for the core and view hot paths.
+
+Each scenario is a function taking a prepared Context and returning a
+zero-argument callable (the timed body) and, optionally, a setup callable
+run untimed before every repeat.
+"""
+import datetime
+import io
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from core import transactions
+from core.accounts import get_accounts, invalidate_accounts
+from core.aggregates import aggregates_from_frame, aggregates_from_ledger, fetch_dashboard_aggregates
+from core.balances import get_all_balances, get_openings, get_openings_cached, invalidate_openings
+from core.changeset import apply_changeset, diff_transactions
+from core.export import export_archive
+from core.importer import import_statement
+from core.ledger import Ledger
+from core.rollups import fetch_rollup_aggregates, rebuild_rollups
+from core.prefetch import adjacent_months, prefetch_adjacent, wait_prefetch
+from core.loader import load_page
+from core.summary import summarize_month
+from core.utils import MONTHS
+from core.writeback import flush, queue_transaction
+
+
+@dataclass
+class Context:
+    backend: object
+    ledger: dict
+    user_id: str
+    accounts: list
+    month: str = field(default_factory=lambda: MONTHS[datetime.date.today().month - 1])
+    month_records: list = field(default_factory=list)
+    month_df: pd.DataFrame = None
+
+
+def prepare(backend, ledger):
+    """
+    Pick the first user of the ledger and preload the data most scenarios
+    start from (that user's accounts and current-month rows).
+    """
+    user_id = ledger['accounts'][0]['user_id']
+    ctx = Context(
+        backend=backend,
+        ledger=ledger,
+        user_id=user_id,
+        accounts=backend.list_accounts(user_id),
+    )
+    ctx.month_records = [
+        row for page in transactions.iter_transaction_pages(month_filter=ctx.month, user_id=user_id)
+        for row in page
+    ]
+    ctx.month_df = transactions.transactions_frame(ctx.month_records)
+    return ctx
+
+
+# ------------- Reference implementations (code as it was in the app) -------------
+
+def legacy_frame(records):
+    """
+    Row-by-row DataFrame construction fetch_transactions used before the
+    columnar path.
+    """
+    df_data = []
+    for row in records:
+        account_name = row['accounts']['name'] if row.get('accounts') else None
+        df_data.append({
+            'Transaction_ID': row['tx_uuid'],
+            'Date': pd.to_datetime(row['date']).date(),
+            'Account': account_name,
+            'Category': row['category'],
+            'Description': row['description'],
+            'Type': row['type'],
+            'Amount': float(row['amount'])
+        })
+    return pd.DataFrame(df_data)
+
+
+def legacy_account_summary(tx_df, accounts, openings):
+    """
+    Per-account boolean filtering loop of the Account Summary section in
+    show_transactions_view.
+    """
+    summary_rows = []
+    for a in accounts:
+        acc = a["name"]
+        opening = openings.get(a["id"], 0.0)
+        acc_data = tx_df[tx_df["Account"] == acc]
+        income = float(acc_data[acc_data["Type"] == "Income"]["Amount"].sum()) if not acc_data.empty else 0.0
+        expense = float(acc_data[acc_data["Type"] == "Expense"]["Amount"].sum()) if not acc_data.empty else 0.0
+        if a["type"] == "Debit":
+            remaining = opening + income - expense
+        else:
+            remaining = opening + expense - income
+        summary_rows.append({
+            "Account": acc,
+            "Type": a["type"],
+            "Opening Balance": opening,
+            "Total Incoming (Payments)": income,
+            "Total Spent": expense,
+            "Remaining Balance": remaining
+        })
+    return pd.DataFrame(summary_rows)
+
+
+def legacy_chart_aggregations(tx_df):
+    """
+    The group-bys behind the Monthly Metrics and Visual Insights sections.
+    """
+    total_income = tx_df[tx_df["Type"] == "Income"]["Amount"].sum()
+    total_expense = tx_df[tx_df["Type"] == "Expense"]["Amount"].sum()
+    daily = tx_df[tx_df["Type"] == "Expense"].groupby("Date", observed=True)["Amount"].sum().reset_index()
+    daily["Cumulative"] = daily["Amount"].cumsum()
+    category = tx_df[tx_df["Type"] == "Expense"].groupby("Category", observed=True)["Amount"].sum().reset_index()
+    by_account = (
+        tx_df.groupby(["Account", "Type"], observed=True)["Amount"]
+        .sum()
+        .reset_index()
+        .pivot(index="Account", columns="Type", values="Amount")
+        .fillna(0)
+    )
+    return total_income, total_expense, daily, category, by_account
+
+
+# ------------- Scenarios -------------
+
+def fetch_month(ctx):
+    return lambda: transactions.fetch_transactions(month_filter=ctx.month, user_id=ctx.user_id), None
+
+
+def fetch_history(ctx):
+    return lambda: transactions.fetch_transactions_paged(user_id=ctx.user_id, page_size=5000), None
+
+
+def frame_legacy(ctx):
+    return lambda: legacy_frame(ctx.month_records), None
+
+
+def frame_columnar(ctx):
+    return lambda: transactions.transactions_frame(ctx.month_records), None
+
+
+def account_summary(ctx):
+    openings = {b['account_id']: b['opening'] for b in ctx.backend.list_openings(
+        ctx.user_id, [datetime.date.today().month]
+    )}
+    return lambda: legacy_account_summary(ctx.month_df, ctx.accounts, openings), None
+
+
+def account_summary_engine(ctx):
+    openings = get_openings(datetime.date.today().month, ctx.user_id)
+    return lambda: summarize_month(ctx.month_df, ctx.accounts, openings).frame(), None
+
+
+def chart_aggregation(ctx):
+    return lambda: legacy_chart_aggregations(ctx.month_df), None
+
+
+def dashboard_cube(ctx):
+    """
+    Every metric and chart input from one cube over the month.
+    """
+    return lambda: aggregates_from_frame(ctx.month_df), None
+
+
+def dashboard_ledger(ctx):
+    """
+    The same cube built from the month's Ledger codes.
+    """
+    ledger = Ledger.from_frame(ctx.month_df)
+    return lambda: aggregates_from_ledger(ledger), None
+
+
+def dashboard_from_rows(ctx):
+    """
+    Dashboard aggregates the client-side way: fetch the month, then group.
+    """
+    def run():
+        tx_df = transactions.fetch_transactions(month_filter=ctx.month, user_id=ctx.user_id)
+        return aggregates_from_frame(tx_df)
+    return run, None
+
+
+def dashboard_rpc(ctx):
+    return lambda: fetch_dashboard_aggregates(month_filter=ctx.month, user_id=ctx.user_id), None
+
+
+def dashboard_rollups(ctx):
+    """
+    The same aggregates read from the daily rollups (rebuilt once, untimed).
+    """
+    rebuild_rollups(ctx.user_id)
+    return lambda: fetch_rollup_aggregates(month_filter=ctx.month, user_id=ctx.user_id), None
+
+
+def _clear_caches():
+    invalidate_accounts()
+    invalidate_openings()
+    transactions.invalidate_month_cache()
+
+
+def month_step_cold(ctx):
+    """
+    Step to the next month with nothing cached.
+    """
+    step = adjacent_months(ctx.month)[0]
+    return lambda: transactions.fetch_month_ledger(step, ctx.user_id), _clear_caches
+
+
+def month_step_prefetched(ctx):
+    """
+    Step to the next month after the current one rendered and its
+    neighbours were prefetched (untimed).
+    """
+    step = adjacent_months(ctx.month)[0]
+
+    def setup():
+        _clear_caches()
+        transactions.fetch_month_ledger(ctx.month, ctx.user_id)
+        prefetch_adjacent(ctx.user_id, ctx.month)
+        wait_prefetch(ctx.user_id)
+
+    return lambda: transactions.fetch_month_ledger(step, ctx.user_id), setup
+
+
+def _rerun_filters(ctx):
+    today = datetime.date.today()
+    return dict(
+        month_filter=ctx.month, start_date=today.replace(day=1), end_date=today,
+        account_ids=None, types=None,
+    )
+
+
+def rerun_sequential(ctx):
+    """
+    The reads of one cold rerun, one after another as the views made them.
+    """
+    def run():
+        for _ in range(3):
+            get_accounts(ctx.user_id)
+        get_all_balances(ctx.user_id)
+        transactions.fetch_transactions(user_id=ctx.user_id, **_rerun_filters(ctx))
+        get_openings_cached(ctx.month, ctx.user_id)
+    return run, _clear_caches
+
+
+def rerun_concurrent(ctx):
+    """
+    The same reads through core.loader.
+    """
+    def run():
+        data = load_page(ctx.user_id, ctx.month)
+        for _ in range(3):
+            data.accounts
+        data.balances
+        data.month_transactions()
+        data.openings()
+    return run, _clear_caches
+
+
+def filter_refetch(ctx):
+    """
+    A filter change answered by a new server query.
+    """
+    accounts = [a['id'] for a in ctx.accounts[:2]]
+    filters = _rerun_filters(ctx)
+    return lambda: transactions.fetch_transactions(
+        month_filter=ctx.month, start_date=filters['start_date'], end_date=filters['end_date'],
+        account_ids=accounts, types=['Expense'], user_id=ctx.user_id,
+    ), None
+
+
+def filter_local(ctx):
+    """
+    The same filter change applied to the cached month.
+    """
+    accounts = [a['name'] for a in ctx.accounts[:2]]
+    filters = _rerun_filters(ctx)
+
+    def run():
+        ledger = transactions.fetch_month_ledger(ctx.month, ctx.user_id)
+        return ledger.filter(filters['start_date'], filters['end_date'], accounts, ['Expense']).to_frame()
+    return run, None
+
+
+def bulk_save(ctx):
+    """
+    Save a grid where 1% of the month's rows were edited and 0.5% deleted.
+    The original rows are written back (untimed) before each repeat.
+    """
+    original = ctx.month_df
+    edited = original.astype({"Category": object, "Type": object}).copy()
+    n = len(edited)
+    step = max(1, n // max(1, n // 100))
+    edited.loc[edited.index[::step], "Amount"] = edited["Amount"].iloc[::step] + 1
+    edited = edited.drop(edited.index[1::max(2, step * 2)])
+    originals = [
+        {k: v for k, v in row.items() if k != 'accounts'} for row in ctx.month_records
+    ]
+
+    def setup():
+        ctx.backend.upsert_transactions(originals)
+
+    def run():
+        return apply_changeset(diff_transactions(original, edited), ctx.accounts, ctx.user_id)
+
+    return run, setup
+
+
+def _receipts(ctx, count):
+    """
+    `count` receipts dated today in the first account, and a setup that
+    deletes the previous repeat's ones.
+    """
+    account = ctx.accounts[0]
+    receipts = [
+        (datetime.date.today(), account['id'], "Food", f"bench receipt {i}", "Expense", 10 + i)
+        for i in range(count)
+    ]
+
+    def setup():
+        stale = [
+            r['tx_uuid'] for page in transactions.iter_transaction_pages(month_filter=ctx.month, user_id=ctx.user_id)
+            for r in page if (r['description'] or "").startswith("bench receipt")
+        ]
+        if stale:
+            ctx.backend.delete_transactions(stale)
+        _clear_caches()
+        load_page(ctx.user_id, ctx.month).month_ledger()
+
+    return account, receipts, setup
+
+
+def add_receipts_sync(ctx, count=20):
+    """
+    Enter `count` receipts the way the form used to: an insert, then a
+    rerun that reads the month again, per receipt.
+    """
+    account, receipts, setup = _receipts(ctx, count)
+
+    def run():
+        for receipt in receipts:
+            transactions.add_transaction(*receipt, ctx.user_id)
+            load_page(ctx.user_id, ctx.month).month_ledger()
+    return run, setup
+
+
+def add_receipts_writeback(ctx, count=20):
+    """
+    The same receipts through the write-behind queue: each one is queued
+    and shown from the overlaid month, then written in one batch (timed).
+    """
+    account, receipts, setup = _receipts(ctx, count)
+
+    def run():
+        data = load_page(ctx.user_id, ctx.month)
+        for receipt in receipts:
+            queue_transaction(*receipt, ctx.user_id, account_name=account['name'])
+            data.month_ledger()
+        flush(ctx.user_id)
+        return data.month_ledger()
+    return run, setup
+
+
+def import_csv(ctx, rows=5000):
+    """
+    Import a year's CSV statement of `rows` rows into an account (dated
+    2000, clear of the generated ledger). Setup deletes the previous run's
+    rows, so every repeat inserts them all.
+    """
+    account_id = ctx.accounts[0]['id']
+    lines = ["Date,Narration,Withdrawal Amt.,Deposit Amt."]
+    start = datetime.date(2000, 1, 1)
+    for i in range(rows):
+        day = start + datetime.timedelta(days=i % 365)
+        if i % 10 == 0:
+            lines.append(f"{day:%d/%m/%Y},NEFT CREDIT {i},,{1000 + i}.00")
+        else:
+            lines.append(f"{day:%d/%m/%Y},UPI/{i}/MERCHANT {i % 40},{(i % 500) + 1}.50,")
+    statement = "\n".join(lines).encode()
+
+    def setup():
+        stale = [
+            r['tx_uuid'] for page in transactions.iter_transaction_pages(
+                start_date="2000-01-01", end_date="2000-12-31", user_id=ctx.user_id, page_size=5000
+            ) for r in page
+        ]
+        if stale:
+            ctx.backend.delete_transactions(stale)
+
+    def run():
+        return import_statement(io.BytesIO(statement), account_id, ctx.user_id, name="statement.csv")
+
+    return run, setup
+
+
+def export_csv(ctx):
+    return lambda: export_archive(ctx.user_id, io.BytesIO(), "csv"), None
+
+
+def export_parquet(ctx):
+    return lambda: export_archive(ctx.user_id, io.BytesIO(), "parquet"), None
+
+
+SCENARIOS = {
+    'fetch_month': fetch_month,
+    'fetch_history': fetch_history,
+    'frame_legacy': frame_legacy,
+    'frame_columnar': frame_columnar,
+    'account_summary': account_summary,
+    'account_summary_engine': account_summary_engine,
+    'chart_aggregation': chart_aggregation,
+    'dashboard_cube': dashboard_cube,
+    'dashboard_ledger': dashboard_ledger,
+    'dashboard_from_rows': dashboard_from_rows,
+    'dashboard_rpc': dashboard_rpc,
+    'dashboard_rollups': dashboard_rollups,
+    'rerun_sequential': rerun_sequential,
+    'rerun_concurrent': rerun_concurrent,
+    'month_step_cold': month_step_cold,
+    'month_step_prefetched': month_step_prefetched,
+    'filter_refetch': filter_refetch,
+    'filter_local': filter_local,
+    'bulk_save': bulk_save,
+    'add_receipts_sync': add_receipts_sync,
+    'add_receipts_writeback': add_receipts_writeback,
+    'import_csv': import_csv,
+    'export_csv': export_csv,
+    'export_parquet': export_parquet,
+}
@@ -1,38 +1,59 @@
-from core.database import get_supabase_client
+from core.cache import MISSING, shared_cache
+from core.storage import get_backend
+from core.transactions import invalidate_month_cache
+
+# Account lists are read by every view on every rerun; keep them per user.
+ACCOUNTS_CACHE_TTL = 120
+_accounts_cache = shared_cache.namespace("accounts", ttl=ACCOUNTS_CACHE_TTL)
+
 
 def get_accounts(user_id):
     """
     Fetch all accounts for a specific user.
+    Served from the accounts cache when possible.
+    """
+    cached = _accounts_cache.get(user_id)
+    if cached is MISSING:
+        generation = _accounts_cache.generation()
+        cached = get_backend().list_accounts(user_id)
+        _accounts_cache.set(user_id, cached, generation=generation)
+    # Hand out copies so callers can't modify the cached rows
+    return [dict(a) for a in cached]
+
+
+def invalidate_accounts(user_id=None):
+    """
+    Forget cached accounts for a user (or for everyone).
+    """
+    _accounts_cache.invalidate(user_id)
+
+
+def accounts_cache_stats():
+    """
+    Hit/miss counters, entries and bytes of the accounts cache.
     """
-    supabase = get_supabase_client()
-    response = supabase.table('accounts')\
-        .select('id, name, type, notes, user_id')\
-        .eq('user_id', user_id)\
-        .order('name')\
-        .execute()
-    return response.data if response.data else []
+    return _accounts_cache.stats()
 
 
 def add_account(name, atype, notes='', user_id=None):
     """
     Add a new account for this user.
     """
-    supabase = get_supabase_client()
     data = {
         'name': name,
         'type': atype,
         'notes': notes,
         'user_id': user_id
     }
-    response = supabase.table('accounts').insert(data).execute()
-    return response.data[0] if response.data else None
+    result = get_backend().insert_account(data)
+    invalidate_accounts(user_id)
+    return result
 
 
 def update_account(account_id, name=None, atype=None, notes=None, user_id=None):
     """
     Update an account if owned by this user.
     """
-    supabase = get_supabase_client()
     data = {}
     
     if name is not None:
@@ -45,13 +66,13 @@ def update_account(account_id, name=None, atype=None, notes=None, user_id=None):
     if not data:
         return  # nothing to update
     
-    response = supabase.table('accounts')\
-        .update(data)\
-        .eq('id', account_id)\
-        .eq('user_id', user_id)\
-        .execute()
+    result = get_backend().update_account(account_id, user_id, data)
+    invalidate_accounts(user_id)
+    if 'name' in data:
+        # Cached months carry account names
+        invalidate_month_cache(user_id)
      
-    return response.data[0] if response.data else None
+    return result
 
 
 def delete_account(account_id, user_id=None):
@@ -59,19 +80,12 @@ def delete_account(account_id, user_id=None):
     Delete account if owned by user.
     Prevent deletion if linked transactions exist.
     """
-    supabase = get_supabase_client()
+    backend = get_backend()
     
     # Check for existing transactions
-    trans_response = supabase.table('transactions')\
-        .select('count')\
-        .eq('account_id', account_id)\
-        .execute()
-    if trans_response.data and len(trans_response.data) > 0:
+    if backend.account_has_transactions(account_id):
         raise Exception("Cannot delete account with existing transactions.")
     
-    response = supabase.table('accounts')\
-        .delete()\
-        .eq('id', account_id)\
-        .eq('user_id', user_id)\
-        .execute()
-    return response.data[0] if response.data else None
+    result = backend.delete_account(account_id, user_id)
+    invalidate_accounts(user_id)
+    return result
@@ -0,0 +1,265 @@
+"""
+Aggregates behind the dashboard (account summary, Monthly Metrics and
+Visual Insights).
+
+They can be computed from an already loaded transactions frame
+(aggregates_from_frame) or by the database in one RPC
+(fetch_dashboard_aggregates, see sql/dashboard_aggregates.sql), which
+returns a few kilobytes instead of every row of the month. Set
+MONEYMAGIC_SERVER_AGGREGATES=1 to use the RPC in the app.
+"""
+import hashlib
+import os
+from dataclasses import dataclass, fields
+
+import numpy as np
+import pandas as pd
+
+from core.storage import get_backend
+from core.utils import date_bounds
+
+SERVER_AGGREGATES = os.environ.get("MONEYMAGIC_SERVER_AGGREGATES") == "1"
+
+GROUPINGS = {
+    'by_account': ['Account', 'Type'],
+    'by_category': ['Category', 'Type'],
+    'by_day': ['Date', 'Type'],
+    'by_type': ['Type'],
+}
+# Finest grouping; every entry of GROUPINGS is a roll-up of it
+CUBE_KEYS = ['Date', 'Account', 'Category', 'Type']
+# Backend result keys -> frame columns
+_COLUMNS = {
+    'account': 'Account',
+    'category': 'Category',
+    'date': 'Date',
+    'type': 'Type',
+    'amount': 'Amount',
+    'tx_count': 'Count',
+}
+
+
+@dataclass
+class DashboardAggregates:
+    """
+    Sum and count of Amount per grouping in GROUPINGS; each frame has the
+    grouping columns plus Amount and Count.
+    """
+    by_account: pd.DataFrame
+    by_category: pd.DataFrame
+    by_day: pd.DataFrame
+    by_type: pd.DataFrame
+
+    @property
+    def empty(self):
+        return self.by_type.empty
+
+    @property
+    def count(self):
+        return int(self.by_type["Count"].sum())
+
+    def total(self, tx_type):
+        return float(self.by_type.loc[self.by_type["Type"] == tx_type, "Amount"].sum())
+
+    def daily(self, tx_type="Expense"):
+        """
+        Date, Amount of one type, oldest first.
+        """
+        df = self.by_day[self.by_day["Type"] == tx_type]
+        return df[["Date", "Amount"]].sort_values("Date").reset_index(drop=True)
+
+    def categories(self, tx_type="Expense"):
+        """
+        Category, Amount of one type, largest first.
+        """
+        df = self.by_category[self.by_category["Type"] == tx_type]
+        return df[["Category", "Amount"]].sort_values("Amount", ascending=False).reset_index(drop=True)
+
+    def account_pivot(self):
+        """
+        One row per account with Income and Expense columns.
+        """
+        pivot = self.by_account.pivot_table(
+            index="Account", columns="Type", values="Amount", aggfunc="sum", fill_value=0.0, observed=True
+        )
+        for col in ["Income", "Expense"]:
+            if col not in pivot.columns:
+                pivot[col] = 0.0
+        pivot.columns.name = None
+        return pivot.reset_index()
+
+    def fingerprint(self):
+        """
+        Hash of the aggregate values; equal fingerprints mean equal data.
+        """
+        digest = hashlib.sha1()
+        for f in fields(self):
+            df = getattr(self, f.name)
+            digest.update(f.name.encode())
+            digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        return digest.hexdigest()
+
+    def account_totals(self):
+        """
+        {account name: (income, expense)} as used by core.summary.
+        """
+        pivot = self.account_pivot()
+        return {
+            name: (float(i), float(e))
+            for name, i, e in zip(pivot["Account"], pivot["Income"].to_numpy(), pivot["Expense"].to_numpy())
+        }
+
+
+def _empty(columns):
+    return pd.DataFrame({c: pd.Series(dtype=object) for c in columns}).assign(
+        Amount=pd.Series(dtype="float64"), Count=pd.Series(dtype="int64")
+    )
+
+
+def _codes(series):
+    """
+    Integer codes of a column (0 = missing) and the values they stand for.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, values = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, values = pd.factorize(series)
+    labels = np.empty(len(values) + 1, dtype=object)
+    labels[1:] = np.asarray(values, dtype=object)
+    return codes.astype(np.int64) + 1, labels
+
+
+def _group(codes, sizes, amount, count):
+    """
+    Sum amount and count per distinct combination of the code columns.
+    Returns the combinations' codes (one array per column) and the sums.
+    """
+    combined = np.zeros(len(amount), dtype=np.int64)
+    for c, size in zip(codes, sizes):
+        combined = combined * size + c
+    inverse, uniques = pd.factorize(combined)
+    sums = np.bincount(inverse, weights=amount, minlength=len(uniques))
+    counts = np.bincount(inverse, weights=count, minlength=len(uniques)).astype(np.int64)
+    decoded = []
+    for size in reversed(sizes):
+        uniques, c = np.divmod(uniques, size)
+        decoded.append(c)
+    return decoded[::-1], sums, counts
+
+
+@dataclass
+class TransactionCube:
+    """
+    Sum and count of Amount per (Date, Account, Category, Type), kept as
+    integer codes per key plus the labels they stand for.
+    """
+    codes: dict    # key -> int64 codes, 0 = missing
+    labels: dict   # key -> object array, labels[code]
+    amount: np.ndarray
+    count: np.ndarray
+
+    def __len__(self):
+        return len(self.amount)
+
+    def rollup(self, keys):
+        """
+        Sum and count per combination of `keys` as a frame (keys + Amount,
+        Count). Combinations with a missing key are left out, like a
+        pandas group-by.
+        """
+        if not len(self):
+            return _empty(keys)
+        decoded, sums, counts = _group(
+            [self.codes[k] for k in keys], [len(self.labels[k]) for k in keys], self.amount, self.count
+        )
+        present = np.logical_and.reduce([c > 0 for c in decoded])
+        frame = {k: self.labels[k][c[present]] for k, c in zip(keys, decoded)}
+        frame["Amount"] = sums[present]
+        frame["Count"] = counts[present]
+        return pd.DataFrame(frame)
+
+    def frame(self):
+        return self.rollup(CUBE_KEYS)
+
+
+def transaction_cube(tx_df, count=None):
+    """
+    Build the TransactionCube of a transactions frame. This is the only
+    pass over the raw rows; everything else is derived from the cube.
+    `count` is passed on to cube_from_codes.
+    """
+    codes, labels = {}, {}
+    for key in CUBE_KEYS:
+        codes[key], labels[key] = _codes(tx_df[key])
+    return cube_from_codes(codes, labels, tx_df["Amount"].to_numpy(dtype="float64", na_value=0.0), count)
+
+
+def cube_from_codes(codes, labels, amount, count=None):
+    """
+    TransactionCube of rows given as per-key int64 codes (0 = missing,
+    labels[key][code] the value) and their amounts. `count` is the number
+    of transactions per row when rows are already partial sums (default 1).
+    """
+    decoded, sums, counts = _group(
+        [codes[k] for k in CUBE_KEYS], [len(labels[k]) for k in CUBE_KEYS],
+        amount, np.ones(len(amount), dtype=np.int64) if count is None else count,
+    )
+    return TransactionCube(dict(zip(CUBE_KEYS, decoded)), labels, sums, counts)
+
+
+def aggregates_from_cube(cube):
+    """
+    Roll a TransactionCube up to every grouping in GROUPINGS. The cube has
+    at most days x accounts x categories x types rows, so this is cheap
+    whatever the number of transactions.
+    """
+    return DashboardAggregates(**{name: cube.rollup(keys) for name, keys in GROUPINGS.items()})
+
+
+def aggregates_from_frame(tx_df):
+    """
+    Dashboard aggregates of a frame returned by fetch_transactions; the
+    raw rows are scanned once, to build the cube.
+    """
+    return aggregates_from_cube(transaction_cube(tx_df))
+
+
+def aggregates_from_ledger(ledger):
+    """
+    Dashboard aggregates of a core.ledger.Ledger, summed in exact paise.
+    """
+    return aggregates_from_cube(ledger.cube())
+
+
+def _result_frame(rows, keys):
+    if not rows:
+        return _empty(keys)
+    df = pd.DataFrame.from_records(rows).rename(columns=_COLUMNS)
+    df = df[keys + ["Amount", "Count"]]
+    if "Date" in df.columns:
+        df["Date"] = pd.to_datetime(df["Date"], format="ISO8601").dt.date
+    df["Amount"] = pd.to_numeric(df["Amount"]).astype("float64")
+    df["Count"] = df["Count"].astype("int64")
+    return df
+
+
+def fetch_dashboard_aggregates(
+    month_filter=None, start_date=None, end_date=None,
+    account_ids=None, types=None, user_id=None
+):
+    """
+    Same result as aggregates_from_frame(fetch_transactions(...)) for the
+    same filters, computed by the database in one call.
+    """
+    start, end = date_bounds(month_filter, start_date, end_date)
+    result = get_backend().dashboard_aggregates(
+        user_id=user_id,
+        start_date=start,
+        end_date=end,
+        account_ids=account_ids or None,
+        types=types or None,
+    )
+    return DashboardAggregates(**{
+        name: _result_frame(result.get(name) or [], keys)
+        for name, keys in GROUPINGS.items()
+    })
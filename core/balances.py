@@ -1,24 +1,31 @@
-from core.database import get_supabase_client
+import logging
+
+from core.cache import MISSING, shared_cache
+from core.storage import get_backend
+
+OPENINGS_CACHE_TTL = 120
+_openings_cache = shared_cache.namespace("openings", ttl=OPENINGS_CACHE_TTL)
+_balances_cache = shared_cache.namespace("balances", ttl=OPENINGS_CACHE_TTL)
+
+logger = logging.getLogger(__name__)
+
 
 def get_all_balances(user_id):
     """
     Get all balances for a user
     """
-    supabase = get_supabase_client()
-    response = supabase.table('balances')\
-        .select('id, month, account_id, opening')\
-        .eq('user_id', user_id)\
-        .order('month')\
-        .execute()
-    return response.data if response.data else []
+    cached = _balances_cache.get(user_id)
+    if cached is MISSING:
+        generation = _balances_cache.generation()
+        cached = get_backend().list_balances(user_id)
+        _balances_cache.set(user_id, cached, generation=generation)
+    return [dict(b) for b in cached]
 
-def get_opening(month, account_id, user_id):
+def _month_value(month):
     """
-    Get opening balance for a specific month (numeric) and account.
-    Automatically converts month names like 'November' → 11.
+    Convert a month name ('November'), numeric string ('11'), date or int
+    to the month number 1–12. Returns None if it can't be converted.
     """
-    supabase = get_supabase_client()
-
     # Convert month name or date to integer (1–12)
     months = [
         'January','February','March','April','May','June',
@@ -28,82 +35,135 @@ def get_opening(month, account_id, user_id):
     if isinstance(month, str):
         # Try to convert month name to number
         if month.capitalize() in months:
-            month_value = months.index(month.capitalize()) + 1
-        else:
-            # If already numeric string like "11"
-            try:
-                month_value = int(month)
-            except ValueError:
-                month_value = None
+            return months.index(month.capitalize()) + 1
+        # If already numeric string like "11"
+        try:
+            return int(month)
+        except ValueError:
+            return None
     elif hasattr(month, "month"):
         # If passed a datetime/date
-        month_value = month.month
-    else:
-        month_value = int(month)
+        return month.month
+    return int(month)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
 
+def get_opening(month, account_id, user_id):
+    """
+    Get opening balance for a specific month (numeric) and account.
+    Automatically converts month names like 'November' → 11.
+    """
+    month_value = _month_value(month)
     if month_value is None:
-        print(f"⚠️ Invalid month value: {month}")
+        logger.warning("Invalid month value: %r", month)
         return 0.0
 
-    response = (
-        supabase.table("balances")
-        .select("opening")
-        .eq("month", month_value)
-        .eq("account_id", account_id)
-        .eq("user_id", user_id)
-        .order("id", desc=True)
-        .limit(1)
-        .execute()
-    )
-
-    if response.data and len(response.data) > 0:
-        try:
-            return float(response.data[0].get("opening", 0.0))
-        except (TypeError, ValueError):
-            return 0.0
+    row = get_backend().get_opening(month_value, account_id, user_id)
+    if row:
+        return _to_float(row.get("opening", 0.0))
     else:
         return 0.0
 
 
+def get_openings_for_months(months, user_id):
+    """
+    Get opening balances of all accounts for several months in one query.
+    Returns {month_number: {account_id: opening}}; accounts without a
+    balance are simply absent.
+    """
+    month_values = []
+    for month in months:
+        value = _month_value(month)
+        if value is None:
+            logger.warning("Invalid month value: %r", month)
+        elif value not in month_values:
+            month_values.append(value)
+    openings = {m: {} for m in month_values}
+    if not month_values:
+        return openings
+
+    rows = get_backend().list_openings(user_id, month_values)
+
+    # Rows come oldest first, so the latest record per account wins
+    # (same rule as get_opening).
+    for row in rows:
+        month_value = _month_value(row.get("month"))
+        if month_value in openings:
+            openings[month_value][row.get("account_id")] = _to_float(row.get("opening", 0.0))
+    return openings
+
+
+def get_openings(month, user_id):
+    """
+    Get opening balances of all accounts for one month in one query.
+    Returns {account_id: opening}.
+    """
+    month_value = _month_value(month)
+    if month_value is None:
+        logger.warning("Invalid month value: %r", month)
+        return {}
+    return get_openings_for_months([month_value], user_id)[month_value]
+
+
+def get_openings_cached(month, user_id):
+    """
+    Same as get_openings(), served from the openings cache when possible.
+    """
+    month_value = _month_value(month)
+    if month_value is None:
+        logger.warning("Invalid month value: %r", month)
+        return {}
+    openings = _openings_cache.get(user_id, month_value)
+    if openings is MISSING:
+        generation = _openings_cache.generation()
+        openings = get_openings(month_value, user_id)
+        _openings_cache.set(user_id, openings, month_value, generation=generation)
+    return dict(openings)
+
+
+def invalidate_openings(user_id=None, month=None):
+    """
+    Forget cached openings (and balance lists) for a user's month, a whole
+    user, or everyone.
+    """
+    _balances_cache.invalidate(user_id)
+    if user_id is not None and month is not None:
+        _openings_cache.invalidate(user_id, _month_value(month))
+    else:
+        _openings_cache.invalidate(user_id)
+
+
+def openings_cached(month, user_id):
+    """
+    True if get_openings_cached() would be answered from the cache.
+    """
+    return _openings_cache.contains(user_id, _month_value(month))
+
+
+def openings_cache_stats():
+    """
+    Hit/miss counters, entries and bytes of the openings cache.
+    """
+    return _openings_cache.stats()
+
+
 
 def set_opening(month, account_id, opening, user_id):
     """
     Set opening balance for a specific month and account
     """
-    supabase = get_supabase_client()
-    
     # Convert month to number if it's a name
     from core.utils import MONTHS
     if isinstance(month, str) and month in MONTHS:
         month = str(MONTHS.index(month) + 1)
     
-    # First check if a record exists
-    response = supabase.table('balances')\
-        .select('id')\
-        .eq('month', month)\
-        .eq('account_id', account_id)\
-        .eq('user_id', user_id)\
-        .execute()
-    
-    data = {
-        'month': month,
-        'account_id': account_id,
-        'user_id': user_id,
-        'opening': float(opening)
-    }
-    
-    if response.data:
-        # Update existing record
-        response = supabase.table('balances')\
-            .update(data)\
-            .eq('month', month)\
-            .eq('account_id', account_id)\
-            .eq('user_id', user_id)\
-            .execute()
-    else:
-        # Insert new record
-        response = supabase.table('balances')\
-            .insert(data)\
-            .execute()
+    result = get_backend().save_opening(month, account_id, user_id, opening)
+    invalidate_openings(user_id, month)
     
-    return response.data[0] if response.data else None
+    return result
@@ -0,0 +1,261 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pandas as pd
+
+# Returned by SharedCache.get() / CacheNamespace.get() when a key is
+# absent or expired
+MISSING = object()
+
+
+# Budget of the process-wide cache shared by every session, and the share
+# one user may take of it
+CACHE_MAX_BYTES = int(float(os.environ.get("MONEYMAGIC_CACHE_MB", "256")) * 1024 * 1024)
+CACHE_USER_MAX_BYTES = int(float(os.environ.get("MONEYMAGIC_CACHE_USER_MB", "32")) * 1024 * 1024)
+
+
+def estimate_size(value):
+    """
+    Approximate memory held by a cached value, in bytes.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(getattr(value, 'nbytes', None), int):
+        # numpy arrays and objects that measure themselves (core.ledger.Ledger)
+        return value.nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(v) for v in value)
+    return size
+
+
+@dataclass
+class _Entry:
+    value: object
+    expires: float
+    size: int
+
+
+class SharedCache:
+    """
+    Process-wide LRU cache for the core read functions, shared by all
+    sessions and partitioned per user. Entries live in named namespaces
+    with their own TTL; the total size is capped at max_bytes and each
+    user at user_max_bytes (a user over their share evicts their own
+    oldest entries first). Values too big for a user's share are not
+    cached at all.
+
+    A read that races a write passes the generation() it saw before
+    reading to set(); if the entry was invalidated meanwhile, the value
+    (read before the write) is not stored.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, user_max_bytes=CACHE_USER_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.user_max_bytes = min(user_max_bytes, max_bytes)
+        self.bytes = 0
+        self.evictions = 0
+        self._data = OrderedDict()  # (namespace, user_id, key) -> _Entry
+        self._users = {}            # user_id -> OrderedDict of their keys, oldest first
+        self._user_bytes = {}
+        self._counters = {}         # namespace -> {'hits': n, 'misses': n}
+        self._generation = 0
+        # (namespace, user_id) -> generation of its last invalidation;
+        # None stands for every namespace / every user
+        self._invalidated = {}
+        self._lock = threading.Lock()
+
+    def namespace(self, name, ttl):
+        return CacheNamespace(self, name, ttl)
+
+    def _count(self, namespace, counter):
+        counters = self._counters.setdefault(namespace, {'hits': 0, 'misses': 0})
+        counters[counter] += 1
+
+    def _drop(self, full_key):
+        entry = self._data.pop(full_key)
+        user_id = full_key[1]
+        keys = self._users[user_id]
+        del keys[full_key]
+        self.bytes -= entry.size
+        self._user_bytes[user_id] -= entry.size
+        if not keys:
+            del self._users[user_id]
+            del self._user_bytes[user_id]
+
+    def get(self, namespace, user_id, key=None):
+        full_key = (namespace, user_id, key)
+        with self._lock:
+            entry = self._data.get(full_key)
+            if entry is not None:
+                if entry.expires > time.monotonic():
+                    self._data.move_to_end(full_key)
+                    self._users[user_id].move_to_end(full_key)
+                    self._count(namespace, 'hits')
+                    return entry.value
+                self._drop(full_key)
+            self._count(namespace, 'misses')
+            return MISSING
+
+    def contains(self, namespace, user_id, key=None):
+        """
+        True if a live entry exists; unlike get() it is not counted as a
+        hit or miss and does not refresh the entry's LRU position.
+        """
+        with self._lock:
+            entry = self._data.get((namespace, user_id, key))
+            return entry is not None and entry.expires > time.monotonic()
+
+    def user_bytes(self, user_id):
+        with self._lock:
+            return self._user_bytes.get(user_id, 0)
+
+    def generation(self):
+        """
+        Current invalidation count; see set().
+        """
+        with self._lock:
+            return self._generation
+
+    def _invalidated_since(self, namespace, user_id, generation):
+        scopes = ((namespace, user_id), (None, user_id), (namespace, None), (None, None))
+        return any(self._invalidated.get(scope, 0) > generation for scope in scopes)
+
+    def set(self, namespace, user_id, key, value, ttl, size=None, generation=None):
+        full_key = (namespace, user_id, key)
+        size = estimate_size(value) if size is None else size
+        with self._lock:
+            if generation is not None and self._invalidated_since(namespace, user_id, generation):
+                return
+            if full_key in self._data:
+                self._drop(full_key)
+            if size > self.user_max_bytes:
+                return
+            user_keys = self._users.get(user_id)
+            while user_keys and self._user_bytes[user_id] + size > self.user_max_bytes:
+                self._drop(next(iter(user_keys)))
+                self.evictions += 1
+                user_keys = self._users.get(user_id)
+            while self._data and self.bytes + size > self.max_bytes:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+            self._data[full_key] = _Entry(value, time.monotonic() + ttl, size)
+            self._users.setdefault(user_id, OrderedDict())[full_key] = None
+            self._user_bytes[user_id] = self._user_bytes.get(user_id, 0) + size
+            self.bytes += size
+
+    def invalidate(self, namespace=None, user_id=None, key=None, all_users=False):
+        """
+        Drop matching entries: one key of a user, a user's namespace, all
+        of a user's entries (namespace=None), or with all_users=True a
+        namespace (or everything) for every user.
+        """
+        with self._lock:
+            self._generation += 1
+            self._invalidated[(namespace, None if all_users else user_id)] = self._generation
+            if all_users:
+                candidates = list(self._data)
+            else:
+                candidates = list(self._users.get(user_id, ()))
+            for full_key in candidates:
+                ns, _, k = full_key
+                if namespace is not None and ns != namespace:
+                    continue
+                if key is not None and k != key:
+                    continue
+                self._drop(full_key)
+
+    def stats(self, namespace=None):
+        """
+        Entries, bytes, evictions and hit/miss counters, overall or for
+        one namespace.
+        """
+        with self._lock:
+            if namespace is not None:
+                entries = [e for k, e in self._data.items() if k[0] == namespace]
+                counters = self._counters.get(namespace, {'hits': 0, 'misses': 0})
+                return {
+                    **counters,
+                    'entries': len(entries),
+                    'bytes': sum(e.size for e in entries),
+                }
+            return {
+                'hits': sum(c['hits'] for c in self._counters.values()),
+                'misses': sum(c['misses'] for c in self._counters.values()),
+                'entries': len(self._data),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'users': len(self._users),
+                'evictions': self.evictions,
+            }
+
+    def namespaces(self):
+        with self._lock:
+            return sorted({k[0] for k in self._data} | set(self._counters), key=str)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._invalidated = {(None, None): self._generation}
+            self._data.clear()
+            self._users.clear()
+            self._user_bytes.clear()
+            self.bytes = 0
+
+
+class CacheNamespace:
+    """
+    One named part of a SharedCache with its own TTL; values are stored
+    per user, optionally under a key.
+    """
+
+    def __init__(self, cache, name, ttl):
+        self.cache = cache
+        self.name = name
+        self.ttl = ttl
+
+    def get(self, user_id, key=None):
+        return self.cache.get(self.name, user_id, key)
+
+    def contains(self, user_id, key=None):
+        return self.cache.contains(self.name, user_id, key)
+
+    def generation(self):
+        return self.cache.generation()
+
+    def set(self, user_id, value, key=None, size=None, generation=None):
+        """
+        Store a value; `size` overrides the estimated size in bytes. With
+        the `generation` taken before the value was read, the value is
+        dropped if the user's entries were invalidated since.
+        """
+        self.cache.set(self.name, user_id, key, value, self.ttl, size, generation)
+
+    def invalidate(self, user_id=None, key=None):
+        """
+        Drop one key of a user, all of a user's values, or (user_id=None)
+        the whole namespace.
+        """
+        self.cache.invalidate(self.name, user_id, key, all_users=user_id is None)
+
+    def stats(self):
+        return self.cache.stats(self.name)
+
+
+shared_cache = SharedCache()
+
+
+def cache_stats():
+    """
+    Stats of the shared cache, overall and per namespace.
+    """
+    return {
+        'total': shared_cache.stats(),
+        'namespaces': {name: shared_cache.stats(name) for name in shared_cache.namespaces()},
+    }
@@ -0,0 +1,145 @@
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+import pandas as pd
+
+from core.transactions import (
+    add_transactions,
+    delete_transactions_by_uuid,
+    tx_record,
+    upsert_transactions,
+)
+from core.writeback import enqueue
+
+# Columns of the transactions grid that the user can change
+EDITABLE_COLUMNS = ["Date", "Account", "Category", "Description", "Type", "Amount"]
+
+
+@dataclass
+class ChangeSet:
+    """
+    Difference between the transactions grid as loaded and as edited.
+    `updated` and `added` are frames in the grid's column layout,
+    `deleted` holds the removed Transaction_IDs.
+    """
+    updated: pd.DataFrame
+    added: pd.DataFrame
+    deleted: List[str] = field(default_factory=list)
+
+    def is_empty(self):
+        return self.updated.empty and self.added.empty and not self.deleted
+
+
+@dataclass
+class SaveReport:
+    updated: int = 0
+    added: int = 0
+    deleted: int = 0
+    seconds: float = 0.0
+
+    @property
+    def touched(self):
+        return self.updated + self.added + self.deleted
+
+
+def _normalise(df):
+    """
+    Bring a grid frame to comparable dtypes: string ids, date objects,
+    float amounts and plain (non-categorical) text.
+    """
+    out = df.reindex(columns=["Transaction_ID"] + EDITABLE_COLUMNS).copy()
+    out["Transaction_ID"] = out["Transaction_ID"].astype(object).fillna("").astype(str)
+    out["Date"] = pd.to_datetime(out["Date"], errors="coerce").dt.date
+    out["Amount"] = pd.to_numeric(out["Amount"], errors="coerce").fillna(0.0).astype(float)
+    for col in ["Account", "Category", "Description", "Type"]:
+        out[col] = out[col].astype(object).where(out[col].notna(), None)
+    return out
+
+
+def diff_transactions(original, edited):
+    """
+    Compare the frame given to st.data_editor with the one it returned.
+    Rows without a Transaction_ID are new, ids that disappeared were
+    deleted, and rows whose editable columns differ were updated.
+    """
+    before = _normalise(original)
+    after = _normalise(edited)
+
+    is_new = after["Transaction_ID"] == ""
+    added = after[is_new]
+    kept = after[~is_new].drop_duplicates("Transaction_ID").set_index("Transaction_ID")
+    before = before.drop_duplicates("Transaction_ID").set_index("Transaction_ID")
+
+    deleted = before.index.difference(kept.index).tolist()
+    common = kept.index.intersection(before.index)
+    new_values = kept.loc[common, EDITABLE_COLUMNS]
+    old_values = before.loc[common, EDITABLE_COLUMNS]
+    # Two missing values count as equal
+    differs = (new_values != old_values) & ~(new_values.isna() & old_values.isna())
+    updated = kept.loc[common[differs.any(axis=1).to_numpy()]].reset_index()
+
+    return ChangeSet(updated=updated, added=added.reset_index(drop=True), deleted=deleted)
+
+
+def _records(df, account_ids, user_id):
+    records = []
+    for row in df.itertuples(index=False):
+        record = tx_record(
+            row.Date,
+            account_ids.get(row.Account),
+            row.Category or "",
+            row.Description or "",
+            row.Type or "Expense",
+            row.Amount,
+            user_id,
+        )
+        if row.Transaction_ID:
+            record['tx_uuid'] = row.Transaction_ID
+        records.append(record)
+    return records
+
+
+def apply_changeset(changes, accounts, user_id):
+    """
+    Persist a ChangeSet with one bulk request per kind of change:
+    a single `in` delete, a single upsert and a single insert.
+    Returns a SaveReport with row counts and elapsed time.
+    """
+    started = time.perf_counter()
+    account_ids = {a['name']: a['id'] for a in accounts}
+    report = SaveReport()
+
+    if changes.deleted:
+        delete_transactions_by_uuid(changes.deleted)
+        report.deleted = len(changes.deleted)
+    if not changes.updated.empty:
+        upsert_transactions(_records(changes.updated, account_ids, user_id))
+        report.updated = len(changes.updated)
+    if not changes.added.empty:
+        add_transactions(_records(changes.added, account_ids, user_id))
+        report.added = len(changes.added)
+
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def queue_changeset(changes, accounts, user_id):
+    """
+    Queue a ChangeSet on the write-behind queue (core.writeback) instead
+    of writing it: returns at once with a SaveReport of the rows queued.
+    """
+    started = time.perf_counter()
+    account_ids = {a['name']: a['id'] for a in accounts}
+    rows = []
+    for frame in (changes.updated, changes.added):
+        for record, name in zip(_records(frame, account_ids, user_id), frame["Account"]):
+            record['accounts'] = {'name': name} if name else None
+            rows.append(record)
+    enqueue(rows, changes.deleted, user_id=user_id)
+    return SaveReport(
+        updated=len(changes.updated),
+        added=len(changes.added),
+        deleted=len(changes.deleted),
+        seconds=time.perf_counter() - started,
+    )
@@ -1,21 +1,156 @@
 import os
+import threading
 from dotenv import load_dotenv
 
 load_dotenv("moneymagic.env")
-# Supabase Python client (supabase-py)
-try:
-	from supabase import create_client  # type: ignore
-except Exception:
-	create_client = None
+# supabase-py and httpx take a few hundred milliseconds to import, so they
+# are loaded on first client creation (see _supabase_api), not with this
+# module; the login page can render before they are needed.
+_api = None
 
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
+
+# Connection tuning (seconds / number of connections)
+SUPABASE_TIMEOUT = float(os.environ.get("SUPABASE_TIMEOUT", "10"))
+SUPABASE_POOL_SIZE = int(os.environ.get("SUPABASE_POOL_SIZE", "10"))
+
+_lock = threading.Lock()
 supabase = None
+_auth_client = None
 
-def get_supabase_client():
-    if create_client and SUPABASE_URL and SUPABASE_KEY:
+
+def _supabase_api():
+    """
+    (create_client, ClientOptions, httpx), imported on first call; each is
+    None when it is not importable.
+    """
+    global _api
+    if _api is None:
+        try:
+            from supabase import create_client  # type: ignore
+        except Exception:
+            create_client = None
         try:
-            supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+            from supabase.lib.client_options import SyncClientOptions as ClientOptions  # type: ignore
         except Exception:
-            supabase = None
-    return supabase
\ No newline at end of file
+            try:
+                from supabase.lib.client_options import ClientOptions  # type: ignore
+            except Exception:
+                ClientOptions = None
+        try:
+            import httpx  # type: ignore
+        except Exception:
+            httpx = None
+        _api = (create_client, ClientOptions, httpx)
+    return _api
+
+
+def _http_client():
+    """
+    Shared keep-alive HTTP session used by the PostgREST client.
+    Returns None when httpx is not importable.
+    """
+    httpx = _supabase_api()[2]
+    if httpx is None:
+        return None
+    limits = httpx.Limits(
+        max_connections=SUPABASE_POOL_SIZE,
+        max_keepalive_connections=SUPABASE_POOL_SIZE,
+    )
+    return httpx.Client(timeout=SUPABASE_TIMEOUT, limits=limits)
+
+
+def _client_options():
+    """
+    Options for server-side clients: no session persistence or token refresh,
+    the configured timeouts and, where supabase-py supports it, a pooled
+    keep-alive HTTP session.
+    """
+    ClientOptions = _supabase_api()[1]
+    if ClientOptions is None:
+        return None
+    kwargs = {
+        'postgrest_client_timeout': SUPABASE_TIMEOUT,
+        'storage_client_timeout': SUPABASE_TIMEOUT,
+        'auto_refresh_token': False,
+        'persist_session': False,
+    }
+    http_client = _http_client()
+    if http_client is not None:
+        try:
+            return ClientOptions(httpx_client=http_client, **kwargs)
+        except TypeError:
+            # Older supabase-py without the httpx_client option
+            http_client.close()
+    try:
+        return ClientOptions(**kwargs)
+    except TypeError:
+        return None
+
+
+def create_supabase_client():
+    """
+    Build a new Supabase client, or None if it is not configured.
+    Prefer get_supabase_client() which reuses one client per process.
+    """
+    if not (SUPABASE_URL and SUPABASE_KEY):
+        return None
+    create_client = _supabase_api()[0]
+    if create_client is None:
+        return None
+    options = _client_options()
+    try:
+        if options is not None:
+            return create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+        return create_client(SUPABASE_URL, SUPABASE_KEY)
+    except Exception:
+        return None
+
+
+def get_supabase_client():
+    """
+    Return the process-wide Supabase client used for data access.
+    The client is created lazily on first use and then shared by every
+    session, so its HTTP connections stay alive between reruns.
+    """
+    global supabase
+    if supabase is None:
+        with _lock:
+            if supabase is None:
+                supabase = create_supabase_client()
+    return supabase
+
+
+def get_auth_client():
+    """
+    Return the client used for sign-in / sign-up.
+    Kept apart from the data client so an auth session never changes the
+    headers that shared data queries are sent with.
+    """
+    global _auth_client
+    if _auth_client is None:
+        with _lock:
+            if _auth_client is None:
+                _auth_client = create_supabase_client()
+    return _auth_client
+
+
+def _close_client(client):
+    try:
+        client.postgrest.session.close()
+    except Exception:
+        pass
+
+
+def reset_clients():
+    """
+    Close and forget every cached client (e.g. after changing credentials).
+    """
+    global supabase, _auth_client
+    with _lock:
+        for client in [supabase, _auth_client]:
+            if client is not None:
+                _close_client(client)
+        supabase = None
+        _auth_client = None
@@ -0,0 +1,213 @@
+"""
+Export of a user's data (transactions, accounts and opening balances) to
+CSV or Parquet.
+
+Transactions are read with the same keyset pagination as
+fetch_transactions_paged and every page is written out before the next is
+requested, so memory use depends on the page size, not on the length of
+the history. Parquet files get typed columns and one row group per page;
+pyarrow is only needed for Parquet.
+
+    python -m core.export --user <user id> --format parquet --output backup.zip
+
+From the app, export_archive() writes all three tables into one ZIP.
+"""
+import argparse
+import csv
+import datetime
+import io
+import os
+import time
+import zipfile
+from dataclasses import dataclass, field
+
+from core.storage import get_backend
+from core.transactions import iter_transaction_pages
+
+# Rows per page; larger values are capped at the backend's row limit
+# (1000 on Supabase) by iter_transaction_pages
+EXPORT_PAGE_SIZE = int(os.environ.get("MONEYMAGIC_EXPORT_PAGE_SIZE", "1000"))
+FORMATS = ["csv", "parquet"]
+TABLES = ["transactions", "accounts", "balances"]
+
+COLUMNS = {
+    'transactions': ['tx_uuid', 'date', 'account_id', 'account', 'category', 'description', 'type', 'amount'],
+    'accounts': ['id', 'name', 'type', 'notes'],
+    'balances': ['id', 'month', 'account_id', 'opening'],
+}
+
+
+@dataclass
+class ExportReport:
+    format: str
+    rows: dict = field(default_factory=dict)  # table -> rows written
+    bytes: int = 0
+    seconds: float = 0.0
+
+
+def iter_table_pages(table, user_id, page_size=None):
+    """
+    Yield a table's rows for one user in pages, each row a tuple in
+    COLUMNS[table] order.
+    """
+    columns = COLUMNS[table]
+    if table == 'transactions':
+        for page in iter_transaction_pages(user_id=user_id, page_size=page_size or EXPORT_PAGE_SIZE):
+            yield [
+                (r['tx_uuid'], r['date'], r['account_id'], (r.get('accounts') or {}).get('name'),
+                 r['category'], r['description'], r['type'], r['amount'])
+                for r in page
+            ]
+        return
+    backend = get_backend()
+    if table == 'accounts':
+        rows = backend.list_accounts(user_id)
+    elif table == 'balances':
+        rows = backend.list_balances(user_id)
+    else:
+        raise Exception(f"Unknown table {table!r} (expected one of {TABLES})")
+    # Accounts and balances are a few rows per account and month
+    if rows:
+        yield [tuple(row.get(c) for c in columns) for row in rows]
+
+
+def write_csv(table, user_id, fh, page_size=None):
+    """
+    Write one table as CSV (with a header row) to a binary file object.
+    Returns the number of rows written.
+    """
+    text = io.TextIOWrapper(fh, encoding="utf-8", newline="", write_through=True)
+    try:
+        writer = csv.writer(text)
+        writer.writerow(COLUMNS[table])
+        count = 0
+        for page in iter_table_pages(table, user_id, page_size):
+            writer.writerows(page)
+            count += len(page)
+        text.flush()
+    finally:
+        # Leave fh open for the caller
+        text.detach()
+    return count
+
+
+def _parquet_schema(table):
+    import pyarrow as pa
+
+    return {
+        'transactions': pa.schema([
+            ('tx_uuid', pa.string()),
+            ('date', pa.date32()),
+            ('account_id', pa.int64()),
+            ('account', pa.dictionary(pa.int32(), pa.string())),
+            ('category', pa.dictionary(pa.int32(), pa.string())),
+            ('description', pa.string()),
+            ('type', pa.dictionary(pa.int8(), pa.string())),
+            ('amount', pa.float64()),
+        ]),
+        'accounts': pa.schema([
+            ('id', pa.int64()),
+            ('name', pa.string()),
+            ('type', pa.string()),
+            ('notes', pa.string()),
+        ]),
+        'balances': pa.schema([
+            ('id', pa.int64()),
+            ('month', pa.int32()),
+            ('account_id', pa.int64()),
+            ('opening', pa.float64()),
+        ]),
+    }[table]
+
+
+def _parquet_batch(page, schema):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    arrays = []
+    for f, values in zip(schema, zip(*page)):
+        if pa.types.is_dictionary(f.type):
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode().cast(f.type))
+        elif pa.types.is_date(f.type):
+            # ISO dates, possibly with a time part
+            arrays.append(pc.utf8_slice_codeunits(pa.array(values, type=pa.string()), 0, 10).cast(f.type))
+        else:
+            arrays.append(pa.array(values, type=f.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_parquet(table, user_id, fh, page_size=None):
+    """
+    Write one table as Parquet to a binary file object (or path), one
+    row group per page. Needs pyarrow. Returns the number of rows written.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise Exception("Parquet export needs pyarrow (pip install pyarrow)")
+
+    schema = _parquet_schema(table)
+    count = 0
+    with pq.ParquetWriter(fh, schema, compression="zstd") as writer:
+        for page in iter_table_pages(table, user_id, page_size):
+            writer.write_batch(_parquet_batch(page, schema))
+            count += len(page)
+    return count
+
+
+WRITERS = {'csv': write_csv, 'parquet': write_parquet}
+
+
+def export_archive(user_id, fh, fmt="csv", tables=None, page_size=None):
+    """
+    Write the chosen tables (default: all) into a ZIP on a binary file
+    object, one <table>.<fmt> member each. Returns an ExportReport.
+    """
+    if fmt not in WRITERS:
+        raise Exception(f"Unknown export format {fmt!r} (expected one of {FORMATS})")
+    started = time.perf_counter()
+    report = ExportReport(format=fmt)
+    # Parquet members are already compressed
+    compression = zipfile.ZIP_DEFLATED if fmt == "csv" else zipfile.ZIP_STORED
+    with zipfile.ZipFile(fh, "w", compression=compression) as archive:
+        for table in tables or TABLES:
+            with archive.open(f"{table}.{fmt}", "w", force_zip64=True) as member:
+                report.rows[table] = WRITERS[fmt](table, user_id, member, page_size)
+    report.bytes = fh.tell() if fh.seekable() else 0
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def export_file(user_id, fmt="csv", tables=None, page_size=None):
+    """
+    export_archive() as bytes, for st.download_button (which keeps the
+    whole download in memory anyway). Use export_archive() with a real
+    file to stream large exports to disk.
+    """
+    buffer = io.BytesIO()
+    export_archive(user_id, buffer, fmt, tables, page_size)
+    return buffer.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.export", description=__doc__.split("\n")[1])
+    parser.add_argument("--user", required=True, help="user id whose data is exported")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--tables", help=f"comma-separated subset of {','.join(TABLES)}")
+    parser.add_argument("--page-size", type=int, default=EXPORT_PAGE_SIZE)
+    parser.add_argument("--output", help="ZIP file to write (default: moneymagic-export-<date>.zip)")
+    args = parser.parse_args(argv)
+
+    output = args.output or f"moneymagic-export-{datetime.date.today().isoformat()}.zip"
+    with open(output, "wb") as fh:
+        report = export_archive(
+            args.user, fh, args.format,
+            tables=args.tables.split(",") if args.tables else None,
+            page_size=args.page_size,
+        )
+    rows = ", ".join(f"{n} {table}" for table, n in report.rows.items())
+    print(f"Wrote {rows} to {output} ({report.bytes / 1024:.0f} KB) in {report.seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+"""
+Bulk import of bank statements (CSV, OFX/QFX and QIF) into one account.
+
+The statement is read as a stream, one row at a time, so memory stays flat
+however long it is. Every row is mapped to date / description / amount /
+type, validated, and checked against the account's existing transactions
+by a content hash before it is queued; queued rows are written with
+add_transactions() in batches of IMPORT_BATCH_SIZE, so a year's statement
+costs a few dozen round trips rather than one per row.
+
+    with open("statement.csv", "rb") as fh:
+        report = import_statement(fh, account_id, user_id, name="statement.csv")
+
+Re-importing the same statement (or an overlapping one) inserts nothing
+twice: a row is a duplicate when the account already holds a row with the
+same date, amount, type and description. Identical rows inside one
+statement are all kept, as long as the account does not already have as
+many of them.
+"""
+import csv
+import datetime
+import hashlib
+import io
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from core.transactions import add_transactions, iter_transaction_pages, tx_record
+
+IMPORT_BATCH_SIZE = int(os.environ.get("MONEYMAGIC_IMPORT_BATCH", "500"))
+DEFAULT_CATEGORY = "Other"
+
+FORMATS = ["csv", "ofx", "qif"]
+_EXTENSIONS = {'.csv': 'csv', '.txt': 'csv', '.ofx': 'ofx', '.qfx': 'ofx', '.qif': 'qif'}
+
+# Day-first formats come first for CSV exports of Indian banks; QIF is
+# month-first by convention.
+CSV_DATE_FORMATS = [
+    "%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y", "%d-%m-%y",
+    "%d-%b-%Y", "%d %b %Y", "%d-%b-%y", "%d %b %y", "%d %B %Y", "%m/%d/%Y",
+]
+QIF_DATE_FORMATS = ["%m/%d/%Y", "%m/%d/%y", "%d/%m/%Y", "%d/%m/%y", "%Y-%m-%d"]
+
+# Header names recognised by detect_mapping (compared lower-case, without
+# punctuation)
+HEADER_ALIASES = {
+    'date': ["date", "transaction date", "txn date", "tran date", "posting date", "value date", "value dt"],
+    'description': ["description", "narration", "particulars", "details", "remarks",
+                    "transaction remarks", "memo", "payee"],
+    'amount': ["amount", "transaction amount", "amount inr", "amt"],
+    'debit': ["debit", "withdrawal", "withdrawal amt", "withdrawal amount", "debit amount", "dr", "paid out"],
+    'credit': ["credit", "deposit", "deposit amt", "deposit amount", "credit amount", "cr", "paid in"],
+    'type': ["type", "dr cr", "cr dr", "transaction type"],
+    'category': ["category"],
+}
+
+
+class StatementError(Exception):
+    """
+    The statement as a whole cannot be read (unknown format, no usable
+    header). Problems with single rows are reported, not raised.
+    """
+
+
+@dataclass
+class ColumnMapping:
+    """
+    Which CSV columns hold what. Give either `amount` (signed: negative is
+    an expense) or `debit` and/or `credit` (unsigned).
+    """
+    date: str
+    description: str
+    amount: Optional[str] = None
+    debit: Optional[str] = None
+    credit: Optional[str] = None
+    type: Optional[str] = None
+    category: Optional[str] = None
+    date_format: Optional[str] = None
+    # For statements (e.g. credit cards) where charges are positive
+    invert_sign: bool = False
+
+
+@dataclass
+class StatementRow:
+    line: int
+    date: datetime.date
+    description: str
+    amount: float  # positive
+    type: str      # "Expense" / "Income"
+    category: Optional[str] = None
+
+    def content_hash(self):
+        return content_hash(self.date, self.amount, self.type, self.description)
+
+
+@dataclass
+class ImportReport:
+    read: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: List[tuple] = field(default_factory=list)  # (line, message)
+    batches: int = 0
+    bytes_read: int = 0
+    seconds: float = 0.0
+    dry_run: bool = False
+
+
+def content_hash(date, amount, tx_type, description):
+    """
+    Identity of a transaction for de-duplication: date, amount in paise,
+    type and the description with case and whitespace folded.
+    """
+    day = str(date)[:10]
+    paise = int(round(float(amount) * 100))
+    text = " ".join(str(description or "").lower().split())
+    return hashlib.sha1(f"{day}|{paise}|{tx_type}|{text}".encode()).hexdigest()
+
+
+# ------------- Parsing helpers -------------
+
+def _key(name):
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", str(name).lower()).split())
+
+
+def parse_amount(value):
+    """
+    Float from a statement amount: currency symbols and thousands
+    separators are dropped, "(12.50)" and "12.50 Dr" are negative.
+    None when the cell is empty.
+    """
+    text = str(value or "").strip()
+    if not text:
+        return None
+    sign = 1
+    upper = text.upper()
+    if upper.endswith("DR"):
+        sign, text = -1, text[:-2]
+    elif upper.endswith("CR"):
+        text = text[:-2]
+    text = text.strip()
+    if text.startswith("(") and text.endswith(")"):
+        sign, text = -sign, text[1:-1]
+    text = re.sub(r"[^0-9.\-+]", "", text)
+    if text in ("", "-", "+", "."):
+        raise ValueError(f"not an amount: {value!r}")
+    return sign * float(text)
+
+
+class _DateParser:
+    """
+    Parses dates with a fixed format, or with the first of `formats` that
+    fits; the format that worked is tried first next time.
+    """
+
+    def __init__(self, formats, fixed=None):
+        self.formats = [fixed] if fixed else list(formats)
+
+    def __call__(self, value):
+        text = str(value or "").strip().replace("'", "/")
+        for i, fmt in enumerate(self.formats):
+            try:
+                parsed = datetime.datetime.strptime(text, fmt).date()
+            except ValueError:
+                continue
+            if i:
+                self.formats.insert(0, self.formats.pop(i))
+            return parsed
+        raise ValueError(f"unrecognised date: {value!r}")
+
+
+def _type_of(signed_amount, label=None):
+    if label:
+        label = _key(label)
+        if label in ("dr", "debit", "d", "withdrawal", "expense"):
+            return "Expense"
+        if label in ("cr", "credit", "c", "deposit", "income"):
+            return "Income"
+    return "Expense" if signed_amount < 0 else "Income"
+
+
+class _CountingReader(io.RawIOBase):
+    """
+    Binary stream wrapper that counts the bytes read through it.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.count = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.raw.read(len(buffer))
+        n = len(data)
+        buffer[:n] = data
+        self.count += n
+        return n
+
+
+def _text(stream):
+    """
+    (text stream, byte counter) for a binary or text file object.
+    """
+    if isinstance(stream, io.TextIOBase):
+        return stream, None
+    counter = _CountingReader(stream)
+    reader = io.TextIOWrapper(io.BufferedReader(counter), encoding="utf-8-sig", errors="replace", newline="")
+    return reader, counter
+
+
+# ------------- Formats -------------
+
+def detect_format(name=None, head=""):
+    """
+    'csv', 'ofx' or 'qif' from a file name, else from its first bytes.
+    """
+    if name:
+        fmt = _EXTENSIONS.get(os.path.splitext(name)[1].lower())
+        if fmt:
+            return fmt
+    start = head.lstrip().upper()
+    if start.startswith("OFXHEADER") or start.startswith("<?XML") or "<OFX>" in start:
+        return "ofx"
+    if start.startswith("!TYPE") or start.startswith("!ACCOUNT"):
+        return "qif"
+    return "csv"
+
+
+def detect_mapping(header):
+    """
+    ColumnMapping guessed from a CSV header row, or None when no date,
+    description or amount column can be found.
+    """
+    by_key = {}
+    for name in header:
+        by_key.setdefault(_key(name), name)
+    found = {}
+    for field_name, aliases in HEADER_ALIASES.items():
+        for alias in aliases:
+            if alias in by_key and by_key[alias] not in found.values():
+                found[field_name] = by_key[alias]
+                break
+    if 'date' not in found or 'description' not in found:
+        return None
+    if 'amount' not in found and 'debit' not in found and 'credit' not in found:
+        return None
+    return ColumnMapping(**found)
+
+
+def csv_header(stream):
+    """
+    Column names of a CSV statement (first row), leaving the stream at
+    its start when it is seekable.
+    """
+    reader, counter = _text(stream)
+    header = next(csv.reader(reader), [])
+    if counter is not None:
+        # Hand the file back instead of letting the wrapper close it
+        reader.detach()
+    if hasattr(stream, "seek"):
+        stream.seek(0)
+    return [h.strip() for h in header]
+
+
+def iter_csv_rows(reader, mapping=None):
+    """
+    Yield StatementRow or (line, error message) for every data row of a
+    CSV statement.
+    """
+    rows = csv.reader(reader)
+    header = [h.strip() for h in next(rows, [])]
+    mapping = mapping or detect_mapping(header)
+    if mapping is None:
+        raise StatementError(f"Cannot tell the date, description and amount columns apart in {header}")
+    index = {name: i for i, name in enumerate(header)}
+    for name in [mapping.date, mapping.description, mapping.amount, mapping.debit,
+                 mapping.credit, mapping.type, mapping.category]:
+        if name is not None and name not in index:
+            raise StatementError(f"Column {name!r} is not in the statement header")
+    parse_date = _DateParser(CSV_DATE_FORMATS, mapping.date_format)
+
+    def cell(row, name):
+        if name is None:
+            return None
+        i = index[name]
+        return row[i].strip() if i < len(row) else None
+
+    for line, row in enumerate(rows, start=2):
+        if not any(c.strip() for c in row):
+            continue
+        try:
+            tx_date = parse_date(cell(row, mapping.date))
+            if mapping.amount is not None:
+                amount = parse_amount(cell(row, mapping.amount))
+            else:
+                debit = parse_amount(cell(row, mapping.debit)) or 0.0
+                credit = parse_amount(cell(row, mapping.credit)) or 0.0
+                amount = credit - abs(debit) if credit else -abs(debit)
+            if amount is None:
+                raise ValueError("no amount")
+            if mapping.invert_sign:
+                amount = -amount
+            tx_type = _type_of(amount, cell(row, mapping.type))
+        except ValueError as e:
+            yield line, str(e)
+            continue
+        yield StatementRow(line, tx_date, cell(row, mapping.description) or "", abs(amount), tx_type,
+                           cell(row, mapping.category) or None)
+
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def iter_ofx_rows(reader, chunk_size=65536):
+    """
+    Yield StatementRow or (n, error message) for every STMTTRN of an OFX
+    or QFX statement (SGML or XML flavour). n counts transactions.
+    """
+    buffer = ""
+    current = None
+    n = 0
+    while True:
+        chunk = reader.read(chunk_size)
+        buffer += chunk
+        # Keep a possibly incomplete trailing tag for the next round
+        cut = buffer.rfind("<") if chunk else len(buffer)
+        if cut == -1:
+            # No tag started yet: carry the whole buffer over
+            cut = 0
+        text, buffer = buffer[:cut], buffer[cut:]
+        for match in _OFX_TAG.finditer(text):
+            closing, tag, value = match.group(1), match.group(2).upper(), match.group(3).strip()
+            if tag == "STMTTRN":
+                if closing and current is not None:
+                    n += 1
+                    yield _ofx_row(n, current)
+                    current = None
+                elif not closing:
+                    current = {}
+            elif current is not None and not closing and value:
+                current[tag] = value
+        if not chunk:
+            return
+
+
+def _ofx_row(n, fields):
+    try:
+        posted = fields.get("DTPOSTED") or fields.get("DTUSER")
+        if not posted:
+            raise ValueError("no DTPOSTED")
+        tx_date = datetime.datetime.strptime(posted[:8], "%Y%m%d").date()
+        amount = parse_amount(fields.get("TRNAMT"))
+        if amount is None:
+            raise ValueError("no TRNAMT")
+    except ValueError as e:
+        return n, str(e)
+    description = " ".join(v for v in [fields.get("NAME"), fields.get("MEMO")] if v)
+    return StatementRow(n, tx_date, description, abs(amount), _type_of(amount))
+
+
+def iter_qif_rows(reader, date_format=None):
+    """
+    Yield StatementRow or (line, error message) for every record of a QIF
+    statement.
+    """
+    parse_date = _DateParser(QIF_DATE_FORMATS, date_format)
+    record, start = {}, None
+    for line, raw in enumerate(reader, start=1):
+        text = raw.rstrip("\r\n")
+        if not text or text.startswith("!"):
+            continue
+        code, value = text[0], text[1:].strip()
+        if code != "^":
+            if start is None:
+                start = line
+            record.setdefault(code, value)
+            continue
+        if record:
+            try:
+                tx_date = parse_date(record.get("D"))
+                amount = parse_amount(record.get("T") or record.get("U"))
+                if amount is None:
+                    raise ValueError("no amount")
+            except ValueError as e:
+                yield start, str(e)
+            else:
+                description = record.get("P") or record.get("M") or ""
+                yield StatementRow(start, tx_date, description, abs(amount), _type_of(amount),
+                                   record.get("L") or None)
+        record, start = {}, None
+
+
+# ------------- Import -------------
+
+class _ExistingRows:
+    """
+    Content hashes of the account's stored rows, loaded one month at a
+    time as the statement reaches it.
+    """
+
+    def __init__(self, account_id, user_id):
+        self.account_id = account_id
+        self.user_id = user_id
+        self.months = set()
+        self.hashes = Counter()
+
+    def claim(self, row):
+        """
+        True (and the stored row is used up) when the account already
+        holds a row with the same content.
+        """
+        month = row.date.strftime("%Y-%m")
+        if month not in self.months:
+            self.months.add(month)
+            first = row.date.replace(day=1)
+            last = (first.replace(day=28) + datetime.timedelta(days=4)).replace(day=1) - datetime.timedelta(days=1)
+            for page in iter_transaction_pages(
+                start_date=first.isoformat(), end_date=last.isoformat(),
+                account_ids=[self.account_id], user_id=self.user_id,
+            ):
+                self.hashes.update(
+                    content_hash(r['date'], r['amount'], r['type'], r.get('description')) for r in page
+                )
+        key = row.content_hash()
+        if self.hashes[key] > 0:
+            self.hashes[key] -= 1
+            return True
+        return False
+
+
+def iter_statement_rows(reader, fmt, mapping=None):
+    if fmt == "csv":
+        return iter_csv_rows(reader, mapping)
+    if fmt == "ofx":
+        return iter_ofx_rows(reader)
+    if fmt == "qif":
+        return iter_qif_rows(reader, mapping.date_format if mapping else None)
+    raise StatementError(f"Unsupported statement format {fmt!r} (expected one of {FORMATS})")
+
+
+def import_statement(
+    stream, account_id, user_id, name=None, fmt=None, mapping=None,
+    category=DEFAULT_CATEGORY, batch_size=None, progress=None, dry_run=False,
+):
+    """
+    Stream a statement into an account. `stream` is a binary (or text) file
+    object; the format comes from `fmt`, the file `name` or the content.
+    `progress(report)` is called after every batch. With dry_run nothing is
+    written but the report counts what would be. Returns an ImportReport.
+    """
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    report = ImportReport(dry_run=dry_run)
+    started = time.perf_counter()
+    reader, counter = _text(stream)
+    if fmt is None:
+        peek = reader.buffer.peek(512)[:512].decode("utf-8", "replace") if counter is not None else ""
+        fmt = detect_format(name, peek)
+    existing = _ExistingRows(account_id, user_id)
+    pending = []
+
+    def flush():
+        if pending and not dry_run:
+            add_transactions(pending)
+        report.inserted += len(pending)
+        report.batches += 1 if pending else 0
+        pending.clear()
+        report.bytes_read = counter.count if counter is not None else report.bytes_read
+        report.seconds = time.perf_counter() - started
+        if progress:
+            progress(report)
+
+    for item in iter_statement_rows(reader, fmt, mapping):
+        report.read += 1
+        if not isinstance(item, StatementRow):
+            report.invalid.append(item)
+            continue
+        if item.amount == 0:
+            report.invalid.append((item.line, "zero amount"))
+            continue
+        if existing.claim(item):
+            report.duplicates += 1
+            continue
+        pending.append(tx_record(
+            item.date, account_id, item.category or category, item.description,
+            item.type, item.amount, user_id,
+        ))
+        if len(pending) >= batch_size:
+            flush()
+    flush()
+    if counter is not None:
+        reader.detach()
+    return report
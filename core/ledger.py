@@ -0,0 +1,331 @@
+"""
+Compact columnar form of a set of transactions.
+
+The frame from fetch_transactions costs about 110 bytes a row: a Python
+date object per row, 36-character id strings and float amounts. A Ledger
+keeps the same rows as plain arrays:
+
+    date         int32 days since 1970-01-01
+    account      int16 code into .accounts    (-1 = missing)
+    category     int16 code into .categories
+    type         int8 code into .types
+    amount       int64 paise, so sums are exact
+    tx_uuid      16 raw bytes per id (strings if an id is not a UUID)
+    description  numpy variable-width strings
+
+which is under half the bytes, and filters and sums run on integers. The
+month cache holds Ledgers; views call to_frame() on the (filtered) rows
+they render.
+"""
+import datetime
+import sys
+from dataclasses import dataclass, fields
+
+import numpy as np
+import pandas as pd
+
+from core.aggregates import cube_from_codes
+
+EPOCH = datetime.date(1970, 1, 1)
+_STRINGS = np.dtypes.StringDType()
+# numpy stores strings up to this many bytes inside the array itself
+_INLINE_STRING = 15
+
+
+def _day(value):
+    """
+    Days since 1970-01-01 of a date, datetime or ISO string.
+    """
+    if not isinstance(value, datetime.date):
+        value = datetime.date.fromisoformat(str(value)[:10])
+    elif isinstance(value, datetime.datetime):
+        value = value.date()
+    return (value - EPOCH).days
+
+
+def _narrow(codes, size):
+    """
+    Codes in the smallest int type that holds a table of `size` labels.
+    """
+    for dtype in (np.int8, np.int16):
+        if size <= np.iinfo(dtype).max:
+            return codes.astype(dtype)
+    return codes
+
+
+def _code_column(values):
+    """
+    Small-int codes of a column of labels (-1 for None), and the lookup
+    table, in order of first appearance.
+    """
+    table = {}
+    codes = np.fromiter(
+        (-1 if v is None else table.setdefault(v, len(table)) for v in values),
+        dtype=np.int32, count=len(values),
+    )
+    return _narrow(codes, len(table)), tuple(table)
+
+
+def _uuid_column(values):
+    """
+    Ids as 16 raw bytes each when they are all lower-case UUID strings,
+    otherwise as strings.
+    """
+    joined = "".join(str(v).replace("-", "") for v in values)
+    if len(joined) == 32 * len(values) and joined == joined.lower():
+        try:
+            return np.frombuffer(bytes.fromhex(joined), dtype="S16")
+        except ValueError:
+            pass
+    return np.array([str(v) for v in values], dtype=_STRINGS)
+
+
+def _uuid_strings(column):
+    if column.dtype.kind != "S":
+        return column.astype(object)
+    h = column.tobytes().hex()
+    return np.array(
+        [f"{h[i:i + 8]}-{h[i + 8:i + 12]}-{h[i + 12:i + 16]}-{h[i + 16:i + 20]}-{h[i + 20:i + 32]}"
+         for i in range(0, len(h), 32)],
+        dtype=object,
+    )
+
+
+def _uuid_text(column):
+    """
+    Ids as a numpy string column, whichever way they are stored.
+    """
+    return np.array(_uuid_strings(column), dtype=_STRINGS)
+
+
+def _string_bytes(column):
+    """
+    Bytes of a numpy string array including the out-of-line storage of
+    long strings.
+    """
+    if column.dtype != _STRINGS or not len(column):
+        return column.nbytes
+    lengths = np.strings.str_len(column)
+    return column.nbytes + int(lengths[lengths > _INLINE_STRING].sum())
+
+
+# Coded columns and their lookup tables
+CODED = {'account': 'accounts', 'category': 'categories', 'type': 'types'}
+
+
+def _labels(table):
+    """
+    Cube labels for a lookup table: index 0 is missing, code c is c + 1.
+    """
+    labels = np.empty(len(table) + 1, dtype=object)
+    labels[1:] = table
+    return labels
+
+
+@dataclass
+class Ledger:
+    tx_uuid: np.ndarray
+    date: np.ndarray
+    account: np.ndarray
+    category: np.ndarray
+    type: np.ndarray
+    amount: np.ndarray
+    description: np.ndarray
+    accounts: tuple = ()
+    categories: tuple = ()
+    types: tuple = ()
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Ledger of backend transaction rows (with the accounts(name) join),
+        e.g. the pages of iter_transaction_pages. Rows are consumed one at
+        a time, so a generator is never held in full.
+        """
+        ids, dates, accounts, categories, types, amounts, descriptions = [], [], [], [], [], [], []
+        for row in records:
+            account = row.get('accounts')
+            ids.append(row['tx_uuid'])
+            dates.append(str(row['date'])[:10])
+            accounts.append(account.get('name') if account else None)
+            categories.append(row.get('category'))
+            types.append(row.get('type'))
+            amounts.append(row.get('amount'))
+            descriptions.append(row.get('description') or "")
+        account_codes, account_table = _code_column(accounts)
+        category_codes, category_table = _code_column(categories)
+        type_codes, type_table = _code_column(types)
+        paise = pd.to_numeric(pd.Series(amounts, dtype=object), errors='coerce').fillna(0.0).to_numpy(np.float64)
+        return cls(
+            tx_uuid=_uuid_column(ids),
+            date=np.array(dates, dtype="datetime64[D]").astype(np.int32),
+            account=account_codes,
+            category=category_codes,
+            type=type_codes,
+            amount=np.rint(paise * 100).astype(np.int64),
+            description=np.array(descriptions, dtype=_STRINGS),
+            accounts=account_table,
+            categories=category_table,
+            types=type_table,
+        )
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Ledger of a frame in the fetch_transactions layout.
+        """
+        return cls.from_records(
+            {
+                'tx_uuid': r.Transaction_ID, 'date': r.Date, 'accounts': {'name': r.Account},
+                'category': r.Category, 'type': r.Type, 'amount': r.Amount, 'description': r.Description,
+            }
+            for r in df.astype(object).where(df.notna(), None).itertuples(index=False)
+        )
+
+    @classmethod
+    def concat(cls, ledgers):
+        """
+        One Ledger of several, rows in order; lookup tables are merged and
+        the codes remapped.
+        """
+        ledgers = list(ledgers)
+        merged = {}
+        for name, table_name in CODED.items():
+            table = {}
+            columns = []
+            for ledger in ledgers:
+                # Position -1 of the remap keeps missing values at -1
+                remap = np.array(
+                    [table.setdefault(v, len(table)) for v in getattr(ledger, table_name)] + [-1], dtype=np.int32,
+                )
+                columns.append(remap[getattr(ledger, name)])
+            merged[name] = _narrow(np.concatenate(columns) if columns else np.empty(0, np.int32), len(table))
+            merged[table_name] = tuple(table)
+        ids = [ledger.tx_uuid for ledger in ledgers]
+        if any(column.dtype.kind != "S" for column in ids):
+            ids = [_uuid_text(column) for column in ids]
+        return cls(
+            tx_uuid=np.concatenate(ids) if ids else np.empty(0, "S16"),
+            date=np.concatenate([ledger.date for ledger in ledgers]).astype(np.int32),
+            amount=np.concatenate([ledger.amount for ledger in ledgers]).astype(np.int64),
+            description=np.concatenate([ledger.description for ledger in ledgers]).astype(_STRINGS),
+            **merged,
+        )
+
+    def __len__(self):
+        return len(self.date)
+
+    @property
+    def nbytes(self):
+        """
+        Memory held by the ledger, lookup tables included.
+        """
+        size = sum(getattr(self, f.name).nbytes for f in fields(self) if f.type is np.ndarray)
+        size += _string_bytes(self.tx_uuid) - self.tx_uuid.nbytes
+        size += _string_bytes(self.description) - self.description.nbytes
+        size += sum(sys.getsizeof(v) for table in (self.accounts, self.categories, self.types) for v in table)
+        return int(size)
+
+    def take(self, index):
+        """
+        The rows selected by a boolean mask or index array, sharing the
+        lookup tables.
+        """
+        return Ledger(
+            **{f.name: getattr(self, f.name)[index] for f in fields(self) if f.type is np.ndarray},
+            accounts=self.accounts, categories=self.categories, types=self.types,
+        )
+
+    def has_ids(self, tx_uuids):
+        """
+        Boolean mask of the rows whose tx_uuid is one of `tx_uuids`.
+        """
+        tx_uuids = [str(u) for u in tx_uuids]
+        if not tx_uuids:
+            return np.zeros(len(self), dtype=bool)
+        wanted = _uuid_column(tx_uuids)
+        if self.tx_uuid.dtype.kind == "S" and wanted.dtype.kind == "S":
+            return np.isin(self.tx_uuid, wanted)
+        return np.isin(_uuid_strings(self.tx_uuid), tx_uuids)
+
+    def with_changes(self, records=(), deleted=()):
+        """
+        A new Ledger with `records` (backend rows with the accounts(name)
+        join) added, each replacing the row with its tx_uuid if there is
+        one, and the rows with a `deleted` id left out.
+        """
+        records = list(records)
+        replaced = [r['tx_uuid'] for r in records] + list(deleted)
+        if not replaced:
+            return self
+        kept = self.take(~self.has_ids(replaced))
+        if not records:
+            return kept
+        return Ledger.concat([kept, Ledger.from_records(records)])
+
+    def filter(self, start_date=None, end_date=None, accounts=None, types=None):
+        """
+        Rows with start_date <= date <= end_date whose account name is in
+        `accounts` and type in `types` (None = no filter), as a new Ledger.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if start_date is not None:
+            mask &= self.date >= _day(start_date)
+        if end_date is not None:
+            mask &= self.date <= _day(end_date)
+        if accounts:
+            wanted = set(accounts)
+            mask &= np.isin(self.account, [i for i, n in enumerate(self.accounts) if n in wanted])
+        if types:
+            wanted = set(types)
+            mask &= np.isin(self.type, [i for i, t in enumerate(self.types) if t in wanted])
+        return self.take(mask)
+
+    def total(self, tx_type=None):
+        """
+        Exact sum of the amounts (of one type), in rupees.
+        """
+        amount = self.amount
+        if tx_type is not None:
+            code = self.types.index(tx_type) if tx_type in self.types else -2
+            amount = amount[self.type == code]
+        return int(amount.sum()) / 100
+
+    def to_frame(self):
+        """
+        The rows as a frame in the fetch_transactions layout.
+        """
+        return pd.DataFrame({
+            'Transaction_ID': _uuid_strings(self.tx_uuid),
+            'Date': self.date.astype("datetime64[D]").astype(object),
+            'Account': pd.Categorical.from_codes(self.account, categories=list(self.accounts)),
+            'Category': pd.Categorical.from_codes(self.category, categories=list(self.categories)),
+            'Description': self.description.astype(object),
+            'Type': pd.Categorical.from_codes(self.type, categories=list(self.types)),
+            'Amount': self.amount / 100,
+        })
+
+    def cube(self):
+        """
+        TransactionCube of the ledger, straight from its integer codes;
+        amounts are summed in paise.
+        """
+        first = int(self.date.min()) if len(self) else 0
+        span = int(self.date.max()) - first + 1 if len(self) else 0
+        day_labels = np.empty(span + 1, dtype=object)
+        day_labels[1:] = np.arange(first, first + span).astype("datetime64[D]").astype(object)
+        codes = {
+            'Date': self.date.astype(np.int64) - first + 1,
+            'Account': self.account.astype(np.int64) + 1,
+            'Category': self.category.astype(np.int64) + 1,
+            'Type': self.type.astype(np.int64) + 1,
+        }
+        labels = {
+            'Date': day_labels,
+            'Account': _labels(self.accounts),
+            'Category': _labels(self.categories),
+            'Type': _labels(self.types),
+        }
+        cube = cube_from_codes(codes, labels, self.amount.astype(np.float64))
+        cube.amount = cube.amount / 100
+        return cube
@@ -0,0 +1,170 @@
+"""
+Concurrent loading of the data a rerun needs.
+
+The views used to run their reads one after another (accounts in every
+view, then balances, transactions and openings). A RerunLoader runs them
+on a shared thread pool instead, and identical requests made during the
+same rerun share one future, so a rerun waits roughly as long as its
+slowest query.
+
+    data = load_page(user_id, month)      # queues the independent reads
+    accounts = data.accounts               # waits only for that result
+
+Each task runs in a copy of the caller's context, so storage calls made
+from the pool still land in the rerun's trace (core.tracing).
+"""
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from core.accounts import get_accounts
+from core.balances import get_all_balances, get_openings_cached
+from core.transactions import fetch_month_ledger
+from core.writeback import apply_pending, pending_changes
+
+LOADER_WORKERS = int(os.environ.get("MONEYMAGIC_LOADER_WORKERS", "8"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=LOADER_WORKERS, thread_name_prefix="moneymagic-loader")
+    return _executor
+
+
+def _freeze(value):
+    """
+    Hashable form of a call argument (lists and dicts become tuples).
+    """
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+class RerunLoader:
+    """
+    Runs read functions concurrently and dedupes identical calls.
+    Create one per rerun; results are not kept beyond it.
+    """
+
+    def __init__(self):
+        self.submitted = 0
+        self.deduped = 0
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Start fn(*args, **kwargs) in the background, or return the future
+        of an identical call already made through this loader.
+        """
+        key = (fn, _freeze(args), _freeze(kwargs))
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                self.deduped += 1
+                return future
+            # A context can only be entered by one thread at a time, so
+            # every task gets its own copy.
+            ctx = contextvars.copy_context()
+            future = _get_executor().submit(ctx.run, fn, *args, **kwargs)
+            self._futures[key] = future
+            self.submitted += 1
+            return future
+
+    def get(self, fn, *args, **kwargs):
+        """
+        Result of fn(*args, **kwargs); re-raises its exception.
+        """
+        return self.submit(fn, *args, **kwargs).result()
+
+    def stats(self):
+        return {'submitted': self.submitted, 'deduped': self.deduped}
+
+
+@dataclass
+class PageData:
+    """
+    The reads of one rerun for one user, resolved on first access.
+    """
+    user_id: str
+    month: str
+    loader: RerunLoader = field(default_factory=RerunLoader)
+    # Write-behind revision (core.writeback) the loader's reads belong to
+    revision: int = 0
+
+    def _reads(self, revision=None):
+        """
+        The loader, replaced by a fresh one once queued writes have been
+        flushed since it was created: fragment reruns reuse a PageData
+        and would otherwise keep showing the month as it was before.
+        """
+        if revision is None:
+            revision = pending_changes(self.user_id)[0]
+        if revision != self.revision:
+            self.loader = RerunLoader()
+            self.revision = revision
+        return self.loader
+
+    @property
+    def accounts(self):
+        return self._reads().get(get_accounts, self.user_id)
+
+    @property
+    def balances(self):
+        return self._reads().get(get_all_balances, self.user_id)
+
+    def openings(self, month=None):
+        """
+        {account_id: opening} for a month (default: the page month).
+        """
+        return self._reads().get(get_openings_cached, month or self.month, self.user_id)
+
+    def month_ledger(self, month=None):
+        """
+        Every transaction of a month (default: the page month) as a
+        Ledger, see core.transactions.fetch_month_ledger, with the user's
+        queued writes laid over it (core.writeback).
+        """
+        month = month or self.month
+        revision, pending = pending_changes(self.user_id)
+        ledger = self._reads(revision).get(fetch_month_ledger, month, self.user_id)
+        return apply_pending(ledger, pending, month)
+
+    def month_transactions(self, month=None):
+        """
+        month_ledger() as a transactions frame.
+        """
+        return self.month_ledger(month).to_frame()
+
+    def get(self, fn, *args, **kwargs):
+        """
+        Any other read, deduped with the rest of the rerun.
+        """
+        return self._reads().get(fn, *args, **kwargs)
+
+    def prefetch(self, fn, *args, **kwargs):
+        self._reads().submit(fn, *args, **kwargs)
+
+
+def load_page(user_id, month):
+    """
+    Queue the reads every page render needs (accounts, balances, the
+    month's openings and its transactions) and return the PageData that
+    resolves them.
+    """
+    data = PageData(user_id=user_id, month=month, revision=pending_changes(user_id)[0])
+    data.prefetch(get_accounts, user_id)
+    data.prefetch(get_all_balances, user_id)
+    data.prefetch(get_openings_cached, month, user_id)
+    data.prefetch(fetch_month_ledger, month, user_id)
+    return data
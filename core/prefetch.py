@@ -0,0 +1,154 @@
+"""
+Background warming of the months next to the one on screen.
+
+Users tend to step through months one at a time, and every step used to
+wait for a cold read of the new month. After a page renders, the app
+calls prefetch_adjacent(user_id, month): the previous and next months'
+transactions (as Ledgers) and openings are loaded into the shared cache
+on a small worker pool, so the next step is usually served warm.
+
+- Cancellation: a newer prefetch for the same user (or cancel_prefetch())
+  drops the older one's tasks that have not started yet.
+- Concurrency: at most PREFETCH_WORKERS reads run at once, process-wide.
+- Memory: nothing is prefetched for a user already holding
+  PREFETCH_USER_MAX_BYTES in the cache, or while the cache as a whole is
+  over PREFETCH_CACHE_FRACTION full, so warming never pushes out data
+  that is in use.
+
+Disable with MONEYMAGIC_PREFETCH=0.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core.balances import get_openings_cached, openings_cached
+from core.cache import shared_cache
+from core.transactions import fetch_month_ledger, month_cached
+from core.utils import MONTHS
+
+PREFETCH_ENABLED = os.environ.get("MONEYMAGIC_PREFETCH", "1") == "1"
+PREFETCH_WORKERS = int(os.environ.get("MONEYMAGIC_PREFETCH_WORKERS", "2"))
+PREFETCH_USER_MAX_BYTES = int(os.environ.get("MONEYMAGIC_PREFETCH_USER_MB", "8")) * 1024 * 1024
+PREFETCH_CACHE_FRACTION = 0.8
+# Months on each side of the current one
+PREFETCH_RADIUS = 1
+
+_executor = None
+_lock = threading.Lock()
+_generations = {}  # user_id -> id of their latest prefetch
+_pending = {}      # user_id -> futures of that prefetch
+_stats = {'submitted': 0, 'completed': 0, 'cancelled': 0, 'skipped': 0, 'errors': 0}
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="moneymagic-prefetch")
+    return _executor
+
+
+def adjacent_months(month, radius=PREFETCH_RADIUS):
+    """
+    Month names around `month`, nearest first (no wrap past January or
+    December).
+    """
+    i = MONTHS.index(month)
+    found = []
+    for step in range(1, radius + 1):
+        for j in (i + step, i - step):
+            if 0 <= j < len(MONTHS):
+                found.append(MONTHS[j])
+    return found
+
+
+def _over_budget(user_id):
+    total = shared_cache.stats()
+    return (
+        shared_cache.user_bytes(user_id) >= PREFETCH_USER_MAX_BYTES
+        or total['bytes'] >= PREFETCH_CACHE_FRACTION * total['max_bytes']
+    )
+
+
+def _run(generation, user_id, fn, month):
+    with _lock:
+        if _generations.get(user_id) != generation:
+            _stats['cancelled'] += 1
+            return
+    # Checked when the task starts, after the tasks before it have landed
+    if _over_budget(user_id):
+        with _lock:
+            _stats['skipped'] += 1
+        return
+    try:
+        fn(month, user_id)
+    except Exception:
+        with _lock:
+            _stats['errors'] += 1
+        return
+    with _lock:
+        _stats['completed'] += 1
+
+
+def prefetch_adjacent(user_id, month, radius=PREFETCH_RADIUS):
+    """
+    Warm the cache with the months around `month` in the background.
+    Returns the number of reads queued (0 when everything is warm,
+    prefetch is off or the memory budget is used up).
+    """
+    if not PREFETCH_ENABLED or user_id is None or month not in MONTHS:
+        return 0
+    cancel_prefetch(user_id)
+    if _over_budget(user_id):
+        with _lock:
+            _stats['skipped'] += 1
+        return 0
+    tasks = []
+    for m in adjacent_months(month, radius):
+        if not month_cached(m, user_id):
+            tasks.append((fetch_month_ledger, m))
+        if not openings_cached(m, user_id):
+            tasks.append((get_openings_cached, m))
+    if not tasks:
+        return 0
+    executor = _get_executor()
+    with _lock:
+        generation = _generations.get(user_id, 0) + 1
+        _generations[user_id] = generation
+        # Tasks run without the caller's context, so they stay out of the
+        # rerun's trace
+        _pending[user_id] = [executor.submit(_run, generation, user_id, fn, m) for fn, m in tasks]
+        _stats['submitted'] += len(tasks)
+    return len(tasks)
+
+
+def cancel_prefetch(user_id=None):
+    """
+    Drop a user's (or everyone's) prefetch tasks that have not started.
+    Running reads finish, but their results are still cached.
+    """
+    with _lock:
+        users = list(_pending) if user_id is None else [user_id]
+        for u in users:
+            _generations[u] = _generations.get(u, 0) + 1
+            for future in _pending.pop(u, []):
+                if future.cancel():
+                    _stats['cancelled'] += 1
+
+
+def wait_prefetch(user_id, timeout=None):
+    """
+    Block until a user's current prefetch is done (for tests and
+    benchmarks).
+    """
+    with _lock:
+        futures = list(_pending.get(user_id, []))
+    for future in futures:
+        if not future.cancelled():
+            future.result(timeout=timeout)
+
+
+def prefetch_stats():
+    with _lock:
+        return dict(_stats)
@@ -0,0 +1,62 @@
+"""
+Daily rollups of transactions keyed by (user, account, date, category, type).
+
+The database keeps them: triggers on transactions adjust a rollup row in
+the same transaction as every insert, update and delete, so they can't
+drift from the rows they sum, and aggregate reads cost
+O(days x accounts x categories) instead of O(transactions). Enable with
+MONEYMAGIC_ROLLUPS=1 (on Supabase, apply sql/transaction_rollups.sql
+first) and backfill existing data once with rebuild_rollups(). The
+dashboard is then served from them (fetch_rollup_aggregates).
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from core.aggregates import aggregates_from_cube, transaction_cube
+from core.storage import get_backend
+from core.utils import date_bounds
+
+ROLLUPS_ENABLED = os.environ.get("MONEYMAGIC_ROLLUPS") == "1"
+
+def rebuild_rollups(user_id):
+    """
+    Recompute a user's rollups from the raw transactions, in one database
+    transaction on the backend (nothing is paged through the app).
+    Returns the number of transactions counted.
+    """
+    return get_backend().rebuild_rollups(user_id)
+
+
+# ------------- Read API -------------
+
+def fetch_rollup_aggregates(
+    month_filter=None, start_date=None, end_date=None,
+    account_ids=None, types=None, user_id=None
+):
+    """
+    Same result as core.aggregates.fetch_dashboard_aggregates for the same
+    filters, built from the rollups: one read of at most days x accounts x
+    categories x types rows, however many transactions there are. Rows of
+    deleted accounts are left out, like the transactions join.
+    """
+    from core.accounts import get_accounts
+
+    start, end = date_bounds(month_filter, start_date, end_date)
+    rows = get_backend().select_rollups(user_id, start, end, account_ids or None)
+    names = {a['id']: a['name'] for a in get_accounts(user_id)}
+    types = set(types) if types else None
+    rows = [
+        r for r in rows
+        if r['account_id'] in names and (types is None or r['type'] in types)
+    ]
+    df = pd.DataFrame({
+        'Date': pd.to_datetime(pd.Series([r['date'] for r in rows], dtype=object), format='ISO8601').dt.date,
+        'Account': pd.Series([names[r['account_id']] for r in rows], dtype=object),
+        'Category': pd.Series([r['category'] or None for r in rows], dtype=object),
+        'Type': pd.Series([r['type'] for r in rows], dtype=object),
+        'Amount': np.array([float(r['amount']) for r in rows], dtype=np.float64),
+    })
+    counts = np.array([int(r['tx_count']) for r in rows], dtype=np.int64)
+    return aggregates_from_cube(transaction_cube(df, counts))
@@ -0,0 +1,68 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+from core.storage.base import StorageBackend
+
+load_dotenv("moneymagic.env")
+
+# "supabase" (default) or "sqlite"
+STORAGE_BACKEND = os.environ.get("MONEYMAGIC_BACKEND", "supabase")
+SQLITE_PATH = os.environ.get("MONEYMAGIC_SQLITE_PATH", "moneymagic.db")
+
+_lock = threading.Lock()
+_backend = None
+
+
+def create_backend(kind=None, **kwargs):
+    """
+    Build a storage backend by name ("supabase" or "sqlite").
+    """
+    kind = (kind or STORAGE_BACKEND).lower()
+    if kind == "supabase":
+        from core.storage.supabase_backend import SupabaseBackend
+        return SupabaseBackend(**kwargs)
+    if kind == "sqlite":
+        from core.storage.sqlite_backend import SQLiteBackend
+        kwargs.setdefault("path", SQLITE_PATH)
+        return SQLiteBackend(**kwargs)
+    raise ValueError(f"Unknown storage backend: {kind}")
+
+
+def get_backend():
+    """
+    Return the process-wide storage backend chosen by MONEYMAGIC_BACKEND,
+    wrapped so its calls show up in rerun traces (see core.tracing).
+    """
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                from core.tracing import TracingBackend
+                _backend = TracingBackend(create_backend())
+    return _backend
+
+
+def set_backend(backend):
+    """
+    Replace the process-wide backend (e.g. an in-memory SQLite database
+    for benchmarks). It is used as given, without tracing.
+    Returns the previous one.
+    """
+    global _backend
+    with _lock:
+        previous, _backend = _backend, backend
+    return previous
+
+
+def page_limit(page_size, backend=None):
+    """
+    `page_size` capped at the backend's max_rows. Keyset walks stop at the
+    first short page, which is only safe if the server never returns
+    fewer rows than were asked for.
+    """
+    max_rows = getattr(backend or get_backend(), 'max_rows', None)
+    return min(page_size, max_rows) if max_rows else page_size
+
+
+__all__ = ["StorageBackend", "create_backend", "get_backend", "page_limit", "set_backend"]
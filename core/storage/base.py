@@ -0,0 +1,127 @@
+from abc import ABC, abstractmethod
+
+
+class StorageBackend(ABC):
+    """
+    Data access used by core.accounts, core.balances and core.transactions.
+
+    Rows are plain dicts shaped like the Supabase tables (accounts,
+    balances, transactions). Transaction rows returned by
+    select_transactions() also carry the joined account as
+    {'accounts': {'name': ...}}.
+    """
+
+    name = "base"
+    # Most rows one select returns however many are asked for (PostgREST's
+    # max-rows); None = no limit. See core.storage.page_limit.
+    max_rows = None
+
+    # ------------- Accounts -------------
+
+    @abstractmethod
+    def list_accounts(self, user_id):
+        """All accounts of a user, ordered by name."""
+
+    @abstractmethod
+    def insert_account(self, data):
+        """Insert one account; returns the stored row or None."""
+
+    @abstractmethod
+    def update_account(self, account_id, user_id, data):
+        """Update an account owned by user_id; returns the row or None."""
+
+    @abstractmethod
+    def delete_account(self, account_id, user_id):
+        """Delete an account owned by user_id; returns the row or None."""
+
+    @abstractmethod
+    def account_has_transactions(self, account_id):
+        """True if any transaction references the account."""
+
+    # ------------- Balances -------------
+
+    @abstractmethod
+    def list_balances(self, user_id):
+        """All balance rows of a user (id, month, account_id, opening), by month."""
+
+    @abstractmethod
+    def get_opening(self, month, account_id, user_id):
+        """Latest balance row for one month and account, or None."""
+
+    @abstractmethod
+    def list_openings(self, user_id, months):
+        """Balance rows (month, account_id, opening) for the given months, oldest id first."""
+
+    @abstractmethod
+    def save_opening(self, month, account_id, user_id, opening):
+        """Insert or update the opening of a month/account; returns the row or None."""
+
+    # ------------- Transactions -------------
+
+    @abstractmethod
+    def get_transactions(self, tx_uuids):
+        """Transaction rows (without the account join) for the given ids."""
+
+    @abstractmethod
+    def insert_transactions(self, rows):
+        """Insert rows; returns the stored rows (with tx_uuid)."""
+
+    @abstractmethod
+    def update_transaction(self, tx_uuid, updates):
+        """Update one transaction; returns the row or None."""
+
+    @abstractmethod
+    def upsert_transactions(self, rows):
+        """Write full rows matched on tx_uuid; returns the stored rows."""
+
+    @abstractmethod
+    def delete_transactions(self, tx_uuids):
+        """Delete transactions by id; returns the deleted rows."""
+
+    @abstractmethod
+    def select_transactions(
+        self, user_id=None, start_date=None, end_date=None,
+        account_ids=None, types=None, after=None, limit=None
+    ):
+        """
+        Matching transactions ordered by (date desc, tx_uuid desc).
+        start_date/end_date are inclusive ISO strings; `after` is the
+        (date, tx_uuid) key of the last row of the previous page.
+        """
+
+    @abstractmethod
+    def dashboard_aggregates(self, user_id, start_date=None, end_date=None, account_ids=None, types=None):
+        """
+        Sum and count of amount for the matching transactions, as
+        {'by_account': [{account, type, amount, tx_count}],
+         'by_category': [{category, type, ...}], 'by_day': [{date, type, ...}],
+         'by_type': [{type, ...}]}.
+        """
+
+    @abstractmethod
+    def select_changes(self, user_id, since=None, after=None, limit=None):
+        """
+        Transactions changed at or after `since` (an updated_at timestamp)
+        plus tombstones of those deleted since then, ordered by
+        (updated_at, tx_uuid). Rows carry updated_at and `deleted`;
+        tombstones only have tx_uuid, user_id, updated_at and deleted=True.
+        since=None returns every live row and no tombstones. `after` is the
+        (updated_at, tx_uuid) key of the last row of the previous page.
+        """
+
+    # ------------- Rollups -------------
+    # Daily (user_id, account_id, date, category, type) sums of transactions.
+    # Backends keep them current inside every transaction write (triggers),
+    # never from deltas sent by the app.
+
+    @abstractmethod
+    def select_rollups(self, user_id, start_date=None, end_date=None, account_ids=None):
+        """Rollup rows (date, account_id, category, type, amount, tx_count) in a date range."""
+
+    @abstractmethod
+    def rebuild_rollups(self, user_id):
+        """
+        Replace a user's rollup rows with ones recomputed from their
+        transactions, atomically (one database transaction). Returns the
+        number of transactions counted.
+        """
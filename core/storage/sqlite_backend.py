@@ -0,0 +1,454 @@
+import sqlite3
+import threading
+import uuid
+
+from core.storage.base import StorageBackend
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    notes TEXT DEFAULT '',
+    user_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_accounts_user_name ON accounts (user_id, name);
+
+CREATE TABLE IF NOT EXISTS balances (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    month INTEGER NOT NULL,
+    account_id INTEGER NOT NULL,
+    opening REAL NOT NULL DEFAULT 0,
+    user_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_balances_user_month_account ON balances (user_id, month, account_id);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    tx_uuid TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    account_id INTEGER NOT NULL,
+    category TEXT,
+    description TEXT,
+    type TEXT NOT NULL,
+    amount REAL NOT NULL,
+    user_id TEXT
+);
+-- (user_id, date) with tx_uuid appended so keyset pages are served from the index
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions (user_id, date, tx_uuid);
+CREATE INDEX IF NOT EXISTS idx_transactions_account ON transactions (account_id);
+
+CREATE TABLE IF NOT EXISTS transaction_tombstones (
+    tx_uuid TEXT PRIMARY KEY,
+    user_id TEXT,
+    deleted_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tombstones_user_deleted ON transaction_tombstones (user_id, deleted_at);
+
+CREATE TABLE IF NOT EXISTS transaction_rollups (
+    user_id TEXT NOT NULL,
+    account_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    category TEXT NOT NULL DEFAULT '',
+    type TEXT NOT NULL,
+    amount REAL NOT NULL DEFAULT 0,
+    tx_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, date, account_id, category, type)
+);
+"""
+
+# Sync bookkeeping (see sql/transaction_sync.sql): updated_at is stamped by
+# triggers in the same fixed-width UTC format PostgREST returns, and deletes
+# leave a tombstone. Applied after SCHEMA so older databases get the column.
+NOW_UTC = "strftime('%Y-%m-%dT%H:%M:%f', 'now') || '000+00:00'"
+SYNC_SCHEMA = f"""
+CREATE INDEX IF NOT EXISTS idx_transactions_user_updated ON transactions (user_id, updated_at, tx_uuid);
+
+CREATE TRIGGER IF NOT EXISTS transactions_stamp_insert AFTER INSERT ON transactions
+BEGIN
+    UPDATE transactions SET updated_at = {NOW_UTC} WHERE tx_uuid = new.tx_uuid;
+    DELETE FROM transaction_tombstones WHERE tx_uuid = new.tx_uuid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS transactions_stamp_update
+AFTER UPDATE OF date, account_id, category, description, type, amount, user_id ON transactions
+BEGIN
+    UPDATE transactions SET updated_at = {NOW_UTC} WHERE tx_uuid = new.tx_uuid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS transactions_tombstone AFTER DELETE ON transactions
+BEGIN
+    INSERT OR REPLACE INTO transaction_tombstones (tx_uuid, user_id, deleted_at)
+    VALUES (old.tx_uuid, old.user_id, {NOW_UTC});
+END;
+"""
+
+# Rollups (see sql/transaction_rollups.sql) are kept by triggers, in the
+# same database transaction as the write that changes them.
+ROLLUP_SCHEMA = """
+CREATE TRIGGER IF NOT EXISTS transactions_rollup_insert AFTER INSERT ON transactions
+BEGIN
+    INSERT INTO transaction_rollups (user_id, account_id, date, category, type, amount, tx_count)
+    VALUES (new.user_id, new.account_id, substr(new.date, 1, 10), COALESCE(new.category, ''),
+            new.type, ROUND(new.amount, 2), 1)
+    ON CONFLICT (user_id, date, account_id, category, type) DO UPDATE SET
+        amount = ROUND(amount + excluded.amount, 2), tx_count = tx_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS transactions_rollup_update
+AFTER UPDATE OF date, account_id, category, type, amount, user_id ON transactions
+BEGIN
+    UPDATE transaction_rollups SET amount = ROUND(amount - old.amount, 2), tx_count = tx_count - 1
+    WHERE user_id IS old.user_id AND account_id = old.account_id AND date = substr(old.date, 1, 10)
+      AND category = COALESCE(old.category, '') AND type = old.type;
+    DELETE FROM transaction_rollups
+    WHERE user_id IS old.user_id AND account_id = old.account_id AND date = substr(old.date, 1, 10)
+      AND category = COALESCE(old.category, '') AND type = old.type AND tx_count <= 0;
+    INSERT INTO transaction_rollups (user_id, account_id, date, category, type, amount, tx_count)
+    VALUES (new.user_id, new.account_id, substr(new.date, 1, 10), COALESCE(new.category, ''),
+            new.type, ROUND(new.amount, 2), 1)
+    ON CONFLICT (user_id, date, account_id, category, type) DO UPDATE SET
+        amount = ROUND(amount + excluded.amount, 2), tx_count = tx_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS transactions_rollup_delete AFTER DELETE ON transactions
+BEGIN
+    UPDATE transaction_rollups SET amount = ROUND(amount - old.amount, 2), tx_count = tx_count - 1
+    WHERE user_id IS old.user_id AND account_id = old.account_id AND date = substr(old.date, 1, 10)
+      AND category = COALESCE(old.category, '') AND type = old.type;
+    DELETE FROM transaction_rollups
+    WHERE user_id IS old.user_id AND account_id = old.account_id AND date = substr(old.date, 1, 10)
+      AND category = COALESCE(old.category, '') AND type = old.type AND tx_count <= 0;
+END;
+"""
+
+TX_FIELDS = ['tx_uuid', 'date', 'account_id', 'category', 'description', 'type', 'amount', 'user_id']
+ACCOUNT_FIELDS = ['name', 'type', 'notes', 'user_id']
+
+
+def _placeholders(values):
+    return ', '.join('?' for _ in values)
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Embedded SQLite storage for local development, benchmarks and
+    single-user installs. One connection is shared by all threads and
+    guarded by a lock; ":memory:" gives a throwaway database.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path="moneymagic.db"):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        columns = {r['name'] for r in self._conn.execute("PRAGMA table_info(transactions)")}
+        if 'updated_at' not in columns:
+            self._conn.execute("ALTER TABLE transactions ADD COLUMN updated_at TEXT")
+            self._conn.execute(f"UPDATE transactions SET updated_at = {NOW_UTC}")
+            self._conn.commit()
+        self._conn.executescript(SYNC_SCHEMA)
+        self._conn.executescript(ROLLUP_SCHEMA)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql, params).fetchall()]
+
+    def _write(self, sql, params=()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ------------- Accounts -------------
+
+    def list_accounts(self, user_id):
+        return self._query(
+            "SELECT id, name, type, notes, user_id FROM accounts WHERE user_id = ? ORDER BY name",
+            (user_id,),
+        )
+
+    def _account(self, account_id, user_id):
+        rows = self._query(
+            "SELECT id, name, type, notes, user_id FROM accounts WHERE id = ? AND user_id IS ?",
+            (account_id, user_id),
+        )
+        return rows[0] if rows else None
+
+    def insert_account(self, data):
+        fields = [f for f in ACCOUNT_FIELDS if f in data]
+        cur = self._write(
+            f"INSERT INTO accounts ({', '.join(fields)}) VALUES ({_placeholders(fields)})",
+            [data[f] for f in fields],
+        )
+        return self._account(cur.lastrowid, data.get('user_id'))
+
+    def update_account(self, account_id, user_id, data):
+        fields = [f for f in ACCOUNT_FIELDS if f in data and f != 'user_id']
+        if not fields:
+            return self._account(account_id, user_id)
+        self._write(
+            f"UPDATE accounts SET {', '.join(f + ' = ?' for f in fields)} WHERE id = ? AND user_id IS ?",
+            [data[f] for f in fields] + [account_id, user_id],
+        )
+        return self._account(account_id, user_id)
+
+    def delete_account(self, account_id, user_id):
+        with self._lock:
+            row = self._account(account_id, user_id)
+            if row is not None:
+                self._write("DELETE FROM accounts WHERE id = ? AND user_id IS ?", (account_id, user_id))
+        return row
+
+    def account_has_transactions(self, account_id):
+        return bool(self._query(
+            "SELECT 1 FROM transactions WHERE account_id = ? LIMIT 1", (account_id,)
+        ))
+
+    # ------------- Balances -------------
+
+    def list_balances(self, user_id):
+        return self._query(
+            "SELECT id, month, account_id, opening FROM balances WHERE user_id = ? ORDER BY month",
+            (user_id,),
+        )
+
+    def get_opening(self, month, account_id, user_id):
+        rows = self._query(
+            "SELECT opening FROM balances WHERE month = ? AND account_id = ? AND user_id = ? "
+            "ORDER BY id DESC LIMIT 1",
+            (month, account_id, user_id),
+        )
+        return rows[0] if rows else None
+
+    def list_openings(self, user_id, months):
+        months = list(months)
+        if not months:
+            return []
+        return self._query(
+            f"SELECT month, account_id, opening FROM balances "
+            f"WHERE user_id = ? AND month IN ({_placeholders(months)}) ORDER BY id",
+            [user_id] + months,
+        )
+
+    def save_opening(self, month, account_id, user_id, opening):
+        key = (month, account_id, user_id)
+        with self._lock:
+            cur = self._write(
+                "UPDATE balances SET opening = ? WHERE month = ? AND account_id = ? AND user_id = ?",
+                (float(opening),) + key,
+            )
+            if cur.rowcount == 0:
+                self._write(
+                    "INSERT INTO balances (month, account_id, user_id, opening) VALUES (?, ?, ?, ?)",
+                    key + (float(opening),),
+                )
+            rows = self._query(
+                "SELECT id, month, account_id, user_id, opening FROM balances "
+                "WHERE month = ? AND account_id = ? AND user_id = ? ORDER BY id DESC LIMIT 1",
+                key,
+            )
+        return rows[0] if rows else None
+
+    # ------------- Transactions -------------
+
+    def get_transactions(self, tx_uuids):
+        tx_uuids = list(tx_uuids)
+        if not tx_uuids:
+            return []
+        return self._query(
+            f"SELECT {', '.join(TX_FIELDS)} FROM transactions WHERE tx_uuid IN ({_placeholders(tx_uuids)})",
+            tx_uuids,
+        )
+
+    def insert_transactions(self, rows):
+        records = []
+        for row in rows:
+            record = {f: row.get(f) for f in TX_FIELDS}
+            record['tx_uuid'] = record['tx_uuid'] or str(uuid.uuid4())
+            records.append(record)
+        if not records:
+            return []
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO transactions ({', '.join(TX_FIELDS)}) VALUES ({_placeholders(TX_FIELDS)})",
+                [[r[f] for f in TX_FIELDS] for r in records],
+            )
+        return records
+
+    def update_transaction(self, tx_uuid, updates):
+        fields = [f for f in TX_FIELDS if f in updates and f != 'tx_uuid']
+        if fields:
+            self._write(
+                f"UPDATE transactions SET {', '.join(f + ' = ?' for f in fields)} WHERE tx_uuid = ?",
+                [updates[f] for f in fields] + [tx_uuid],
+            )
+        rows = self.get_transactions([tx_uuid])
+        return rows[0] if rows else None
+
+    def upsert_transactions(self, rows):
+        records = [{f: row.get(f) for f in TX_FIELDS} for row in rows]
+        if not records:
+            return []
+        updates = ', '.join(f"{f} = excluded.{f}" for f in TX_FIELDS if f != 'tx_uuid')
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO transactions ({', '.join(TX_FIELDS)}) VALUES ({_placeholders(TX_FIELDS)}) "
+                f"ON CONFLICT(tx_uuid) DO UPDATE SET {updates}",
+                [[r[f] for f in TX_FIELDS] for r in records],
+            )
+        return records
+
+    def delete_transactions(self, tx_uuids):
+        tx_uuids = list(tx_uuids)
+        with self._lock:
+            deleted = self.get_transactions(tx_uuids)
+            if deleted:
+                self._write(
+                    f"DELETE FROM transactions WHERE tx_uuid IN ({_placeholders(tx_uuids)})",
+                    tx_uuids,
+                )
+        return deleted
+
+    def select_transactions(
+        self, user_id=None, start_date=None, end_date=None,
+        account_ids=None, types=None, after=None, limit=None
+    ):
+        where, params = [], []
+        if user_id is not None:
+            where.append("t.user_id = ?")
+            params.append(user_id)
+        if start_date:
+            where.append("t.date >= ?")
+            params.append(start_date)
+        if end_date:
+            where.append("t.date <= ?")
+            params.append(end_date)
+        if account_ids:
+            where.append(f"t.account_id IN ({_placeholders(account_ids)})")
+            params.extend(account_ids)
+        if types:
+            where.append(f"t.type IN ({_placeholders(types)})")
+            params.extend(types)
+        if after is not None:
+            last_date, last_uuid = after
+            where.append("(t.date < ? OR (t.date = ? AND t.tx_uuid < ?))")
+            params.extend([last_date, last_date, last_uuid])
+
+        sql = (
+            f"SELECT {', '.join('t.' + f for f in TX_FIELDS)}, a.name AS account_name "
+            "FROM transactions t JOIN accounts a ON a.id = t.account_id"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY t.date DESC, t.tx_uuid DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        rows = self._query(sql, params)
+        for row in rows:
+            row['accounts'] = {'name': row.pop('account_name')}
+        return rows
+
+    def dashboard_aggregates(self, user_id, start_date=None, end_date=None, account_ids=None, types=None):
+        # Same result as sql/dashboard_aggregates.sql
+        where, params = ["t.user_id = ?"], [user_id]
+        if start_date:
+            where.append("t.date >= ?")
+            params.append(start_date)
+        if end_date:
+            where.append("t.date <= ?")
+            params.append(end_date)
+        if account_ids:
+            where.append(f"t.account_id IN ({_placeholders(account_ids)})")
+            params.extend(account_ids)
+        if types:
+            where.append(f"t.type IN ({_placeholders(types)})")
+            params.extend(types)
+        tx = (
+            "SELECT t.date, a.name AS account, t.category, t.type, t.amount "
+            "FROM transactions t JOIN accounts a ON a.id = t.account_id "
+            f"WHERE {' AND '.join(where)}"
+        )
+        groupings = {
+            'by_account': "account, type",
+            'by_category': "category, type",
+            'by_day': "date, type",
+            'by_type': "type",
+        }
+        result = {}
+        with self._lock:
+            for name, keys in groupings.items():
+                having = " WHERE category IS NOT NULL" if name == 'by_category' else ""
+                result[name] = self._query(
+                    f"SELECT {keys}, SUM(amount) AS amount, COUNT(*) AS tx_count "
+                    f"FROM ({tx}){having} GROUP BY {keys} ORDER BY {keys}",
+                    params,
+                )
+        return result
+
+    def select_changes(self, user_id, since=None, after=None, limit=None):
+        live_fields = ', '.join(TX_FIELDS)
+        sql = f"SELECT {live_fields}, updated_at, 0 AS deleted FROM transactions WHERE user_id = ?"
+        params = [user_id]
+        if since is not None:
+            # Tombstones have nothing but their id
+            blanks = ', '.join(f if f in ('tx_uuid', 'user_id') else f"NULL AS {f}" for f in TX_FIELDS)
+            sql += (
+                " AND updated_at >= ?"
+                f" UNION ALL SELECT {blanks}, deleted_at AS updated_at, 1 AS deleted"
+                " FROM transaction_tombstones WHERE user_id = ? AND deleted_at >= ?"
+            )
+            params.extend([since, user_id, since])
+        sql = f"SELECT * FROM ({sql})"
+        if after is not None:
+            last_updated, last_uuid = after
+            sql += " WHERE (updated_at > ? OR (updated_at = ? AND tx_uuid > ?))"
+            params.extend([last_updated, last_updated, last_uuid])
+        sql += " ORDER BY updated_at, tx_uuid"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = self._query(sql, params)
+        for row in rows:
+            row['deleted'] = bool(row['deleted'])
+        return rows
+
+    # ------------- Rollups -------------
+
+    def select_rollups(self, user_id, start_date=None, end_date=None, account_ids=None):
+        where, params = ["user_id = ?"], [user_id]
+        if start_date:
+            where.append("date >= ?")
+            params.append(start_date)
+        if end_date:
+            where.append("date <= ?")
+            params.append(end_date)
+        if account_ids:
+            where.append(f"account_id IN ({_placeholders(account_ids)})")
+            params.extend(account_ids)
+        return self._query(
+            "SELECT date, account_id, category, type, amount, tx_count FROM transaction_rollups "
+            f"WHERE {' AND '.join(where)} ORDER BY date",
+            params,
+        )
+
+    def rebuild_rollups(self, user_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM transaction_rollups WHERE user_id = ?", (user_id,))
+            self._conn.execute(
+                "INSERT INTO transaction_rollups (user_id, account_id, date, category, type, amount, tx_count) "
+                "SELECT user_id, account_id, substr(date, 1, 10), COALESCE(category, ''), type, "
+                "ROUND(SUM(amount), 2), COUNT(*) FROM transactions WHERE user_id = ? "
+                "GROUP BY user_id, account_id, substr(date, 1, 10), COALESCE(category, ''), type",
+                (user_id,),
+            )
+            row = self._conn.execute("SELECT COUNT(*) FROM transactions WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0]
@@ -0,0 +1,285 @@
+import os
+
+from core.database import get_supabase_client
+from core.storage.base import StorageBackend
+
+# Max rows / ids sent in one bulk request (keeps `in` filters within URL limits)
+BULK_CHUNK_SIZE = 500
+
+# PostgREST's max-rows setting: no select returns more rows than this
+SUPABASE_MAX_ROWS = int(os.environ.get("SUPABASE_MAX_ROWS", "1000"))
+
+# Rows per request when reading tables that may exceed max-rows
+PAGE_SIZE = SUPABASE_MAX_ROWS
+
+TX_SELECT = 'tx_uuid, date, account_id, category, description, type, amount, user_id, accounts!inner(name)'
+
+
+def _chunks(items, size=BULK_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _first(response):
+    return response.data[0] if response.data else None
+
+
+class SupabaseBackend(StorageBackend):
+    """
+    Storage on the hosted Supabase (PostgREST) database.
+    """
+
+    name = "supabase"
+    max_rows = SUPABASE_MAX_ROWS
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_supabase_client()
+
+    # ------------- Accounts -------------
+
+    def list_accounts(self, user_id):
+        response = self.client.table('accounts')\
+            .select('id, name, type, notes, user_id')\
+            .eq('user_id', user_id)\
+            .order('name')\
+            .execute()
+        return response.data if response.data else []
+
+    def insert_account(self, data):
+        response = self.client.table('accounts').insert(data).execute()
+        return _first(response)
+
+    def update_account(self, account_id, user_id, data):
+        response = self.client.table('accounts')\
+            .update(data)\
+            .eq('id', account_id)\
+            .eq('user_id', user_id)\
+            .execute()
+        return _first(response)
+
+    def delete_account(self, account_id, user_id):
+        response = self.client.table('accounts')\
+            .delete()\
+            .eq('id', account_id)\
+            .eq('user_id', user_id)\
+            .execute()
+        return _first(response)
+
+    def account_has_transactions(self, account_id):
+        response = self.client.table('transactions')\
+            .select('tx_uuid')\
+            .eq('account_id', account_id)\
+            .limit(1)\
+            .execute()
+        return bool(response.data)
+
+    # ------------- Balances -------------
+
+    def list_balances(self, user_id):
+        response = self.client.table('balances')\
+            .select('id, month, account_id, opening')\
+            .eq('user_id', user_id)\
+            .order('month')\
+            .execute()
+        return response.data if response.data else []
+
+    def get_opening(self, month, account_id, user_id):
+        response = (
+            self.client.table("balances")
+            .select("opening")
+            .eq("month", month)
+            .eq("account_id", account_id)
+            .eq("user_id", user_id)
+            .order("id", desc=True)
+            .limit(1)
+            .execute()
+        )
+        return _first(response)
+
+    def list_openings(self, user_id, months):
+        response = (
+            self.client.table("balances")
+            .select("month, account_id, opening")
+            .eq("user_id", user_id)
+            .in_("month", list(months))
+            .order("id")
+            .execute()
+        )
+        return response.data or []
+
+    def save_opening(self, month, account_id, user_id, opening):
+        supabase = self.client
+
+        # First check if a record exists
+        response = supabase.table('balances')\
+            .select('id')\
+            .eq('month', month)\
+            .eq('account_id', account_id)\
+            .eq('user_id', user_id)\
+            .execute()
+
+        data = {
+            'month': month,
+            'account_id': account_id,
+            'user_id': user_id,
+            'opening': float(opening)
+        }
+
+        if response.data:
+            # Update existing record
+            response = supabase.table('balances')\
+                .update(data)\
+                .eq('month', month)\
+                .eq('account_id', account_id)\
+                .eq('user_id', user_id)\
+                .execute()
+        else:
+            # Insert new record
+            response = supabase.table('balances')\
+                .insert(data)\
+                .execute()
+        return _first(response)
+
+    # ------------- Transactions -------------
+
+    def get_transactions(self, tx_uuids):
+        found = []
+        for chunk in _chunks(list(tx_uuids)):
+            response = self.client.table('transactions')\
+                .select('tx_uuid, date, account_id, category, description, type, amount, user_id')\
+                .in_('tx_uuid', chunk)\
+                .execute()
+            found.extend(response.data or [])
+        return found
+
+    def insert_transactions(self, rows):
+        inserted = []
+        for chunk in _chunks(list(rows)):
+            response = self.client.table('transactions')\
+                .insert(chunk)\
+                .execute()
+            inserted.extend(response.data or [])
+        return inserted
+
+    def update_transaction(self, tx_uuid, updates):
+        response = self.client.table('transactions')\
+            .update(updates)\
+            .eq('tx_uuid', tx_uuid)\
+            .execute()
+        return _first(response)
+
+    def upsert_transactions(self, rows):
+        written = []
+        for chunk in _chunks(list(rows)):
+            response = self.client.table('transactions')\
+                .upsert(chunk, on_conflict='tx_uuid')\
+                .execute()
+            written.extend(response.data or [])
+        return written
+
+    def delete_transactions(self, tx_uuids):
+        deleted = []
+        for chunk in _chunks(list(tx_uuids)):
+            response = self.client.table('transactions')\
+                .delete()\
+                .in_('tx_uuid', chunk)\
+                .execute()
+            deleted.extend(response.data or [])
+        return deleted
+
+    def select_transactions(
+        self, user_id=None, start_date=None, end_date=None,
+        account_ids=None, types=None, after=None, limit=None
+    ):
+        query = self.client.table('transactions').select(TX_SELECT)
+
+        # Always filter by user_id if provided
+        if user_id is not None:
+            query = query.eq('user_id', user_id)
+        if start_date:
+            query = query.gte('date', start_date)
+        if end_date:
+            query = query.lte('date', end_date)
+        if account_ids:
+            query = query.in_('account_id', account_ids)
+        if types:
+            query = query.in_('type', types)
+
+        if after is not None:
+            last_date, last_uuid = after
+            # Rows strictly after the previous page in (date desc, tx_uuid desc) order
+            query = query.or_(
+                f'date.lt."{last_date}",and(date.eq."{last_date}",tx_uuid.lt.{last_uuid})'
+            )
+        query = query.order('date', desc=True).order('tx_uuid', desc=True)
+        if limit is not None:
+            query = query.limit(limit)
+
+        response = query.execute()
+        return response.data or []
+
+    def dashboard_aggregates(self, user_id, start_date=None, end_date=None, account_ids=None, types=None):
+        # RPC defined in sql/dashboard_aggregates.sql
+        response = self.client.rpc('dashboard_aggregates', {
+            'p_user_id': user_id,
+            'p_start': start_date,
+            'p_end': end_date,
+            'p_account_ids': account_ids,
+            'p_types': types,
+        }).execute()
+        return response.data or {}
+
+    def select_changes(self, user_id, since=None, after=None, limit=None):
+        # View defined in sql/transaction_sync.sql
+        query = self.client.table('transaction_changes')\
+            .select('tx_uuid, date, account_id, category, description, type, amount, user_id, updated_at, deleted')\
+            .eq('user_id', user_id)
+        if since is None:
+            query = query.eq('deleted', False)
+        else:
+            query = query.gte('updated_at', since)
+        if after is not None:
+            last_updated, last_uuid = after
+            query = query.or_(
+                f'updated_at.gt."{last_updated}",and(updated_at.eq."{last_updated}",tx_uuid.gt.{last_uuid})'
+            )
+        query = query.order('updated_at').order('tx_uuid')
+        if limit is not None:
+            query = query.limit(limit)
+        response = query.execute()
+        return response.data or []
+
+    # ------------- Rollups -------------
+    # Table, triggers and RPC are defined in sql/transaction_rollups.sql
+
+    def select_rollups(self, user_id, start_date=None, end_date=None, account_ids=None):
+        rows, offset = [], 0
+        while True:
+            query = self.client.table('transaction_rollups')\
+                .select('date, account_id, category, type, amount, tx_count')\
+                .eq('user_id', user_id)
+            if start_date:
+                query = query.gte('date', start_date)
+            if end_date:
+                query = query.lte('date', end_date)
+            if account_ids:
+                query = query.in_('account_id', account_ids)
+            response = query.order('date')\
+                .order('account_id')\
+                .order('category')\
+                .order('type')\
+                .range(offset, offset + PAGE_SIZE - 1)\
+                .execute()
+            page = response.data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+            offset += PAGE_SIZE
+
+    def rebuild_rollups(self, user_id):
+        response = self.client.rpc('rebuild_transaction_rollups', {'p_user_id': user_id}).execute()
+        return int(response.data or 0)
@@ -0,0 +1,132 @@
+from dataclasses import dataclass, field
+from typing import List
+
+import pandas as pd
+
+SUMMARY_COLUMNS = [
+    "Account", "Type", "Opening Balance", "Total Incoming (Payments)", "Total Spent", "Remaining Balance"
+]
+
+
+@dataclass
+class AccountSummary:
+    account: str
+    type: str
+    opening: float = 0.0
+    income: float = 0.0
+    expense: float = 0.0
+    remaining: float = 0.0
+
+
+@dataclass
+class SummaryTotals:
+    opening: float = 0.0
+    income: float = 0.0
+    expense: float = 0.0
+    remaining: float = 0.0
+
+
+@dataclass
+class MonthSummary:
+    """
+    Per-account and total figures for one month.
+    Debit balances grow with income; credit (card) balances grow with
+    spending. `overall` nets credit openings off debit openings.
+    """
+    accounts: List[AccountSummary] = field(default_factory=list)
+    debit: SummaryTotals = field(default_factory=SummaryTotals)
+    credit: SummaryTotals = field(default_factory=SummaryTotals)
+    overall: SummaryTotals = field(default_factory=SummaryTotals)
+
+    def frame(self, account_type=None):
+        """
+        Account rows (optionally only "Debit" or "Credit") with the
+        column names shown in the app.
+        """
+        rows = [
+            [a.account, a.type, a.opening, a.income, a.expense, a.remaining]
+            for a in self.accounts
+            if account_type is None or a.type == account_type
+        ]
+        return pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+
+    def totals_frame(self):
+        """
+        The overall / debit / credit total rows.
+        """
+        return pd.DataFrame([
+            {
+                "Account": label,
+                "Opening Balance": t.opening,
+                "Total Spent": t.expense,
+                "Total Incoming (Payments)": t.income,
+                "Remaining Balance": t.remaining,
+            }
+            for label, t in [
+                ("Total (All Accounts)", self.overall),
+                ("Debit Summary", self.debit),
+                ("Credit Summary", self.credit),
+            ]
+        ])
+
+
+def account_totals(tx_df):
+    """
+    {account name: (income, expense)} from one group-by over the frame.
+    """
+    if tx_df.empty:
+        return {}
+    sums = (
+        tx_df.groupby(["Account", "Type"], observed=True)["Amount"]
+        .sum()
+        .unstack(fill_value=0.0)
+    )
+    income = sums["Income"] if "Income" in sums.columns else pd.Series(0.0, index=sums.index)
+    expense = sums["Expense"] if "Expense" in sums.columns else pd.Series(0.0, index=sums.index)
+    return {
+        name: (float(i), float(e))
+        for name, i, e in zip(sums.index, income.to_numpy(), expense.to_numpy())
+    }
+
+
+def summarize_month(tx_df, accounts, openings):
+    """
+    Summarize a month of transactions for every account.
+
+    tx_df: frame from fetch_transactions (Account, Type, Amount columns)
+    accounts: account rows (id, name, type)
+    openings: {account_id: opening} for the month
+    """
+    return summarize_totals(account_totals(tx_df), accounts, openings)
+
+
+def summarize_totals(totals, accounts, openings):
+    """
+    Same as summarize_month but from precomputed
+    {account name: (income, expense)} totals, e.g.
+    DashboardAggregates.account_totals().
+    """
+    summary = MonthSummary()
+
+    for a in accounts:
+        opening = float(openings.get(a["id"], 0.0))
+        income, expense = totals.get(a["name"], (0.0, 0.0))
+        if a["type"] == "Debit":
+            remaining = opening + income - expense
+            bucket = summary.debit
+        else:  # Credit
+            remaining = opening + expense - income
+            bucket = summary.credit
+
+        summary.accounts.append(AccountSummary(a["name"], a["type"], opening, income, expense, remaining))
+        bucket.opening += opening
+        bucket.income += income
+        bucket.expense += expense
+        bucket.remaining += remaining
+
+    overall = summary.overall
+    overall.opening = summary.debit.opening - summary.credit.opening
+    overall.income = summary.debit.income + summary.credit.income
+    overall.expense = summary.debit.expense + summary.credit.expense
+    overall.remaining = overall.opening + overall.income - overall.expense
+    return summary
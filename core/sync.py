@@ -0,0 +1,276 @@
+"""
+Local per-user replica of the transactions table, kept current by delta
+sync.
+
+Each transaction row carries an updated_at timestamp and deletes leave a
+tombstone (sql/transaction_sync.sql). A replica remembers the newest
+updated_at it has seen (its watermark) and on every sync asks only for
+rows changed since then, so after the first load a user pays for the
+rows that changed, not for their whole history. Enable with
+MONEYMAGIC_SYNC=1; fetch_transactions is then answered from the replica.
+"""
+import datetime
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from core.cache import estimate_size
+from core.storage import get_backend, page_limit
+from core.utils import date_bounds
+
+SYNC_ENABLED = os.environ.get("MONEYMAGIC_SYNC") == "1"
+
+# Seconds a replica is trusted without asking the server (local writes
+# always mark it stale)
+SYNC_INTERVAL = float(os.environ.get("MONEYMAGIC_SYNC_INTERVAL", "15"))
+# Re-read everything after this long without a sync, so tombstones can be
+# purged server-side
+SYNC_FULL_AFTER = float(os.environ.get("MONEYMAGIC_SYNC_FULL_AFTER", "86400"))
+# Changes committed slightly out of timestamp order are caught by
+# re-reading this many seconds before the watermark
+SYNC_OVERLAP = 5.0
+SYNC_PAGE_SIZE = 5000
+# Replicas kept in memory, and the memory they may hold together (least
+# recently used go first)
+REPLICA_LIMIT = int(os.environ.get("MONEYMAGIC_REPLICAS", "16"))
+REPLICA_MAX_BYTES = int(float(os.environ.get("MONEYMAGIC_REPLICAS_MB", "128")) * 1024 * 1024)
+# Rows measured to estimate a replica's size
+REPLICA_SIZE_SAMPLE = 64
+
+REPLICA_FIELDS = ['tx_uuid', 'date', 'account_id', 'category', 'description', 'type', 'amount', 'user_id']
+
+
+def _since(watermark):
+    """
+    The watermark moved back by SYNC_OVERLAP, in the fixed-width UTC format
+    the backends store.
+    """
+    stamp = datetime.datetime.fromisoformat(watermark).astimezone(datetime.timezone.utc)
+    stamp -= datetime.timedelta(seconds=SYNC_OVERLAP)
+    return stamp.strftime('%Y-%m-%dT%H:%M:%S.%f+00:00')
+
+
+@dataclass
+class SyncReport:
+    full: bool
+    changed: int
+    deleted: int
+    seconds: float
+
+
+class TransactionReplica:
+    """
+    One user's transactions, bucketed by month ('YYYY-MM') so a date range
+    only touches the months it covers.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.watermark = None
+        self.synced_at = None
+        self.stale = True
+        self.nbytes = 0      # approximate, measured after each sync
+        self._months = {}    # 'YYYY-MM' -> {tx_uuid: row}
+        self._month_of = {}  # tx_uuid -> 'YYYY-MM'
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._month_of)
+
+    def _remove(self, tx_uuid):
+        month = self._month_of.pop(tx_uuid, None)
+        if month is not None:
+            bucket = self._months[month]
+            bucket.pop(tx_uuid, None)
+            if not bucket:
+                del self._months[month]
+
+    def _put(self, row):
+        tx_uuid = row['tx_uuid']
+        month = str(row['date'])[:7]
+        if self._month_of.get(tx_uuid) != month:
+            self._remove(tx_uuid)
+            self._month_of[tx_uuid] = month
+        self._months.setdefault(month, {})[tx_uuid] = {f: row.get(f) for f in REPLICA_FIELDS}
+
+    def reset(self):
+        with self._lock:
+            self.watermark = None
+            self.synced_at = None
+            self.stale = True
+            self.nbytes = 0
+            self._months.clear()
+            self._month_of.clear()
+
+    def _measure(self):
+        """
+        Approximate memory held by the rows: their number times the mean
+        size of a sample of them.
+        """
+        rows = (row for bucket in self._months.values() for row in bucket.values())
+        sample = list(itertools.islice(rows, REPLICA_SIZE_SAMPLE))
+        if not sample:
+            return 0
+        return len(self._month_of) * sum(estimate_size(row) for row in sample) // len(sample)
+
+    def sync(self, force=False):
+        """
+        Bring the replica up to date. Returns a SyncReport, or None when it
+        was fresh enough to skip the round trip.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.synced_at is not None and now - self.synced_at > SYNC_FULL_AFTER:
+                self.reset()
+            if not (force or self.stale or self.synced_at is None or now - self.synced_at >= SYNC_INTERVAL):
+                return None
+
+            started = time.perf_counter()
+            full = self.watermark is None
+            since = None if full else _since(self.watermark)
+            backend = get_backend()
+            # Capped at the server's row limit, so a short page is the last
+            page_size = page_limit(SYNC_PAGE_SIZE, backend)
+            changed = deleted = 0
+            last = None
+            while True:
+                rows = backend.select_changes(self.user_id, since=since, after=last, limit=page_size)
+                for row in rows:
+                    if row.get('deleted'):
+                        self._remove(row['tx_uuid'])
+                        deleted += 1
+                    else:
+                        self._put(row)
+                        changed += 1
+                if rows:
+                    last = (rows[-1]['updated_at'], rows[-1]['tx_uuid'])
+                if len(rows) < page_size:
+                    break
+            if last is not None:
+                self.watermark = last[0]
+            self.synced_at = now
+            self.stale = False
+            self.nbytes = self._measure()
+            return SyncReport(full, changed, deleted, time.perf_counter() - started)
+
+    def rows(self, start_date=None, end_date=None):
+        """
+        Replica rows with start_date <= date <= end_date (ISO strings).
+        """
+        with self._lock:
+            found = []
+            for month, bucket in self._months.items():
+                if start_date and month < start_date[:7]:
+                    continue
+                if end_date and month > end_date[:7]:
+                    continue
+                for row in bucket.values():
+                    date = str(row['date'])[:10]
+                    if (not start_date or date >= start_date) and (not end_date or date <= end_date):
+                        found.append(row)
+            return found
+
+    def records(self, month_filter=None, start_date=None, end_date=None, account_ids=None, types=None):
+        """
+        Rows matching the fetch_transactions filters, newest first, with the
+        accounts(name) join filled in from the accounts cache, so renames
+        show up at once.
+        """
+        from core.accounts import get_accounts
+
+        start, end = date_bounds(month_filter, start_date, end_date)
+        names = {a['id']: a['name'] for a in get_accounts(self.user_id)}
+        account_ids = set(account_ids) if account_ids else None
+        types = set(types) if types else None
+        records = [
+            {**row, 'accounts': {'name': names[row['account_id']]}}
+            for row in self.rows(start, end)
+            # Rows of unknown accounts are dropped, like the inner join
+            if row['account_id'] in names
+            and (account_ids is None or row['account_id'] in account_ids)
+            and (types is None or row['type'] in types)
+        ]
+        records.sort(key=lambda r: (str(r['date']), r['tx_uuid']), reverse=True)
+        return records
+
+    def frame(self, month_filter=None, start_date=None, end_date=None, account_ids=None, types=None):
+        """
+        Same frame as fetch_transactions for the same filters.
+        """
+        from core.transactions import transactions_frame
+
+        return transactions_frame(self.records(month_filter, start_date, end_date, account_ids, types))
+
+
+_replicas = OrderedDict()
+_replicas_lock = threading.Lock()
+
+
+def get_replica(user_id):
+    """
+    The process-wide replica of a user's transactions (not yet synced
+    when new).
+    """
+    with _replicas_lock:
+        replica = _replicas.get(user_id)
+        if replica is None:
+            replica = _replicas[user_id] = TransactionReplica(user_id)
+            while len(_replicas) > REPLICA_LIMIT:
+                _replicas.popitem(last=False)
+        else:
+            _replicas.move_to_end(user_id)
+        return replica
+
+
+def _trim(keep):
+    """
+    Drop least recently used replicas until all of them together fit in
+    REPLICA_MAX_BYTES; the replica of `keep` (just read) stays.
+    """
+    with _replicas_lock:
+        total = sum(replica.nbytes for replica in _replicas.values())
+        for user_id in list(_replicas):
+            if total <= REPLICA_MAX_BYTES:
+                break
+            if user_id != keep:
+                total -= _replicas.pop(user_id).nbytes
+
+
+def mark_stale(user_id=None):
+    """
+    Make the next read of a user's replica (or everyone's) sync first.
+    """
+    with _replicas_lock:
+        replicas = list(_replicas.values()) if user_id is None else [_replicas.get(user_id)]
+    for replica in replicas:
+        if replica is not None:
+            replica.stale = True
+
+
+def reset_replicas():
+    with _replicas_lock:
+        _replicas.clear()
+
+
+def replica_frame(month_filter=None, start_date=None, end_date=None, account_ids=None, types=None, user_id=None):
+    """
+    fetch_transactions answered from the user's synced replica.
+    """
+    replica = get_replica(user_id)
+    if replica.sync() is not None:
+        _trim(user_id)
+    return replica.frame(month_filter, start_date, end_date, account_ids, types)
+
+
+def replica_records(month_filter=None, start_date=None, end_date=None, account_ids=None, types=None, user_id=None):
+    """
+    Rows of the user's synced replica in the shape select_transactions
+    returns them.
+    """
+    replica = get_replica(user_id)
+    if replica.sync() is not None:
+        _trim(user_id)
+    return replica.records(month_filter, start_date, end_date, account_ids, types)
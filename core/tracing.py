@@ -0,0 +1,201 @@
+"""
+Per-call tracing of storage access, grouped by Streamlit rerun.
+
+The app opens a trace at the start of a rerun with start_rerun(); while it
+is active every backend call made from that context is recorded with its
+operation, table, filters, row count, approximate response size and wall
+time. Outside a trace the wrapper only costs a context lookup.
+"""
+import contextvars
+import inspect
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from core.storage.base import StorageBackend
+
+# How many finished reruns to keep for inspection
+TRACE_HISTORY = 50
+
+TABLES = {
+    'list_accounts': 'accounts',
+    'insert_account': 'accounts',
+    'update_account': 'accounts',
+    'delete_account': 'accounts',
+    'account_has_transactions': 'transactions',
+    'list_balances': 'balances',
+    'get_opening': 'balances',
+    'list_openings': 'balances',
+    'save_opening': 'balances',
+    'get_transactions': 'transactions',
+    'insert_transactions': 'transactions',
+    'update_transaction': 'transactions',
+    'upsert_transactions': 'transactions',
+    'delete_transactions': 'transactions',
+    'select_transactions': 'transactions',
+    'dashboard_aggregates': 'transactions',
+    'select_changes': 'transaction_changes',
+    'select_rollups': 'transaction_rollups',
+    'rebuild_rollups': 'transaction_rollups',
+}
+
+# Arguments that carry payloads rather than filters; only their size is kept
+PAYLOAD_ARGS = {'data', 'rows', 'updates', 'tx_uuids'}
+
+
+@dataclass
+class Call:
+    operation: str
+    table: str
+    filters: dict
+    started: float
+    seconds: float = 0.0
+    rows: int = 0
+    bytes: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class RerunTrace:
+    label: str
+    started: float = field(default_factory=time.perf_counter)
+    calls: List[Call] = field(default_factory=list)
+
+    @property
+    def total_seconds(self):
+        return sum(c.seconds for c in self.calls)
+
+    @property
+    def total_bytes(self):
+        return sum(c.bytes for c in self.calls)
+
+    def records(self):
+        """
+        One dict per call, with start offsets relative to the rerun start
+        (milliseconds), ready for a table or a waterfall chart.
+        """
+        return [
+            {
+                'Operation': c.operation,
+                'Table': c.table,
+                'Filters': json.dumps(c.filters, default=str),
+                'Rows': c.rows,
+                'KB': round(c.bytes / 1024, 1),
+                'Start (ms)': round((c.started - self.started) * 1000, 2),
+                'Duration (ms)': round(c.seconds * 1000, 2),
+                'Error': c.error,
+            }
+            for c in self.calls
+        ]
+
+
+_current = contextvars.ContextVar("moneymagic_rerun_trace", default=None)
+_history = deque(maxlen=TRACE_HISTORY)
+_history_lock = threading.Lock()
+
+
+def start_rerun(label="rerun"):
+    """
+    Begin recording calls made from the current context.
+    Returns the new RerunTrace.
+    """
+    trace = RerunTrace(label=label)
+    _current.set(trace)
+    with _history_lock:
+        _history.append(trace)
+    return trace
+
+
+def stop_rerun():
+    """
+    Stop recording; returns the trace that was active (or None).
+    """
+    trace = _current.get()
+    _current.set(None)
+    return trace
+
+
+def current_trace():
+    return _current.get()
+
+
+def recent_traces():
+    """
+    The last TRACE_HISTORY reruns that were traced in this process.
+    """
+    with _history_lock:
+        return list(_history)
+
+
+def _payload_size(value):
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _filters(signature, args, kwargs):
+    try:
+        bound = signature.bind(*args, **kwargs)
+    except TypeError:
+        return {}
+    filters = {}
+    for name, value in bound.arguments.items():
+        if name in PAYLOAD_ARGS:
+            filters[name] = f"{len(value)} items" if hasattr(value, '__len__') else str(value)
+        elif value is not None:
+            filters[name] = value
+    return filters
+
+
+class TracingBackend:
+    """
+    Wraps a StorageBackend and records its calls into the active
+    RerunTrace. Attributes other than the storage methods pass through.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.name = inner.name
+
+    def __getattr__(self, name):
+        attr = getattr(self.inner, name)
+        if name not in TABLES or not callable(attr):
+            return attr
+        signature = inspect.signature(attr)
+
+        def traced(*args, **kwargs):
+            trace = _current.get()
+            if trace is None:
+                return attr(*args, **kwargs)
+            call = Call(
+                operation=name,
+                table=TABLES[name],
+                filters=_filters(signature, args, kwargs),
+                started=time.perf_counter(),
+            )
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                call.error = str(e)
+                raise
+            finally:
+                call.seconds = time.perf_counter() - call.started
+                trace.calls.append(call)
+            if isinstance(result, list):
+                call.rows = len(result)
+            elif result:
+                call.rows = 1
+            call.bytes = _payload_size(result)
+            return result
+
+        traced.__name__ = name
+        # Cache on the instance so the wrapper is built once per method
+        self.__dict__[name] = traced
+        return traced
+
+
+StorageBackend.register(TracingBackend)
@@ -1,11 +1,27 @@
-import datetime
 import pandas as pd
-from core.database import get_supabase_client
+from core import sync
+from core.cache import MISSING, shared_cache
+from core.ledger import Ledger
+from core.storage import get_backend, page_limit
+from core.utils import date_bounds
 
-def add_transaction(tx_date, account_id, category, description, tx_type, amount, user_id):
-    supabase = get_supabase_client()
-    
-    data = {
+# Columns of the frame returned by fetch_transactions
+TX_COLUMNS = ["Transaction_ID", "Date", "Account", "Category", "Description", "Type", "Amount"]
+
+# Rows per page when reading transactions
+DEFAULT_PAGE_SIZE = 1000
+
+# Whole months per user as compact Ledgers, filtered locally by the view;
+# writes invalidate them.
+MONTH_CACHE_TTL = 300
+_month_cache = shared_cache.namespace("months", ttl=MONTH_CACHE_TTL)
+
+
+def tx_record(tx_date, account_id, category, description, tx_type, amount, user_id):
+    """
+    Build a transactions row in the shape the database expects.
+    """
+    return {
         'date': tx_date.isoformat() if hasattr(tx_date, 'isoformat') else str(tx_date),
         'account_id': account_id,
         'category': category,
@@ -14,103 +30,254 @@ def add_transaction(tx_date, account_id, category, description, tx_type, amount,
         'amount': float(amount),
         'user_id': user_id
     }
+
+
+def _iso(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def _written(*row_lists):
+    """
+    Bookkeeping after a write: drop the cached months of the users whose
+    rows changed (everyone's if a row doesn't say).
+    """
+    users = set()
+    for rows in row_lists:
+        for row in rows:
+            if row and row.get('user_id') is None:
+                invalidate_month_cache()
+                sync.mark_stale()
+                return
+            if row:
+                users.add(row['user_id'])
+    for user_id in users:
+        invalidate_month_cache(user_id)
+        sync.mark_stale(user_id)
+
+
+def add_transaction(tx_date, account_id, category, description, tx_type, amount, user_id):
+    data = tx_record(tx_date, account_id, category, description, tx_type, amount, user_id)
     
-    response = supabase.table('transactions')\
-        .insert(data)\
-        .execute()
+    rows = get_backend().insert_transactions([data])
+    _written([data])
         
-    return response.data[0]['tx_uuid'] if response.data else None
+    return rows[0]['tx_uuid'] if rows else None
 
 def update_transaction_by_uuid(tx_uuid, updates: dict):
-    supabase = get_supabase_client()
-    
     # Convert any date objects to ISO format
     for key, value in updates.items():
         if hasattr(value, 'isoformat'):
             updates[key] = value.isoformat()
     
-    response = supabase.table('transactions')\
-        .update(updates)\
-        .eq('tx_uuid', tx_uuid)\
-        .execute()
-        
-    return response.data[0] if response.data else None
+    row = get_backend().update_transaction(tx_uuid, updates)
+    _written([row] if row else [])
+    return row
 
 def delete_transaction_by_uuid(tx_uuid):
-    supabase = get_supabase_client()
-    
-    response = supabase.table('transactions')\
-        .delete()\
-        .eq('tx_uuid', tx_uuid)\
-        .execute()
+    rows = get_backend().delete_transactions([tx_uuid])
+    _written(rows)
         
-    return response.data[0] if response.data else None
+    return rows[0] if rows else None
+
+def add_transactions(rows):
+    """
+    Insert many rows (see tx_record) in bulk.
+    Returns the inserted rows.
+    """
+    rows = list(rows)
+    inserted = get_backend().insert_transactions(rows)
+    _written(rows)
+    return inserted
+
+def upsert_transactions(rows):
+    """
+    Update many existing rows in bulk, matched on tx_uuid.
+    Each row must carry tx_uuid plus the full set of row columns.
+    Returns the written rows.
+    """
+    rows = list(rows)
+    for row in rows:
+        row['date'] = _iso(row.get('date'))
+    written = get_backend().upsert_transactions(rows)
+    _written(rows)
+    return written
+
+def delete_transactions_by_uuid(tx_uuids):
+    """
+    Delete many transactions with one bulk `in` delete.
+    Returns the deleted rows.
+    """
+    deleted = get_backend().delete_transactions(list(tx_uuids))
+    _written(deleted)
+    return deleted
+
+def transactions_frame(records):
+    """
+    Build the transactions DataFrame from raw response rows column by column:
+    dates are parsed in one call, Account/Category/Type become categoricals
+    and Amount a float64 array.
+    """
+    if not records:
+        return pd.DataFrame(columns=TX_COLUMNS)
+
+    raw = pd.DataFrame.from_records(
+        records, columns=['tx_uuid', 'date', 'category', 'description', 'type', 'amount', 'accounts']
+    )
+    account_names = [acc.get('name') if acc else None for acc in raw['accounts'].tolist()]
+
+    return pd.DataFrame({
+        'Transaction_ID': raw['tx_uuid'],
+        'Date': pd.to_datetime(raw['date'], format='ISO8601').dt.date,
+        'Account': pd.Categorical(account_names),
+        'Category': raw['category'].astype('category'),
+        'Description': raw['description'],
+        'Type': raw['type'].astype('category'),
+        'Amount': pd.to_numeric(raw['amount'], errors='coerce').astype('float64'),
+    })
+
+def iter_transaction_pages(
+    month_filter=None, start_date=None, end_date=None,
+    account_ids=None, types=None, user_id=None, page_size=DEFAULT_PAGE_SIZE
+):
+    """
+    Yield the matching transaction rows in chunks of at most page_size,
+    newest first. Pages are walked with keyset pagination on
+    (date, tx_uuid), so every row is returned exactly once however many
+    there are. page_size is capped at the backend's row limit (1000 on
+    Supabase), so a short page is always the last one.
+    """
+    backend = get_backend()
+    page_size = page_limit(page_size, backend)
+    start, end = date_bounds(month_filter, start_date, end_date)
+    last = None
+    while True:
+        rows = backend.select_transactions(
+            user_id=user_id,
+            start_date=start,
+            end_date=end,
+            account_ids=account_ids or None,
+            types=types or None,
+            after=last,
+            limit=page_size,
+        )
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        last = (rows[-1]['date'], rows[-1]['tx_uuid'])
+
+def _concat_frames(frames):
+    """
+    Concatenate per-page frames, restoring the categorical columns that
+    pd.concat widens to object when the pages' categories differ.
+    """
+    if not frames:
+        return transactions_frame([])
+    if len(frames) == 1:
+        return frames[0]
+    df = pd.concat(frames, ignore_index=True)
+    return df.astype({'Account': 'category', 'Category': 'category', 'Type': 'category'})
+
+def fetch_transactions_paged(
+    month_filter=None, start_date=None, end_date=None,
+    account_ids=None, types=None, user_id=None, page_size=DEFAULT_PAGE_SIZE
+):
+    """
+    Fetch all matching transactions page by page, converting each page to
+    a compact frame as it arrives instead of buffering one huge response.
+    """
+    frames = [
+        transactions_frame(rows)
+        for rows in iter_transaction_pages(
+            month_filter, start_date, end_date, account_ids, types, user_id, page_size
+        )
+    ]
+    return _concat_frames(frames)
 
 def fetch_transactions(
     month_filter=None, start_date=None, end_date=None,
     account_ids=None, types=None, user_id=None
 ):
-    supabase = get_supabase_client()
-    
-    # Build query
-    query = supabase.table('transactions')\
-        .select(
-            'tx_uuid, date, account_id, category, description, type, amount, user_id, accounts!inner(name)'
+    if sync.SYNC_ENABLED and user_id is not None:
+        return sync.replica_frame(
+            month_filter=month_filter,
+            start_date=start_date,
+            end_date=end_date,
+            account_ids=account_ids,
+            types=types,
+            user_id=user_id,
         )
+    return fetch_transactions_paged(
+        month_filter=month_filter,
+        start_date=start_date,
+        end_date=end_date,
+        account_ids=account_ids,
+        types=types,
+        user_id=user_id,
+    )
 
-    # Always filter by user_id if provided
-    if user_id is not None:
-        query = query.eq('user_id', user_id)
-
-    # Handle month filter
-    if month_filter:
-        months = [
-            'January','February','March','April','May','June',
-            'July','August','September','October','November','December'
-        ]
-        month_index = months.index(month_filter) + 1
-        year = datetime.datetime.today().year 
-        start_of_month = datetime.date(year, month_index, 1)
-        # first day of next month, then subtract 1 day
-        end_of_month = (start_of_month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1) - datetime.timedelta(days=1)
-
-        query = query.gte('date', start_of_month.isoformat())
-        query = query.lte('date', end_of_month.isoformat())
-        
 
-    # Apply optional filters
-    if start_date:
-        query = query.gte('date', start_date.isoformat() if hasattr(start_date, 'isoformat') else str(start_date))
-    if end_date:
-        query = query.lte('date', end_date.isoformat() if hasattr(end_date, 'isoformat') else str(end_date))
+# ------------- Cached months -------------
 
-    if account_ids:
-        query = query.in_('account_id', account_ids)
-    if types and len(types) > 0:
-        query = query.in_('type', types)
+def fetch_month_ledger(month_filter, user_id):
+    """
+    Every transaction of a month (all accounts and types) for a user as a
+    core.ledger.Ledger, served from the month cache when possible (or
+    built from the synced replica when sync is on). The ledger is shared:
+    narrow it with Ledger.filter(), which returns a new one.
+    """
+    if sync.SYNC_ENABLED:
+        return Ledger.from_records(sync.replica_records(month_filter=month_filter, user_id=user_id))
+    key = date_bounds(month_filter)
+    ledger = _month_cache.get(user_id, key)
+    if ledger is MISSING:
+        # A write invalidating the month during the read keeps this
+        # (possibly older) copy out of the cache
+        generation = _month_cache.generation()
+        ledger = Ledger.from_records(
+            row for page in iter_transaction_pages(month_filter=month_filter, user_id=user_id) for row in page
+        )
+        _month_cache.set(user_id, ledger, key, generation=generation)
+    return ledger
 
-    # Sort results
-    query = query.order('date', desc=True)
-    query = query.range(0, 9999)
+def month_cached(month_filter, user_id):
+    """
+    True if fetch_month_ledger() would be answered without a read.
+    """
+    return sync.SYNC_ENABLED or _month_cache.contains(user_id, date_bounds(month_filter))
 
-    # Execute
-    response = query.execute()
-    
-    if not response.data:
-        return pd.DataFrame(columns=["Transaction_ID", "Date", "Account", "Category", "Description", "Type", "Amount"])
-    
-    # Convert to DataFrame
-    df_data = []
-    for row in response.data:
-        account_name = row['accounts']['name'] if row.get('accounts') else None
-        df_data.append({
-            'Transaction_ID': row['tx_uuid'],
-            'Date': pd.to_datetime(row['date']).date(),
-            'Account': account_name,
-            'Category': row['category'],
-            'Description': row['description'],
-            'Type': row['type'],
-            'Amount': float(row['amount'])
-        })
-    
-    return pd.DataFrame(df_data)
\ No newline at end of file
+def fetch_month_transactions(month_filter, user_id):
+    """
+    fetch_month_ledger() as a transactions frame (a new frame every call).
+    """
+    return fetch_month_ledger(month_filter, user_id).to_frame()
+
+def filter_transactions(df, start_date=None, end_date=None, accounts=None, types=None):
+    """
+    Rows of a transactions frame inside [start_date, end_date] whose
+    Account name is in `accounts` and Type in `types` (None = no filter).
+    Always returns a new frame.
+    """
+    mask = pd.Series(True, index=df.index)
+    if start_date is not None:
+        mask &= df['Date'] >= start_date
+    if end_date is not None:
+        mask &= df['Date'] <= end_date
+    if accounts:
+        mask &= df['Account'].isin(accounts)
+    if types:
+        mask &= df['Type'].isin(types)
+    return df[mask].reset_index(drop=True)
+
+def invalidate_month_cache(user_id=None):
+    """
+    Forget cached months for a user (or for everyone).
+    """
+    _month_cache.invalidate(user_id)
+
+def month_cache_stats():
+    """
+    Hit/miss counters, entries and bytes of the month cache.
+    """
+    return _month_cache.stats()
@@ -1,3 +1,4 @@
+import datetime as dt
 from datetime import datetime
 import uuid
 
@@ -6,6 +7,12 @@ MONTHS = [
     'July','August','September','October','November','December'
 ]
 
+CATEGORIES = [
+    "Food", "Transport", "Bills", "Shopping", "Rent", "Salary",
+    "Payment", "Investment", "Entertainment", "Health",
+    "Education", "Other"
+]
+
 def month_name_from_index(i):
     return MONTHS[i-1]
 
@@ -14,3 +21,25 @@ def today_iso():
 
 def gen_uuid():
     return str(uuid.uuid4())
+
+def date_bounds(month_filter=None, start_date=None, end_date=None):
+    """
+    Combine a month name (current year) and optional start/end dates into
+    one inclusive (start, end) pair of ISO date strings (either may be None).
+    """
+    starts, ends = [], []
+
+    if month_filter:
+        month_index = MONTHS.index(month_filter) + 1
+        start_of_month = dt.date(datetime.today().year, month_index, 1)
+        # first day of next month, then subtract 1 day
+        end_of_month = (start_of_month.replace(day=28) + dt.timedelta(days=4)).replace(day=1) - dt.timedelta(days=1)
+        starts.append(start_of_month.isoformat())
+        ends.append(end_of_month.isoformat())
+
+    if start_date:
+        starts.append(str(start_date.isoformat() if hasattr(start_date, 'isoformat') else start_date))
+    if end_date:
+        ends.append(str(end_date.isoformat() if hasattr(end_date, 'isoformat') else end_date))
+
+    return (max(starts) if starts else None), (min(ends) if ends else None)
@@ -0,0 +1,446 @@
+"""
+Write-behind queue for transaction writes.
+
+Adding a transaction used to block the form on an insert and then rerun
+the app, which read the month again: one round trip plus a full reload
+per receipt. Now new, edited and deleted transactions are queued here and
+the call returns at once:
+
+- Optimistic view: PageData.month_ledger() lays the user's queued
+  changes over the cached month (apply_pending), so they show up, and
+  count in the totals, before they are written.
+- Batching: a background thread writes a user's queue in one bulk upsert
+  (and one bulk delete) once the oldest change has waited
+  WRITEBACK_DELAY seconds, or as soon as WRITEBACK_BATCH changes are
+  queued.
+- Idempotency: every change carries its tx_uuid (new rows get one when
+  queued) and is written with an upsert on it, so a batch that is
+  retried after a failure whose write did land creates no duplicates.
+  A later change to a queued row replaces the queued one.
+- Retry: when a batch fails its changes are written one by one, so only
+  the ones that fail themselves stay queued; they are retried with
+  exponential backoff and after WRITEBACK_MAX_ATTEMPTS move to the user's
+  failures (failures()), shown in the view with Retry / Discard.
+
+Every write bumps the user's revision, which PageData uses to read the
+month afresh. A user's queue is dropped once it has been empty for
+WRITEBACK_IDLE seconds. Set MONEYMAGIC_WRITEBACK=0 to write in the caller
+instead.
+"""
+import atexit
+import datetime
+import itertools
+import math
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from core import transactions
+from core.utils import date_bounds
+
+WRITEBACK_ENABLED = os.environ.get("MONEYMAGIC_WRITEBACK", "1") == "1"
+# Seconds a change waits for others to share its batch
+WRITEBACK_DELAY = float(os.environ.get("MONEYMAGIC_WRITEBACK_DELAY", "2"))
+# Queued changes that trigger a write without waiting
+WRITEBACK_BATCH = int(os.environ.get("MONEYMAGIC_WRITEBACK_BATCH", "50"))
+WRITEBACK_MAX_ATTEMPTS = 5
+# Seconds before the first retry, doubled on each further failure
+WRITEBACK_RETRY_BASE = 1.0
+WRITEBACK_RETRY_MAX = 60.0
+# Changes of a failed batch written one by one stop after this many fail
+# in a row: then the backend, not the changes, is failing
+WRITEBACK_ISOLATE_FAILURES = 3
+# Seconds an empty queue is kept before it is dropped
+WRITEBACK_IDLE = 600.0
+
+
+@dataclass
+class PendingWrite:
+    """
+    One queued change: a full transactions row to upsert (with tx_uuid
+    and the accounts(name) join for the view), or a delete (row is None).
+    """
+    tx_uuid: str
+    row: dict = None
+    seq: int = 0
+    queued_at: float = 0.0
+    attempts: int = 0
+    error: str = None
+
+    @property
+    def is_delete(self):
+        return self.row is None
+
+
+@dataclass
+class _UserQueue:
+    pending: dict = field(default_factory=dict)  # tx_uuid -> PendingWrite, in queue order
+    failed: dict = field(default_factory=dict)   # tx_uuid -> PendingWrite
+    revision: int = 0
+    retry_at: float = 0.0
+    touched: float = 0.0  # last enqueue or write
+    flush_lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+_cond = threading.Condition()
+_queues = {}  # user_id -> _UserQueue
+_seq = itertools.count(1)
+# Revisions are never reused, so a view can't mistake a later state of a
+# queue (or a dropped one) for the state it read
+_revisions = itertools.count(1)
+_idle_revision = 0  # revision of every user without a queue
+_thread = None
+_stats = {'queued': 0, 'written': 0, 'batches': 0, 'retries': 0, 'failed': 0}
+
+
+def _queue(user_id):
+    queue = _queues.get(user_id)
+    if queue is None:
+        queue = _queues[user_id] = _UserQueue(revision=_idle_revision)
+    queue.touched = time.monotonic()
+    return queue
+
+
+def _prune(now):
+    """
+    Drop the queues that have been empty for WRITEBACK_IDLE seconds. Users
+    without a queue then share a new idle revision, so a view still holding
+    a revision of a dropped queue reads afresh (views of other users
+    without a queue read once more too).
+    """
+    global _idle_revision
+    idle = [
+        user_id for user_id, queue in _queues.items()
+        if not queue.pending and not queue.failed and not queue.flush_lock.locked()
+        and now - queue.touched >= WRITEBACK_IDLE
+    ]
+    for user_id in idle:
+        del _queues[user_id]
+    if idle:
+        _idle_revision = next(_revisions)
+
+
+def _backend_row(row):
+    """
+    The row as written: tx_record columns plus tx_uuid, without the join.
+    """
+    return {k: v for k, v in row.items() if k != 'accounts'}
+
+
+def _write(batch):
+    """
+    Write a batch of PendingWrites: one bulk upsert and one bulk delete.
+    """
+    rows = [_backend_row(entry.row) for entry in batch if not entry.is_delete]
+    deleted = [entry.tx_uuid for entry in batch if entry.is_delete]
+    if rows:
+        transactions.upsert_transactions(rows)
+    if deleted:
+        transactions.delete_transactions_by_uuid(deleted)
+
+
+def _write_each(batch):
+    """
+    Write the changes of a failed batch one at a time. Returns the
+    changes written and (change, error) for the others; once
+    WRITEBACK_ISOLATE_FAILURES fail in a row the rest are not tried and
+    count as failed with the last error.
+    """
+    written, failed, streak = [], [], 0
+    for i, entry in enumerate(batch):
+        try:
+            _write([entry])
+        except Exception as e:
+            failed.append((entry, e))
+            streak += 1
+            if streak >= WRITEBACK_ISOLATE_FAILURES:
+                failed.extend((rest, e) for rest in batch[i + 1:])
+                break
+        else:
+            written.append(entry)
+            streak = 0
+    return written, failed
+
+
+def _problem(row):
+    """
+    Why a row can't be written (a required column is missing or invalid),
+    or None.
+    """
+    if row.get('account_id') is None:
+        return "no account"
+    try:
+        datetime.date.fromisoformat(str(row.get('date'))[:10])
+    except ValueError:
+        return "no valid date"
+    if not row.get('type'):
+        return "no type"
+    try:
+        if math.isnan(float(row.get('amount'))):
+            return "no amount"
+    except (TypeError, ValueError):
+        return "no amount"
+    return None
+
+
+def _start():
+    global _thread
+    if _thread is None:
+        _thread = threading.Thread(target=_flusher, name="moneymagic-writeback", daemon=True)
+        _thread.start()
+        # The thread is a daemon; don't lose what is still queued at exit
+        atexit.register(flush)
+
+
+def enqueue(rows=(), deleted=(), user_id=None):
+    """
+    Queue full transactions rows (tx_record plus an optional tx_uuid and
+    accounts(name) join) to be written, and ids to be deleted. Rows
+    without a tx_uuid are new and get one here. Returns the ids queued.
+    Rows missing a required column (account, date, type, amount) are
+    rejected at once with an Exception and nothing is queued.
+
+    With MONEYMAGIC_WRITEBACK=0 the changes are written before returning
+    and errors are raised to the caller.
+    """
+    rows = list(rows)
+    problems = [
+        f"{row.get('date')} {row.get('description') or ''}: {problem}".strip()
+        for row in rows
+        for problem in [_problem(row)] if problem
+    ]
+    if problems:
+        raise Exception(f"Cannot save {len(problems)} rows ({'; '.join(problems[:5])})")
+    now = time.monotonic()
+    entries = []
+    for row in rows:
+        row = dict(row)
+        row['tx_uuid'] = row.get('tx_uuid') or str(uuid.uuid4())
+        entries.append(PendingWrite(tx_uuid=row['tx_uuid'], row=row))
+    entries.extend(PendingWrite(tx_uuid=tx_uuid) for tx_uuid in deleted)
+    if not entries:
+        return []
+    for entry in entries:
+        entry.seq = next(_seq)
+        entry.queued_at = now
+        user_id = user_id or (entry.row or {}).get('user_id')
+    if user_id is None:
+        raise Exception("Queued transaction writes need a user_id")
+
+    if not WRITEBACK_ENABLED:
+        _write(entries)
+        with _cond:
+            _queue(user_id).revision = next(_revisions)
+            _prune(time.monotonic())
+        return [entry.tx_uuid for entry in entries]
+
+    with _cond:
+        queue = _queue(user_id)
+        for entry in entries:
+            # A newer change to the same row supersedes the queued one
+            queue.pending.pop(entry.tx_uuid, None)
+            queue.failed.pop(entry.tx_uuid, None)
+            queue.pending[entry.tx_uuid] = entry
+        _stats['queued'] += len(entries)
+        _start()
+        _cond.notify_all()
+    return [entry.tx_uuid for entry in entries]
+
+
+def queue_transaction(tx_date, account_id, category, description, tx_type, amount, user_id, account_name=None):
+    """
+    add_transaction(), queued. Returns the new row's tx_uuid at once.
+    """
+    row = transactions.tx_record(tx_date, account_id, category, description, tx_type, amount, user_id)
+    row['accounts'] = {'name': account_name} if account_name else None
+    return enqueue([row], user_id=user_id)[0]
+
+
+def _due(queue, now):
+    """
+    Seconds until a queue should be written (<= 0: now, None: empty).
+    """
+    if not queue.pending:
+        return None
+    if len(queue.pending) >= WRITEBACK_BATCH and not queue.retry_at:
+        return 0.0
+    oldest = min(entry.queued_at for entry in queue.pending.values())
+    return max(oldest + WRITEBACK_DELAY, queue.retry_at) - now
+
+
+def _flush_user(user_id, queue):
+    """
+    Write everything a user has queued. Returns the number of changes
+    written; the ones that failed stay queued for retry.
+    """
+    with queue.flush_lock:
+        with _cond:
+            batch = list(queue.pending.values())
+        if not batch:
+            return 0
+        try:
+            _write(batch)
+            written, failed = batch, []
+        except Exception as e:
+            # Find the changes that fail on their own
+            written, failed = _write_each(batch) if len(batch) > 1 else ([], [(batch[0], e)])
+        with _cond:
+            for entry in written:
+                # Unless a newer change to the row was queued meanwhile
+                if queue.pending.get(entry.tx_uuid) is entry:
+                    del queue.pending[entry.tx_uuid]
+            if written:
+                queue.revision = next(_revisions)
+                _stats['batches'] += 1
+                _stats['written'] += len(written)
+            attempts = 0
+            for entry, error in failed:
+                entry.attempts += 1
+                entry.error = str(error)
+                attempts = max(attempts, entry.attempts)
+                if entry.attempts >= WRITEBACK_MAX_ATTEMPTS and queue.pending.get(entry.tx_uuid) is entry:
+                    del queue.pending[entry.tx_uuid]
+                    queue.failed[entry.tx_uuid] = entry
+                    _stats['failed'] += 1
+            if failed:
+                _stats['retries'] += 1
+                delay = min(WRITEBACK_RETRY_BASE * 2 ** (attempts - 1), WRITEBACK_RETRY_MAX)
+                queue.retry_at = time.monotonic() + delay if queue.pending else 0.0
+            else:
+                queue.retry_at = 0.0
+            queue.touched = time.monotonic()
+        return len(written)
+
+
+def _flusher():
+    while True:
+        with _cond:
+            while True:
+                now = time.monotonic()
+                _prune(now)
+                waits = {user_id: _due(queue, now) for user_id, queue in _queues.items()}
+                due = [(user_id, _queues[user_id]) for user_id, wait in waits.items()
+                       if wait is not None and wait <= 0]
+                if due:
+                    break
+                pending = [wait for wait in waits.values() if wait is not None]
+                # Also wake up to drop queues that go idle
+                pending += [
+                    max(queue.touched + WRITEBACK_IDLE - now, 0.1)
+                    for queue in _queues.values() if not queue.pending and not queue.failed
+                ]
+                _cond.wait(min(pending) if pending else None)
+        for user_id, queue in due:
+            _flush_user(user_id, queue)
+
+
+def flush(user_id=None):
+    """
+    Write a user's (or everyone's) queued changes now, in the calling
+    thread, ignoring the delay and any retry backoff. Returns the number
+    of changes written; failed ones stay queued.
+    """
+    with _cond:
+        users = list(_queues) if user_id is None else [user_id]
+        queues = [(u, _queues[u]) for u in users if u in _queues]
+    return sum(_flush_user(u, queue) for u, queue in queues)
+
+
+def pending_changes(user_id):
+    """
+    (revision, queued PendingWrites) of a user, read together: a view
+    that overlays these on a month read at this revision or later shows
+    every change exactly once.
+    """
+    with _cond:
+        queue = _queues.get(user_id)
+        if queue is None:
+            return _idle_revision, []
+        return queue.revision, list(queue.pending.values())
+
+
+def revision(user_id):
+    """
+    A number that changes after every write of a user's changes.
+    """
+    return pending_changes(user_id)[0]
+
+
+def has_pending(user_id):
+    return bool(pending_changes(user_id)[1])
+
+
+def apply_pending(ledger, pending, month=None):
+    """
+    A month's Ledger with queued changes laid over it: queued rows dated
+    in the month are added (or replace the stored version), and every
+    other queued row (deleted, or moved to another month) is left out.
+    """
+    if not pending:
+        return ledger
+    start, end = date_bounds(month) if month else (None, None)
+    rows, removed = [], []
+    for entry in pending:
+        day = None if entry.is_delete else str(entry.row['date'])[:10]
+        if day is not None and (start is None or start <= day) and (end is None or day <= end):
+            rows.append(entry.row)
+        else:
+            removed.append(entry.tx_uuid)
+    return ledger.with_changes(rows, removed)
+
+
+def failures(user_id):
+    """
+    Changes of a user that could not be written after
+    WRITEBACK_MAX_ATTEMPTS tries, oldest first.
+    """
+    with _cond:
+        queue = _queues.get(user_id)
+        return sorted(queue.failed.values(), key=lambda e: e.seq) if queue else []
+
+
+def retry_failed(user_id):
+    """
+    Queue a user's failed changes again (attempts reset).
+    """
+    with _cond:
+        queue = _queues.get(user_id)
+        if queue is None or not queue.failed:
+            return 0
+        now = time.monotonic()
+        retried = 0
+        for entry in sorted(queue.failed.values(), key=lambda e: e.seq):
+            entry.attempts = 0
+            entry.queued_at = now
+            queue.pending.setdefault(entry.tx_uuid, entry)
+            retried += 1
+        queue.failed.clear()
+        queue.retry_at = 0.0
+        _start()
+        _cond.notify_all()
+    return retried
+
+
+def discard_failed(user_id):
+    """
+    Drop a user's failed changes. Returns how many were dropped.
+    """
+    with _cond:
+        queue = _queues.get(user_id)
+        if queue is None:
+            return 0
+        dropped = len(queue.failed)
+        queue.failed.clear()
+        queue.touched = time.monotonic()
+        _cond.notify_all()
+    return dropped
+
+
+def writeback_stats():
+    with _cond:
+        stats = dict(_stats)
+        stats['pending'] = sum(len(q.pending) for q in _queues.values())
+        stats['failures'] = sum(len(q.failed) for q in _queues.values())
+    return stats
@@ -0,0 +1,52 @@
+-- Dashboard aggregates in one call, used by core.aggregates when
+-- MONEYMAGIC_SERVER_AGGREGATES=1. Run once in the Supabase SQL editor.
+--
+-- Returns {"by_account": [...], "by_category": [...], "by_day": [...],
+-- "by_type": [...]} where every element carries the grouping columns plus
+-- amount (sum) and tx_count (count). Parameter types must match
+-- transactions.user_id / transactions.account_id.
+
+create or replace function public.dashboard_aggregates(
+    p_user_id     uuid,
+    p_start       date    default null,
+    p_end         date    default null,
+    p_account_ids bigint[] default null,
+    p_types       text[]  default null
+)
+returns jsonb
+language sql
+stable
+as $$
+    with tx as materialized (
+        select t.date, a.name as account, t.category, t.type, t.amount
+        from public.transactions t
+        join public.accounts a on a.id = t.account_id
+        where t.user_id = p_user_id
+          and (p_start is null or t.date >= p_start)
+          and (p_end is null or t.date <= p_end)
+          and (p_account_ids is null or t.account_id = any (p_account_ids))
+          and (p_types is null or t.type = any (p_types))
+    )
+    select jsonb_build_object(
+        'by_account', coalesce((
+            select jsonb_agg(g order by g.account, g.type) from (
+                select account, type, sum(amount) as amount, count(*) as tx_count
+                from tx group by account, type
+            ) g), '[]'::jsonb),
+        'by_category', coalesce((
+            select jsonb_agg(g order by g.category, g.type) from (
+                select category, type, sum(amount) as amount, count(*) as tx_count
+                from tx where category is not null group by category, type
+            ) g), '[]'::jsonb),
+        'by_day', coalesce((
+            select jsonb_agg(g order by g.date, g.type) from (
+                select date, type, sum(amount) as amount, count(*) as tx_count
+                from tx group by date, type
+            ) g), '[]'::jsonb),
+        'by_type', coalesce((
+            select jsonb_agg(g order by g.type) from (
+                select type, sum(amount) as amount, count(*) as tx_count
+                from tx group by type
+            ) g), '[]'::jsonb)
+    );
+$$;
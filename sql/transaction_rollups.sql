@@ -0,0 +1,84 @@
+-- Daily transaction rollups, maintained by a trigger on transactions (core.rollups).
+-- Run once in the Supabase SQL editor, then enable with MONEYMAGIC_ROLLUPS=1
+-- and backfill existing data with core.rollups.rebuild_rollups(user_id).
+--
+-- user_id / account_id must use the same types as transactions.user_id
+-- and transactions.account_id; give the table the same RLS policies as
+-- transactions.
+
+create table if not exists public.transaction_rollups (
+    user_id    uuid    not null,
+    account_id bigint  not null,
+    date       date    not null,
+    category   text    not null default '',
+    type       text    not null,
+    amount     numeric not null default 0,
+    tx_count   integer not null default 0,
+    primary key (user_id, date, account_id, category, type)
+);
+
+-- Kept by a trigger in the same transaction as every write to transactions,
+-- so the rollups commit (or roll back) together with the rows they sum.
+create or replace function public.transactions_rollup()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        update public.transaction_rollups
+        set amount = amount - old.amount, tx_count = tx_count - 1
+        where user_id = old.user_id and account_id = old.account_id
+          and date = old.date::date and category = coalesce(old.category, '') and type = old.type;
+        delete from public.transaction_rollups
+        where user_id = old.user_id and account_id = old.account_id
+          and date = old.date::date and category = coalesce(old.category, '') and type = old.type
+          and tx_count <= 0;
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        insert into public.transaction_rollups as r
+            (user_id, account_id, date, category, type, amount, tx_count)
+        values (new.user_id, new.account_id, new.date::date, coalesce(new.category, ''), new.type, new.amount, 1)
+        on conflict (user_id, date, account_id, category, type) do update
+            set amount = r.amount + excluded.amount, tx_count = r.tx_count + 1;
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists transactions_rollup on public.transactions;
+create trigger transactions_rollup
+    after insert or update of date, account_id, category, type, amount, user_id or delete
+    on public.transactions
+    for each row execute function public.transactions_rollup();
+
+-- Replaced by the trigger above
+drop function if exists public.apply_rollup_deltas(jsonb);
+
+-- Recompute one user's rollups from their transactions. The delete and the
+-- re-aggregation run in this function's single transaction, so a failure
+-- leaves the old rollups in place and no write slips in between.
+-- Returns the number of transactions counted.
+create or replace function public.rebuild_transaction_rollups(p_user_id uuid)
+returns integer
+language plpgsql
+as $$
+declare
+    counted integer;
+begin
+    -- Writes (and their trigger updates) wait until the rebuild commits,
+    -- and the ones in flight commit first, so each row is counted once
+    lock table public.transactions in share mode;
+
+    delete from public.transaction_rollups where user_id = p_user_id;
+
+    insert into public.transaction_rollups
+        (user_id, account_id, date, category, type, amount, tx_count)
+    select user_id, account_id, date::date, coalesce(category, ''), type, sum(amount), count(*)
+    from public.transactions
+    where user_id = p_user_id
+    group by user_id, account_id, date::date, coalesce(category, ''), type;
+
+    select count(*) into counted from public.transactions where user_id = p_user_id;
+    return counted;
+end;
+$$;
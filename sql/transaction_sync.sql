@@ -0,0 +1,75 @@
+-- Change tracking for the client-side transaction replica (core.sync).
+-- Run once in the Supabase SQL editor, then enable with MONEYMAGIC_SYNC=1.
+--
+-- transactions.updated_at is set on insert and bumped on every update;
+-- deleted rows leave a tombstone. transaction_changes merges both so a
+-- client can ask for everything that changed since its last watermark.
+-- Give transaction_tombstones the same RLS policies as transactions (the
+-- view runs with the caller's permissions).
+--
+-- Tombstones only need to outlive the longest gap between two syncs of a
+-- client; core.sync does a full resync after MONEYMAGIC_SYNC_FULL_AFTER
+-- seconds (default one day), so older ones can be purged, e.g.
+--   delete from public.transaction_tombstones where deleted_at < now() - interval '7 days';
+
+alter table public.transactions
+    add column if not exists updated_at timestamptz not null default now();
+
+create index if not exists transactions_user_updated_idx
+    on public.transactions (user_id, updated_at, tx_uuid);
+
+create or replace function public.transactions_touch()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists transactions_touch on public.transactions;
+create trigger transactions_touch
+    before update on public.transactions
+    for each row execute function public.transactions_touch();
+
+create table if not exists public.transaction_tombstones (
+    tx_uuid    uuid primary key,
+    user_id    uuid,
+    deleted_at timestamptz not null default now()
+);
+
+create index if not exists transaction_tombstones_user_deleted_idx
+    on public.transaction_tombstones (user_id, deleted_at);
+
+create or replace function public.transactions_tombstone()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op = 'DELETE' then
+        insert into public.transaction_tombstones (tx_uuid, user_id, deleted_at)
+        values (old.tx_uuid, old.user_id, now())
+        on conflict (tx_uuid) do update set deleted_at = excluded.deleted_at;
+        return old;
+    end if;
+    -- A re-inserted id is live again
+    delete from public.transaction_tombstones where tx_uuid = new.tx_uuid;
+    return new;
+end;
+$$;
+
+drop trigger if exists transactions_tombstone on public.transactions;
+create trigger transactions_tombstone
+    after insert or delete on public.transactions
+    for each row execute function public.transactions_tombstone();
+
+create or replace view public.transaction_changes
+with (security_invoker = true) as
+    select tx_uuid, date, account_id, category, description, type, amount,
+           user_id, updated_at, false as deleted
+    from public.transactions
+    union all
+    select tx_uuid, null, null, null, null, null, null,
+           user_id, deleted_at, true
+    from public.transaction_tombstones;
@@ -0,0 +1,64 @@
+"""
+Dashboard aggregates from the transaction cube, built from a frame or
+from a Ledger, must match a plain pandas group-by of the same rows.
+"""
+import datetime
+
+import pandas as pd
+import pytest
+
+from benchmarks.fake_backend import MemoryBackend
+from benchmarks.generator import generate_ledger, load_ledger
+from core.aggregates import GROUPINGS, aggregates_from_frame, aggregates_from_ledger
+from core.ledger import Ledger
+from core.transactions import transactions_frame
+
+
+@pytest.fixture(scope="module")
+def records():
+    backend = MemoryBackend()
+    ledger = generate_ledger(transactions_per_user=2000, years=1, seed=3)
+    load_ledger(backend, ledger)
+    rows = backend.select_transactions(user_id=ledger['accounts'][0]['user_id'])
+    # A row without a category, which groupings by category leave out
+    rows[0] = {**rows[0], 'category': None}
+    return rows
+
+
+def _reference(df, keys):
+    grouped = df.groupby(keys, observed=True)["Amount"]
+    out = pd.DataFrame({"Amount": grouped.sum().round(2), "Count": grouped.size()}).reset_index()
+    return _sorted(out, keys)
+
+
+def _sorted(df, keys):
+    df = df.astype({k: object for k in keys})
+    df["Amount"] = df["Amount"].astype(float).round(2)
+    df["Count"] = df["Count"].astype("int64")
+    return df[keys + ["Amount", "Count"]].sort_values(keys).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("source", ["frame", "ledger"])
+def test_aggregates_match_pandas(records, source):
+    df = transactions_frame(records)
+    if source == "frame":
+        aggregates = aggregates_from_frame(df)
+    else:
+        aggregates = aggregates_from_ledger(Ledger.from_records(records))
+    for name, keys in GROUPINGS.items():
+        pd.testing.assert_frame_equal(_sorted(getattr(aggregates, name), keys), _reference(df, keys))
+
+
+def test_ledger_filter_matches_pandas(records):
+    df = transactions_frame(records)
+    ledger = Ledger.from_records(records)
+    start, end = datetime.date.today().replace(day=1), datetime.date.today()
+    accounts = sorted(df["Account"].unique())[:3]
+
+    narrowed = ledger.filter(start, end, accounts=accounts, types=["Expense"])
+    expected = df[
+        (df["Date"] >= start) & (df["Date"] <= end)
+        & df["Account"].isin(accounts) & (df["Type"] == "Expense")
+    ]
+    assert sorted(narrowed.to_frame()["Transaction_ID"]) == sorted(expected["Transaction_ID"])
+    assert narrowed.total("Expense") == pytest.approx(round(expected["Amount"].sum(), 2))
@@ -0,0 +1,57 @@
+"""
+SharedCache keeps within its byte caps and never stores a value read
+before a later invalidation.
+"""
+from core.cache import MISSING, SharedCache
+
+
+def test_total_cap_evicts_least_recently_used():
+    cache = SharedCache(max_bytes=300, user_max_bytes=300)
+    for user in ("a", "b", "c"):
+        cache.set("months", user, None, user, ttl=60, size=100)
+    cache.get("months", "a")
+    cache.set("months", "d", None, "d", ttl=60, size=100)
+
+    assert cache.get("months", "b") is MISSING
+    assert cache.get("months", "a") == "a"
+    assert cache.bytes == 300 and cache.evictions == 1
+
+
+def test_user_cap_evicts_only_that_users_entries():
+    cache = SharedCache(max_bytes=1000, user_max_bytes=250)
+    cache.set("months", "other", None, "x", ttl=60, size=100)
+    for month in range(3):
+        cache.set("months", "a", month, month, ttl=60, size=100)
+
+    assert cache.get("months", "a", 0) is MISSING
+    assert cache.get("months", "a", 2) == 2
+    assert cache.get("months", "other") == "x"
+    assert cache.user_bytes("a") == 200
+
+
+def test_value_over_user_cap_is_not_cached():
+    cache = SharedCache(max_bytes=1000, user_max_bytes=100)
+    cache.set("months", "a", None, "big", ttl=60, size=101)
+    assert cache.get("months", "a") is MISSING and cache.bytes == 0
+
+
+def test_read_racing_an_invalidation_is_not_stored():
+    cache = SharedCache()
+    months = cache.namespace("months", ttl=60)
+    generation = months.generation()
+    # A write lands while the month is being read
+    months.invalidate("a")
+    months.set("a", "stale", generation=generation)
+    assert months.get("a") is MISSING
+
+    # Other users' writes don't keep a user's reads out
+    generation = months.generation()
+    months.invalidate("b")
+    cache.invalidate("accounts", all_users=True)
+    months.set("a", "fresh", generation=generation)
+    assert months.get("a") == "fresh"
+
+    generation = months.generation()
+    months.invalidate()
+    months.set("a", "stale", generation=generation)
+    assert months.get("a") is MISSING
@@ -0,0 +1,61 @@
+"""
+diff_transactions must find exactly the rows changed in the grid.
+"""
+import datetime
+
+import pandas as pd
+
+from core.changeset import diff_transactions
+
+
+def _grid():
+    return pd.DataFrame({
+        "Transaction_ID": ["a", "b", "c"],
+        "Date": [datetime.date(2024, 3, d) for d in (1, 2, 3)],
+        "Account": pd.Categorical(["Bank", "Bank", "Card"]),
+        "Category": pd.Categorical(["Food", "Rent", None]),
+        "Description": ["lunch", "march", None],
+        "Type": pd.Categorical(["Expense", "Expense", "Income"]),
+        "Amount": [12.5, 900.0, 40.0],
+    })
+
+
+def test_unchanged_grid_is_empty():
+    grid = _grid()
+    # The editor hands back plain objects and timestamps
+    edited = grid.astype({"Category": object, "Type": object})
+    edited["Date"] = pd.to_datetime(edited["Date"])
+    assert diff_transactions(grid, edited).is_empty()
+
+
+def test_updated_added_and_deleted_rows():
+    grid = _grid()
+    edited = grid.astype({"Category": object, "Type": object})
+    edited.loc[0, "Amount"] = 13.0
+    edited.loc[2, "Description"] = "refund"
+    edited = edited.drop(index=1)
+    new = {"Transaction_ID": None, "Date": datetime.date(2024, 3, 9), "Account": "Card",
+           "Category": "Food", "Description": "dinner", "Type": "Expense", "Amount": 30.0}
+    edited = pd.concat([edited, pd.DataFrame([new])], ignore_index=True)
+
+    changes = diff_transactions(grid, edited)
+    assert sorted(changes.updated["Transaction_ID"]) == ["a", "c"]
+    assert changes.updated.set_index("Transaction_ID").loc["a", "Amount"] == 13.0
+    assert changes.deleted == ["b"]
+    assert changes.added["Description"].tolist() == ["dinner"]
+
+
+def test_missing_values_on_both_sides_are_equal():
+    grid = _grid()
+    edited = grid.astype({"Category": object, "Type": object})
+    edited.loc[2, "Category"] = float("nan")
+    assert diff_transactions(grid, edited).is_empty()
+
+
+def test_account_changes_are_updates():
+    grid = _grid()
+    edited = grid.astype({"Account": object, "Category": object, "Type": object})
+    edited.loc[1, "Account"] = "Card"
+    changes = diff_transactions(grid, edited)
+    assert changes.updated["Transaction_ID"].tolist() == ["b"]
+    assert changes.updated["Account"].tolist() == ["Card"]
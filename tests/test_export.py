@@ -0,0 +1,32 @@
+"""
+The export handed to st.download_button must be data Streamlit accepts
+and a complete archive.
+"""
+import csv
+import io
+import zipfile
+
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from benchmarks.fake_backend import MemoryBackend
+from benchmarks.generator import generate_ledger, load_ledger
+from core.export import export_file
+from core.storage import set_backend
+
+
+def test_export_file_is_a_valid_download():
+    backend = MemoryBackend()
+    ledger = generate_ledger(transactions_per_user=1200, years=1, seed=9)
+    load_ledger(backend, ledger)
+    previous = set_backend(backend)
+    try:
+        data = export_file(ledger['accounts'][0]['user_id'], "csv")
+    finally:
+        set_backend(previous)
+
+    payload, _ = convert_data_to_bytes_and_infer_mime(data, unsupported_error=TypeError(type(data)))
+    with zipfile.ZipFile(io.BytesIO(payload)) as archive:
+        assert sorted(archive.namelist()) == ["accounts.csv", "balances.csv", "transactions.csv"]
+        with archive.open("transactions.csv") as member:
+            rows = list(csv.reader(io.TextIOWrapper(member, encoding="utf-8")))
+    assert len(rows) == 1 + 1200
@@ -0,0 +1,71 @@
+"""
+Statement parsers must turn CSV, OFX and QIF rows into the same
+StatementRows however the file is split into reads.
+"""
+import datetime
+import io
+
+import pytest
+
+from core.importer import StatementError, StatementRow, iter_csv_rows, iter_ofx_rows, iter_qif_rows
+
+OFX = """OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240305120000<TRNAMT>-1,250.50<NAME>GROCERY MART<MEMO>card 1234</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240306<TRNAMT>40000.00<NAME>SALARY</STMTTRN>
+<STMTTRN><TRNTYPE>DEBIT<TRNAMT>-10.00<NAME>NO DATE</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+def test_csv_debit_and_credit_columns():
+    statement = io.StringIO(
+        "Date,Narration,Withdrawal Amt.,Deposit Amt.\n"
+        "05/03/2024,GROCERY MART,\"1,250.50\",\n"
+        "06/03/2024,SALARY,,40000.00\n"
+        "\n"
+        "not a date,BROKEN,1.00,\n"
+    )
+    rows = list(iter_csv_rows(statement))
+    assert rows[0] == StatementRow(2, datetime.date(2024, 3, 5), "GROCERY MART", 1250.5, "Expense")
+    assert rows[1] == StatementRow(3, datetime.date(2024, 3, 6), "SALARY", 40000.0, "Income")
+    line, message = rows[2]
+    assert line == 5 and message
+
+
+def test_csv_without_usable_header():
+    with pytest.raises(StatementError):
+        list(iter_csv_rows(io.StringIO("foo,bar\n1,2\n")))
+
+
+@pytest.mark.parametrize("chunk_size", [65536, 7, 3, 1])
+def test_ofx_rows_survive_any_chunk_boundary(chunk_size):
+    rows = list(iter_ofx_rows(io.StringIO(OFX), chunk_size=chunk_size))
+    assert rows[0] == StatementRow(1, datetime.date(2024, 3, 5), "GROCERY MART card 1234", 1250.5, "Expense")
+    assert rows[1] == StatementRow(2, datetime.date(2024, 3, 6), "SALARY", 40000.0, "Income")
+    assert rows[2] == (3, "no DTPOSTED")
+    assert len(rows) == 3
+
+
+def test_ofx_tag_split_after_text_without_tags():
+    # The first read holds no '<' at all and the second one ends inside
+    # <STMTTRN>
+    header = "OFXHEADER:100 " * 5
+    statement = header + "<STMTTRN><DTPOSTED>20240307<TRNAMT>-5.00<NAME>TEA</STMTTRN>"
+    rows = list(iter_ofx_rows(io.StringIO(statement), chunk_size=len(header) // 2 + 2))
+    assert rows == [StatementRow(1, datetime.date(2024, 3, 7), "TEA", 5.0, "Expense")]
+
+
+def test_qif_records():
+    statement = io.StringIO(
+        "!Type:Bank\n"
+        "D03/05/2024\nT-1,250.50\nPGROCERY MART\nLFood\n^\n"
+        "D03/06/2024\nT40000\nMSALARY\n^\n"
+        "Dbad\nT1\n^\n"
+    )
+    rows = list(iter_qif_rows(statement))
+    assert rows[0] == StatementRow(2, datetime.date(2024, 3, 5), "GROCERY MART", 1250.5, "Expense", "Food")
+    assert rows[1] == StatementRow(7, datetime.date(2024, 3, 6), "SALARY", 40000.0, "Income")
+    assert rows[2][0] == 11
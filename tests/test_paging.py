@@ -0,0 +1,66 @@
+"""
+Reads that walk pages must return every row from a backend that caps
+selects at 1000 rows, as Supabase (PostgREST max-rows) does.
+"""
+import io
+
+import pytest
+
+from benchmarks.fake_backend import CappedBackend, MemoryBackend
+from benchmarks.generator import generate_ledger, load_ledger
+from core.storage import set_backend
+from core.export import export_archive
+from core.importer import import_statement
+from core.sync import TransactionReplica
+from core.transactions import iter_transaction_pages
+
+TRANSACTIONS = 3000
+
+
+@pytest.fixture
+def capped():
+    inner = MemoryBackend()
+    ledger = generate_ledger(transactions_per_user=TRANSACTIONS, years=1, seed=7)
+    load_ledger(inner, ledger)
+    backend = CappedBackend(inner, max_rows=1000)
+    previous = set_backend(backend)
+    yield backend, ledger['accounts'][0]['user_id']
+    set_backend(previous)
+
+
+@pytest.mark.parametrize("page_size", [500, 1000, 5000])
+def test_transaction_pages_return_every_row(capped, page_size):
+    backend, user_id = capped
+    rows = [r for page in iter_transaction_pages(user_id=user_id, page_size=page_size) for r in page]
+    assert len(rows) == TRANSACTIONS
+    assert len({r['tx_uuid'] for r in rows}) == TRANSACTIONS
+
+
+def test_first_sync_loads_every_row(capped):
+    backend, user_id = capped
+    replica = TransactionReplica(user_id)
+    report = replica.sync()
+    assert report.full and report.changed == TRANSACTIONS
+    assert len(replica) == TRANSACTIONS
+
+
+
+def test_reimport_finds_every_stored_row(capped):
+    backend, user_id = capped
+    account_id = backend.list_accounts(user_id)[0]['id']
+    # One account-month holding more rows than one capped page
+    lines = ["Date,Narration,Withdrawal Amt.,Deposit Amt."]
+    lines += [f"{1 + i % 28:02d}/03/2001,ROW {i},{1 + i}.00," for i in range(1500)]
+    statement = "\n".join(lines).encode()
+
+    first = import_statement(io.BytesIO(statement), account_id, user_id, name="statement.csv")
+    again = import_statement(io.BytesIO(statement), account_id, user_id, name="statement.csv")
+    assert first.inserted == 1500
+    assert again.inserted == 0 and again.duplicates == 1500
+
+
+@pytest.mark.parametrize("page_size", [None, 5000])
+def test_export_writes_every_row(capped, page_size):
+    backend, user_id = capped
+    report = export_archive(user_id, io.BytesIO(), "csv", tables=["transactions"], page_size=page_size)
+    assert report.rows["transactions"] == TRANSACTIONS
@@ -0,0 +1,49 @@
+"""
+Rollups kept by the backend on every write must match a rebuild from the
+stored transactions, including after a retried upsert.
+"""
+import pytest
+
+from benchmarks.fake_backend import MemoryBackend
+from benchmarks.generator import generate_ledger, load_ledger
+from core import transactions
+from core.rollups import rebuild_rollups
+from core.storage import create_backend, set_backend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request):
+    backend = MemoryBackend() if request.param == "memory" else create_backend("sqlite", path=":memory:")
+    ledger = generate_ledger(transactions_per_user=300, years=1, seed=11)
+    load_ledger(backend, ledger)
+    previous = set_backend(backend)
+    user_id = ledger['accounts'][0]['user_id']
+    rebuild_rollups(user_id)
+    yield backend, user_id
+    set_backend(previous)
+
+
+def _rollups(backend, user_id):
+    return sorted(
+        (r['date'], r['account_id'], r['category'], r['type'], round(float(r['amount']), 2), r['tx_count'])
+        for r in backend.select_rollups(user_id)
+    )
+
+
+def test_writes_keep_rollups_current(backend):
+    backend, user_id = backend
+    account_id = backend.list_accounts(user_id)[0]['id']
+    stored = backend.select_transactions(user_id=user_id, limit=3)
+
+    new_id = transactions.add_transaction("2001-03-04", account_id, "Food", "lunch", "Expense", 12.5, user_id)
+    moved = {k: v for k, v in stored[0].items() if k != 'accounts'}
+    moved.update(date="2001-03-05", amount=99.0, category="Travel")
+    # A retried batch writes the same upsert twice
+    transactions.upsert_transactions([dict(moved)])
+    transactions.upsert_transactions([dict(moved)])
+    transactions.update_transaction_by_uuid(stored[1]['tx_uuid'], {'amount': 1.25})
+    transactions.delete_transactions_by_uuid([stored[2]['tx_uuid'], new_id])
+
+    kept = _rollups(backend, user_id)
+    rebuild_rollups(user_id)
+    assert kept == _rollups(backend, user_id)
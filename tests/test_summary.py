@@ -0,0 +1,44 @@
+"""
+The grouped account summary must match summing each account's rows
+separately, the way the summary was computed before.
+"""
+import pandas as pd
+import pytest
+
+from core.summary import account_totals, summarize_month
+
+ACCOUNTS = [
+    {"id": 1, "name": "Bank", "type": "Debit"},
+    {"id": 2, "name": "Card", "type": "Credit"},
+    {"id": 3, "name": "Idle", "type": "Debit"},
+]
+
+
+def _frame():
+    return pd.DataFrame({
+        "Account": pd.Categorical(["Bank", "Bank", "Card", "Card", "Bank"]),
+        "Type": pd.Categorical(["Expense", "Income", "Expense", "Income", "Expense"]),
+        "Amount": [100.0, 500.0, 40.0, 15.0, 2.5],
+    })
+
+
+def test_account_totals_match_per_account_sums():
+    df = _frame()
+    totals = account_totals(df)
+    for name in ["Bank", "Card"]:
+        rows = df[df["Account"] == name]
+        assert totals[name] == (
+            pytest.approx(rows.loc[rows["Type"] == "Income", "Amount"].sum()),
+            pytest.approx(rows.loc[rows["Type"] == "Expense", "Amount"].sum()),
+        )
+    assert account_totals(df.iloc[0:0]) == {}
+
+
+def test_summarize_month():
+    summary = summarize_month(_frame(), ACCOUNTS, {1: 1000.0, 2: 200.0})
+    by_name = {a.account: a for a in summary.accounts}
+    assert by_name["Bank"].remaining == pytest.approx(1000 + 500 - 102.5)
+    assert by_name["Card"].remaining == pytest.approx(200 + 40 - 15)
+    assert by_name["Idle"].remaining == 0.0
+    assert summary.overall.opening == pytest.approx(800.0)
+    assert summary.overall.remaining == pytest.approx(800 + 515 - 142.5)
@@ -0,0 +1,77 @@
+"""
+A replica kept by delta sync must end up with exactly the stored rows:
+changed rows replaced, deleted ones dropped through their tombstones.
+"""
+import pytest
+
+from benchmarks.fake_backend import MemoryBackend
+from benchmarks.generator import generate_ledger, load_ledger
+from core import sync
+from core.storage import create_backend, set_backend
+from core.sync import TransactionReplica
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request):
+    backend = MemoryBackend() if request.param == "memory" else create_backend("sqlite", path=":memory:")
+    ledger = generate_ledger(transactions_per_user=400, years=1, seed=5)
+    load_ledger(backend, ledger)
+    previous = set_backend(backend)
+    yield backend, ledger['accounts'][0]['user_id']
+    set_backend(previous)
+
+
+def _stored(backend, user_id):
+    return {r['tx_uuid']: (str(r['date'])[:10], float(r['amount'])) for r in backend.select_transactions(user_id=user_id)}
+
+
+def _replicated(replica):
+    return {r['tx_uuid']: (str(r['date'])[:10], float(r['amount'])) for r in replica.rows()}
+
+
+def test_delta_sync_applies_changes_and_tombstones(backend):
+    backend, user_id = backend
+    replica = TransactionReplica(user_id)
+    assert replica.sync().full
+
+    rows = backend.select_transactions(user_id=user_id, limit=4)
+    backend.update_transaction(rows[0]['tx_uuid'], {'amount': 1.5, 'date': '2001-01-02'})
+    backend.delete_transactions([rows[1]['tx_uuid'], rows[2]['tx_uuid']])
+    added = backend.insert_transactions([{**rows[3], 'tx_uuid': None, 'description': 'new'}])
+    # A deleted id written again is live again
+    backend.upsert_transactions([{k: v for k, v in rows[2].items() if k != 'accounts'}])
+
+    replica.stale = True
+    report = replica.sync()
+    assert not report.full and report.deleted >= 1
+    assert _replicated(replica) == _stored(backend, user_id)
+    assert rows[1]['tx_uuid'] not in _replicated(replica)
+    assert added[0]['tx_uuid'] in _replicated(replica)
+    assert _replicated(replica)[rows[0]['tx_uuid']] == ('2001-01-02', 1.5)
+
+
+def test_fresh_replica_skips_the_round_trip(backend):
+    backend, user_id = backend
+    replica = TransactionReplica(user_id)
+    replica.sync()
+    assert replica.sync() is None
+
+
+
+def test_replicas_share_a_memory_cap(monkeypatch):
+    backend = MemoryBackend()
+    ledger = generate_ledger(users=2, transactions_per_user=400, years=1, seed=6)
+    load_ledger(backend, ledger)
+    first, second = dict.fromkeys(a['user_id'] for a in ledger['accounts'])
+    previous = set_backend(backend)
+    sync.reset_replicas()
+    try:
+        sync.replica_records(user_id=first)
+        # Room for one replica only: reading another drops the older one
+        monkeypatch.setattr(sync, "REPLICA_MAX_BYTES", sync.get_replica(first).nbytes)
+        sync.replica_records(user_id=second)
+        assert sync.get_replica(second).nbytes > 0
+        assert sync.get_replica(first).synced_at is None
+    finally:
+        sync.reset_replicas()
+        set_backend(previous)
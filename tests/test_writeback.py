@@ -0,0 +1,108 @@
+"""
+Queued writes must land exactly once, also when a batch is retried, and a
+change that can't be written must not hold back the rest of its batch.
+"""
+import datetime
+import time
+
+import pytest
+
+from benchmarks.fake_backend import MemoryBackend
+from core import writeback
+from core.storage import set_backend
+from core.transactions import tx_record
+
+USER = "00000000-0000-0000-0000-000000000001"
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = MemoryBackend()
+    backend.insert_account({'id': 1, 'name': 'Bank', 'type': 'Debit', 'user_id': USER})
+    previous = set_backend(backend)
+    # Only explicit flush() calls write
+    monkeypatch.setattr(writeback, "WRITEBACK_DELAY", 3600.0)
+    monkeypatch.setattr(writeback, "WRITEBACK_ENABLED", True)
+    writeback._queues.clear()
+    yield backend
+    writeback._queues.clear()
+    set_backend(previous)
+
+
+def _rows(n, start=0):
+    return [
+        tx_record(datetime.date(2024, 3, 1 + i % 28), 1, "Food", f"row {i}", "Expense", 10 + i, USER)
+        for i in range(start, start + n)
+    ]
+
+
+def _stored(backend):
+    return sorted(r['description'] for r in backend.transactions.values())
+
+
+def test_retried_batch_creates_no_duplicates(backend, monkeypatch):
+    upsert = backend.upsert_transactions
+
+    def lands_then_fails(rows):
+        # The write commits but the response is lost
+        upsert(rows)
+        raise ConnectionError("connection reset")
+
+    monkeypatch.setattr(backend, "upsert_transactions", lands_then_fails)
+    writeback.enqueue(_rows(3), user_id=USER)
+    assert writeback.flush(USER) == 0
+    assert all(e.attempts == 1 for e in writeback.pending_changes(USER)[1])
+
+    monkeypatch.setattr(backend, "upsert_transactions", upsert)
+    assert writeback.flush(USER) == 3
+    assert _stored(backend) == ["row 0", "row 1", "row 2"]
+    assert not writeback.has_pending(USER)
+
+
+def test_bad_change_fails_alone(backend, monkeypatch):
+    upsert = backend.upsert_transactions
+
+    def rejects_row_2(rows):
+        if any(r['description'] == "row 2" for r in rows):
+            raise ValueError("violates check constraint")
+        return upsert(rows)
+
+    monkeypatch.setattr(backend, "upsert_transactions", rejects_row_2)
+    writeback.enqueue(_rows(5), user_id=USER)
+    assert writeback.flush(USER) == 4
+    assert _stored(backend) == ["row 0", "row 1", "row 3", "row 4"]
+
+    for _ in range(writeback.WRITEBACK_MAX_ATTEMPTS - 1):
+        writeback.flush(USER)
+    failed = writeback.failures(USER)
+    assert [e.row['description'] for e in failed] == ["row 2"]
+    assert failed[0].attempts == writeback.WRITEBACK_MAX_ATTEMPTS
+    assert not writeback.has_pending(USER)
+
+
+def test_failing_backend_is_not_hammered(backend, monkeypatch):
+    calls = []
+
+    def down(rows):
+        calls.append(len(rows))
+        raise ConnectionError("backend down")
+
+    monkeypatch.setattr(backend, "upsert_transactions", down)
+    writeback.enqueue(_rows(20), user_id=USER)
+    assert writeback.flush(USER) == 0
+    assert len(calls) == 1 + writeback.WRITEBACK_ISOLATE_FAILURES
+    assert all(e.attempts == 1 for e in writeback.pending_changes(USER)[1])
+
+
+def test_idle_queue_is_dropped_with_a_new_revision(backend, monkeypatch):
+    before = writeback.revision(USER)
+    writeback.enqueue(_rows(1), user_id=USER)
+    writeback.flush(USER)
+    written = writeback.revision(USER)
+    assert written != before
+
+    monkeypatch.setattr(writeback, "WRITEBACK_IDLE", 0.0)
+    with writeback._cond:
+        writeback._prune(time.monotonic())
+    assert USER not in writeback._queues
+    assert writeback.revision(USER) not in (before, written)
@@ -1,10 +1,15 @@
 import streamlit as st
-from core.accounts import get_accounts, add_account, update_account, delete_account
+from core.accounts import add_account, update_account, delete_account
 
-def show_accounts_view(user):
+@st.fragment
+def show_accounts_view(user, data):
+    """
+    Sidebar account list and forms. A fragment: typing in the account
+    expanders reruns only this section; a saved change reruns the app.
+    """
     st.header("🏦 Accounts")
     try:
-        accounts = get_accounts(user["id"])
+        accounts = data.accounts
     except Exception as e:
         st.error(f"Error loading accounts: {str(e)}")
         accounts = []
@@ -1,14 +1,18 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from core.accounts import get_accounts
-from core.balances import get_opening, set_opening, get_all_balances
+from core.balances import set_opening
 from core.utils import MONTHS
 
-def show_balances_view(user):
+@st.fragment
+def show_balances_view(user, data):
+    """
+    Sidebar opening-balance form and table. A fragment, like the accounts
+    view; saving an opening reruns the app.
+    """
     st.header("🔧 Balances")
     try:
-        accounts = get_accounts(user["id"])
+        accounts = data.accounts
         if not accounts:
             st.info("Add accounts first.")
             return
@@ -23,7 +27,7 @@ def show_balances_view(user):
                 aid = next((a['id'] for a in accounts if a['name']==sel_account), None)
                 
                 try:
-                    current = get_opening(sel_month, aid, user["id"])
+                    current = float(data.openings(sel_month).get(aid, 0.0))
                 except Exception as e:
                     st.error(f"Error loading balance: {str(e)}")
                     current = 0.0
@@ -50,7 +54,7 @@ def show_balances_view(user):
         # Display balances table
         st.subheader("Opening Balances")
         try:
-            balances = get_all_balances(user["id"])
+            balances = data.balances
             if balances:
                 # Convert balances to DataFrame
                 df = pd.DataFrame(balances)
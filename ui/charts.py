@@ -0,0 +1,172 @@
+import streamlit as st
+
+from core.cache import MISSING, estimate_size, shared_cache
+
+# Built figures per user, keyed by chart and data fingerprint
+CHART_CACHE_TTL = 600
+_figure_cache = shared_cache.namespace("charts", ttl=CHART_CACHE_TTL)
+
+
+def daily_expenses_figure(dashboard, month):
+    import plotly.express as px
+
+    daily_expenses = dashboard.daily("Expense")
+    if daily_expenses.empty:
+        return None
+    fig = px.line(
+        daily_expenses,
+        x="Date",
+        y="Amount",
+        title=f"Daily Expenses - {month}",
+        markers=True,
+        labels={"Amount": "Amount (₹)", "Date": "Date"},
+    )
+    fig.update_traces(line=dict(width=3))
+    fig.update_layout(hovermode="x unified", xaxis_title=None)
+    return fig
+
+
+def category_figure(dashboard, month):
+    import plotly.express as px
+
+    category_spend = dashboard.categories("Expense")
+    if category_spend.empty:
+        return None
+    fig = px.pie(
+        category_spend,
+        names="Category",
+        values="Amount",
+        hole=0.4,
+        color_discrete_sequence=px.colors.qualitative.Pastel,
+        title="Spending by Category",
+    )
+    fig.update_traces(textinfo="percent+label", pull=[0.05] * len(category_spend))
+    return fig
+
+
+def account_figure(dashboard, month):
+    import plotly.express as px
+
+    # Has both Income & Expense columns
+    account_summary = dashboard.account_pivot()
+    if account_summary.empty:
+        return None
+    melted = account_summary.melt(
+        id_vars="Account",
+        value_vars=["Income", "Expense"],
+        var_name="Type",
+        value_name="Amount",
+    )
+    fig = px.bar(
+        melted,
+        x="Account",
+        y="Amount",
+        color="Type",
+        barmode="group",
+        text_auto=".2s",
+        title="Income vs Expense per Account",
+        labels={"Amount": "Amount (₹)", "Account": "Account"},
+        color_discrete_map={"Expense": "#EF553B", "Income": "#00CC96"},
+    )
+    fig.update_layout(hovermode="x unified")
+    return fig
+
+
+def cumulative_figure(dashboard, month):
+    import plotly.express as px
+
+    daily_expenses = dashboard.daily("Expense")
+    if daily_expenses.empty:
+        return None
+    daily_expenses["Cumulative"] = daily_expenses["Amount"].cumsum()
+    fig = px.line(
+        daily_expenses,
+        x="Date",
+        y="Cumulative",
+        title="Cumulative Expenses Over the Month",
+        markers=True,
+        labels={"Cumulative": "Cumulative Spent (₹)"},
+    )
+    fig.update_traces(line_color="#EF553B", line_width=3)
+    fig.update_layout(hovermode="x unified")
+    return fig
+
+
+def flow_figure(dashboard, month):
+    import plotly.graph_objects as go
+
+    total_income = dashboard.total("Income")
+    total_expense = dashboard.total("Expense")
+    categories = ["Total Income", "Total Expenses", "Net Flow"]
+    values = [total_income, total_expense, total_income - total_expense]
+    fig = go.Figure(
+        data=[
+            go.Bar(
+                x=categories,
+                y=values,
+                text=[f"₹{v:,.2f}" for v in values],
+                textposition="auto",
+                marker_color=["#2E86C1", "#EF553B", "#58D68D"],
+            )
+        ]
+    )
+    fig.update_layout(
+        height=350,
+        title="Income vs Expenses vs Net Flow",
+        yaxis_title="Amount (₹)",
+        xaxis_title="Category",
+        margin=dict(t=50, b=30),
+    )
+    return fig
+
+
+# name -> (tab label, heading, builder, message when there is nothing to plot)
+CHARTS = {
+    "daily": ("📉 Daily", "Daily Expenses Trend", daily_expenses_figure,
+              "No expenses recorded for this month."),
+    "category": ("🥧 Categories", "Category-wise Spending Distribution", category_figure,
+                 "No category data available for expenses."),
+    "account": ("🏦 Accounts", "Income vs Expense by Account", account_figure,
+                "No account data available for income/expense comparison."),
+    "cumulative": ("📈 Cumulative", "Cumulative Spending Over the Month", cumulative_figure,
+                   "No expenses recorded for this month."),
+    "flow": ("💸 Flow", "Financial Flow Overview", flow_figure, None),
+}
+
+
+def get_figure(name, dashboard, month, user_id, fingerprint=None):
+    """
+    The named chart for these aggregates, reused from the figure cache
+    while the data (and month) is unchanged. None when there is nothing
+    to plot.
+    """
+    key = (name, month, fingerprint or dashboard.fingerprint())
+    fig = _figure_cache.get(user_id, key)
+    if fig is MISSING:
+        fig = CHARTS[name][2](dashboard, month)
+        size = estimate_size(fig.to_plotly_json()) if fig is not None else 0
+        _figure_cache.set(user_id, fig, key, size=size)
+    return fig
+
+
+@st.fragment
+def show_visual_insights(dashboard, month, user_id):
+    """
+    One tab per chart. Only the selected tab's figure is built (or taken
+    from the cache); the others cost nothing on a rerun. A fragment, so
+    switching tabs reruns nothing else.
+    """
+    names = list(CHARTS)
+    tabs = st.tabs([CHARTS[n][0] for n in names], key="insights_tab", on_change="rerun")
+    fingerprint = dashboard.fingerprint()
+    for name, tab in zip(names, tabs):
+        if tab.open is False:
+            continue
+        _, heading, _, empty_message = CHARTS[name]
+        with tab:
+            st.markdown(f"#### {heading}")
+            fig = get_figure(name, dashboard, month, user_id, fingerprint)
+            if fig is not None:
+                st.plotly_chart(fig, use_container_width=True)
+            elif empty_message:
+                st.info(empty_message)
@@ -0,0 +1,118 @@
+import os
+import streamlit as st
+import pandas as pd
+from core.cache import cache_stats, estimate_size
+from core.prefetch import prefetch_stats
+from core.tracing import start_rerun, stop_rerun
+from core.writeback import writeback_stats
+
+# The panel is only offered when MONEYMAGIC_DEV_TOOLS=1
+DEV_TOOLS_ENABLED = os.environ.get("MONEYMAGIC_DEV_TOOLS") == "1"
+
+
+def begin_dev_trace():
+    """
+    Start tracing this rerun if the developer panel is switched on.
+    Call before any data is loaded.
+    """
+    if DEV_TOOLS_ENABLED and st.session_state.get("dev_panel"):
+        return start_rerun(f"rerun {st.session_state.get('dev_rerun_count', 0) + 1}")
+    # Drop a trace left open by a rerun that was cut short (st.rerun())
+    stop_rerun()
+    return None
+
+
+def note_size(label, value):
+    """
+    Record the bytes held by a value this rerun, for the Memory section of
+    the panel. Does nothing unless the panel is on.
+    """
+    if DEV_TOOLS_ENABLED and st.session_state.get("dev_panel"):
+        st.session_state.setdefault("dev_sizes", {})[label] = (estimate_size(value), len(value))
+
+
+def show_dev_panel(trace):
+    """
+    Sidebar panel with the storage calls of the current rerun as a table
+    and a waterfall. Call after every view has rendered.
+    """
+    if not DEV_TOOLS_ENABLED:
+        return
+    st.session_state.dev_rerun_count = st.session_state.get("dev_rerun_count", 0) + 1
+    st.toggle("Developer panel", key="dev_panel", help="Trace storage calls of each rerun")
+    if trace is None:
+        return
+    stop_rerun()
+
+    with st.expander("🗄️ Shared cache"):
+        stats = cache_stats()
+        total = stats["total"]
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Entries", total["entries"])
+        c2.metric("MB", f"{total['bytes'] / 1024 / 1024:,.2f}", help=f"of {total['max_bytes'] / 1024 / 1024:,.0f} MB")
+        c3.metric("Evictions", total["evictions"])
+        st.caption(f"{total['users']} users, {total['hits']} hits, {total['misses']} misses")
+        prefetch = prefetch_stats()
+        st.caption(
+            f"Prefetch: {prefetch['completed']} of {prefetch['submitted']} reads done, "
+            f"{prefetch['cancelled']} cancelled, {prefetch['skipped']} skipped (memory), {prefetch['errors']} failed"
+        )
+        writes = writeback_stats()
+        st.caption(
+            f"Write-behind: {writes['written']} of {writes['queued']} changes written in {writes['batches']} batches, "
+            f"{writes['pending']} queued, {writes['retries']} failed batches, {writes['failures']} given up"
+        )
+        st.dataframe(
+            pd.DataFrame.from_dict(stats["namespaces"], orient="index"),
+            use_container_width=True,
+        )
+
+    sizes = st.session_state.pop("dev_sizes", {})
+    if sizes:
+        with st.expander("🧮 Memory"):
+            st.dataframe(
+                pd.DataFrame(
+                    [{"Value": label, "Rows": rows, "KB": round(size / 1024, 1),
+                      "Bytes/row": round(size / rows, 1) if rows else None}
+                     for label, (size, rows) in sizes.items()]
+                ),
+                hide_index=True,
+                use_container_width=True,
+            )
+
+    with st.expander("🛠️ Query trace", expanded=True):
+        records = trace.records()
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Calls", len(records))
+        c2.metric("Time (ms)", f"{trace.total_seconds * 1000:,.1f}")
+        c3.metric("KB", f"{trace.total_bytes / 1024:,.1f}")
+        if not records:
+            st.info("No storage calls in this rerun.")
+            return
+
+        df = pd.DataFrame(records)
+        repeated = df["Operation"].value_counts()
+        repeated = repeated[repeated > 1]
+        for op, count in repeated.items():
+            st.warning(f"{op} called {count} times in one rerun")
+
+        import plotly.graph_objects as go
+        labels = [f"{i + 1}. {op}" for i, op in enumerate(df["Operation"])]
+        fig = go.Figure(
+            go.Bar(
+                y=labels,
+                x=df["Duration (ms)"],
+                base=df["Start (ms)"],
+                orientation="h",
+                hovertext=df["Filters"],
+                marker_color=["#EF553B" if e else "#1e3a8a" for e in df["Error"]],
+            )
+        )
+        fig.update_layout(
+            height=max(200, 24 * len(df)),
+            xaxis_title="ms since rerun start",
+            yaxis=dict(autorange="reversed"),
+            margin=dict(t=10, b=30, l=10, r=10),
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(df, hide_index=True, use_container_width=True)
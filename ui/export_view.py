@@ -0,0 +1,26 @@
+import datetime
+import importlib.util
+
+import streamlit as st
+
+from core.export import FORMATS, export_file
+
+
+@st.fragment
+def show_export(user):
+    """
+    Download the user's transactions, accounts and balances as a ZIP of
+    CSV or Parquet files. The archive is only built when the button is
+    clicked.
+    """
+    # Parquet needs the optional pyarrow package
+    formats = [f for f in FORMATS if f != "parquet" or importlib.util.find_spec("pyarrow")]
+    fmt = st.radio("Format", formats, horizontal=True, key="export_format",
+                   format_func=lambda f: {"csv": "CSV", "parquet": "Parquet"}[f])
+    st.download_button(
+        "⬇️ Download export",
+        data=lambda: export_file(user['id'], fmt),
+        file_name=f"moneymagic-export-{datetime.date.today().isoformat()}-{fmt}.zip",
+        mime="application/zip",
+        on_click="ignore",
+    )
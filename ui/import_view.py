@@ -0,0 +1,103 @@
+import streamlit as st
+
+from core.importer import (
+    DEFAULT_CATEGORY, ColumnMapping, StatementError, csv_header, detect_format, detect_mapping, import_statement,
+)
+from core.utils import CATEGORIES
+
+
+def _mapping_inputs(upload):
+    """
+    Column pickers for a CSV statement, prefilled from its header.
+    Returns a ColumnMapping (or None if the header cannot be read).
+    """
+    header = csv_header(upload)
+    if not header:
+        st.error("The file has no header row.")
+        return None
+    guess = detect_mapping(header) or ColumnMapping(date=header[0], description=header[0])
+    options = ["—"] + header
+
+    def pick(label, current, key):
+        value = st.selectbox(label, options, index=options.index(current) if current in options else 0, key=key)
+        return None if value == "—" else value
+
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        date_col = pick("Date column", guess.date, "imp_date")
+        desc_col = pick("Description column", guess.description, "imp_desc")
+    with c2:
+        amount_col = pick("Amount column (signed)", guess.amount, "imp_amount")
+        type_col = pick("Dr/Cr column", guess.type, "imp_type")
+    with c3:
+        debit_col = pick("Debit column", guess.debit, "imp_debit")
+        credit_col = pick("Credit column", guess.credit, "imp_credit")
+    invert = st.checkbox("Positive amounts are expenses (credit card statement)", key="imp_invert")
+    if not (date_col and desc_col and (amount_col or debit_col or credit_col)):
+        st.warning("Pick the date, description and an amount (or debit/credit) column.")
+        return None
+    return ColumnMapping(
+        date=date_col, description=desc_col, amount=amount_col, debit=debit_col,
+        credit=credit_col, type=type_col, invert_sign=invert,
+    )
+
+
+@st.fragment
+def show_import_statement(user, accounts):
+    """
+    Upload a CSV / OFX / QIF statement and import it into one account.
+    A fragment: picking the file and columns reruns only this form.
+    """
+    report = st.session_state.pop("tx_import_report", None)
+    if report is not None:
+        st.success(
+            f"Imported {report.inserted} of {report.read} rows in {report.seconds:.2f}s "
+            f"({report.duplicates} already present, {len(report.invalid)} invalid)"
+        )
+        if report.invalid:
+            st.dataframe(
+                [{"Line": line, "Problem": message} for line, message in report.invalid[:200]],
+                use_container_width=True,
+            )
+
+    if not accounts:
+        st.warning("No accounts — add one first.")
+        return
+    upload = st.file_uploader("Statement", type=["csv", "ofx", "qfx", "qif"], key="imp_file")
+    if upload is None:
+        return
+    account_names = [a['name'] for a in accounts]
+    acc_choice = st.selectbox("Into account", account_names, key="imp_account")
+    category = st.selectbox("Category for imported rows", CATEGORIES, index=CATEGORIES.index(DEFAULT_CATEGORY), key="imp_category")
+    fmt = detect_format(upload.name)
+    mapping = _mapping_inputs(upload) if fmt == "csv" else None
+    if fmt == "csv" and mapping is None:
+        return
+    dry_run = st.checkbox("Dry run (count only, write nothing)", key="imp_dry_run")
+
+    if st.button("📥 Import statement"):
+        aid = next(a['id'] for a in accounts if a['name'] == acc_choice)
+        total = upload.size or 1
+        bar = st.progress(0.0, text="Importing…")
+
+        def progress(r):
+            bar.progress(min(r.bytes_read / total, 1.0), text=f"{r.read} rows read, {r.inserted} new")
+
+        upload.seek(0)
+        try:
+            report = import_statement(
+                upload, aid, user['id'], name=upload.name, fmt=fmt, mapping=mapping,
+                category=category, progress=progress, dry_run=dry_run,
+            )
+        except StatementError as e:
+            st.error(str(e))
+            return
+        if dry_run:
+            st.info(
+                f"{report.inserted} of {report.read} rows would be imported "
+                f"({report.duplicates} already present, {len(report.invalid)} invalid)"
+            )
+            return
+        # Shown after the rerun below
+        st.session_state.tx_import_report = report
+        st.rerun()
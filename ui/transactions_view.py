@@ -1,20 +1,125 @@
 import streamlit as st
-import pandas as pd
 
 from datetime import datetime, date
-from core.accounts import get_accounts
-from core.utils import MONTHS
-from core.transactions import add_transaction, fetch_transactions, update_transaction_by_uuid, delete_transaction_by_uuid
-from core.balances import get_opening
-
-def show_transactions_view(user):
+from core.utils import CATEGORIES, MONTHS
+from core.changeset import diff_transactions, queue_changeset
+from core.writeback import discard_failed, failures, has_pending, pending_changes, queue_transaction, retry_failed
+from core.summary import summarize_totals
+from core.aggregates import SERVER_AGGREGATES, aggregates_from_ledger, fetch_dashboard_aggregates
+from core.rollups import ROLLUPS_ENABLED, fetch_rollup_aggregates
+from ui.charts import show_visual_insights
+from ui.dev_panel import note_size
+from ui.export_view import show_export
+from ui.import_view import show_import_statement
+
+def month_selection():
+    """
+    Month picked in the month selector (current month before it is shown).
+    """
+    return st.session_state.get("global_month_select", MONTHS[datetime.now().month - 1])
+
+
+@st.fragment
+def show_transactions_grid(tx_df, accounts, user):
+    """
+    The editable transactions grid. A fragment of its own, so each edit
+    reruns only the grid, not the summary and charts below it.
+    """
+    # Account/Category/Type are categoricals; the editor needs free-form values
+    edited = st.data_editor(
+        tx_df.astype({"Account": object, "Category": object, "Type": object}),
+        num_rows="dynamic",
+        use_container_width=True,
+        column_config={
+            "Date": st.column_config.DateColumn("Date", format="YYYY-MM-DD"),
+            # Picked for new rows; changing it moves a row to another account
+            "Account": st.column_config.SelectboxColumn(
+                "Account", options=[a["name"] for a in accounts], required=True
+            ),
+            "Category": st.column_config.TextColumn("Category"),
+            "Description": st.column_config.TextColumn("Description"),
+            "Type": st.column_config.SelectboxColumn("Type", options=["Expense", "Income"]),
+            "Amount": st.column_config.NumberColumn("Amount", min_value=0.0, format="%.2f"),
+            #"Transaction_ID": st.column_config.Column("Transaction_ID", disabled=True),
+        },
+        key="tx_editor",
+    )
+    # Save edits
+    report = st.session_state.pop("tx_save_report", None)
+    if report is not None:
+        st.success(
+            f"Saved changes: {report.touched} rows ({report.updated} updated, {report.added} added, "
+            f"{report.deleted} deleted) in {report.seconds:.2f}s"
+        )
+    if st.button("💾 Save edits"):
+        try:
+            changes = diff_transactions(tx_df, edited)
+            if changes.is_empty():
+                st.info("No changes to save")
+            else:
+                report = queue_changeset(changes, accounts, user['id'])
+                # Shown after the rerun below
+                st.session_state.tx_save_report = report
+                st.rerun()
+        except Exception as e:
+            st.error(str(e))
+
+
+@st.fragment(run_every=5)
+def show_pending_writes(user):
+    """
+    Queued transaction writes (core.writeback): how many are still being
+    saved, and the ones that failed, with Retry / Discard. Polls on its
+    own so a failure shows up without any interaction.
+    """
+    failed = failures(user["id"])
+    seen = st.session_state.get("tx_failures_seen", 0)
+    st.session_state.tx_failures_seen = len(failed)
+    if len(failed) > seen:
+        # Failed rows drop out of the totals; redraw the page
+        st.rerun(scope="app")
+    queued = len(pending_changes(user["id"])[1])
+    if queued:
+        st.caption(f"⏳ Saving {queued} changes…")
+    if not failed:
+        return
+    st.error(f"{len(failed)} changes could not be saved: {failed[-1].error}")
+    st.dataframe(
+        [{"Date": (e.row or {}).get("date"), "Description": (e.row or {}).get("description"),
+          "Amount": (e.row or {}).get("amount"), "Change": "delete" if e.is_delete else "save",
+          "Tries": e.attempts} for e in failed],
+        use_container_width=True,
+    )
+    c1, c2 = st.columns(2)
+    if c1.button("🔁 Retry", key="tx_retry_failed"):
+        retry_failed(user["id"])
+        st.session_state.tx_failures_seen = 0
+        st.rerun(scope="app")
+    if c2.button("🗑️ Discard", key="tx_discard_failed"):
+        discard_failed(user["id"])
+        st.session_state.tx_failures_seen = 0
+        st.rerun(scope="app")
+
+
+def show_transactions_view(user, data):
     s1, s2 = st.columns(2)
     with s1:st.header("Transactions")
     with s2:
         current_month_index = datetime.now().month - 1
         selected_month = st.selectbox("Select Month", MONTHS, index=current_month_index, key="global_month_select")
-    
-    accounts = get_accounts(user["id"])
+    show_dashboard(user, data, selected_month)
+
+
+@st.fragment
+def show_dashboard(user, data, selected_month):
+    """
+    Everything below the month selector. A fragment: filter changes rerun
+    only this part (the sidebar is not redrawn), and it reuses the reads
+    already made for the page. New transactions are queued and show up in
+    this same run; grid saves and imports rerun the whole app.
+    """
+    current_month_index = datetime.now().month - 1
+    accounts = data.accounts
     account_names = [a['name'] for a in accounts]
 
     # ------------- Metrics -------------
@@ -23,21 +128,15 @@ def show_transactions_view(user):
     # ------------- Add Transaction -------------
 
     with st.expander("Add Transaction", expanded=False, icon='➕'):
-        with st.form("add_tx"):
+        # Cleared after each Add, for entering receipts one after another
+        with st.form("add_tx", clear_on_submit=True):
             t_date = st.date_input("Date", value=date.today())
             if account_names:
                 acc_choice = st.selectbox("Account", account_names)
             else:
                 st.warning("No accounts — add one first.")
                 acc_choice = None
-            t_category = st.selectbox(
-                "Category",
-                [
-                    "Food", "Transport", "Bills", "Shopping", "Rent", "Salary",
-                    "Payment", "Investment", "Entertainment", "Health",
-                    "Education", "Other"
-                ],
-            )
+            t_category = st.selectbox("Category", CATEGORIES)
             t_description = st.text_input("Description", "")
             t_type = st.radio("Type", ["Expense", "Income"], horizontal=True)
             t_amount = st.number_input("Amount (₹)", min_value=0.0, step=10.0, format="%.2f")
@@ -48,9 +147,19 @@ def show_transactions_view(user):
                     st.error("Amount must be > 0")
                 else:
                     aid = next((a['id'] for a in accounts if a['name'] == acc_choice), None)
-                    add_transaction(t_date, aid, t_category, t_description, t_type, t_amount, user['id'])
+                    # Queued, not written yet: the ledger below already
+                    # includes it, so no rerun is needed
+                    queue_transaction(
+                        t_date, aid, t_category, t_description, t_type, t_amount, user['id'], account_name=acc_choice,
+                    )
                     st.success("Transaction added")
-                    st.rerun()
+    show_pending_writes(user)
+
+    with st.expander("Import Statement", expanded=False, icon='📥'):
+        show_import_statement(user, accounts)
+
+    with st.expander("Export Data", expanded=False, icon='📤'):
+        show_export(user)
     
     # ------------- Filter Transactions -------------
 
@@ -68,188 +177,83 @@ def show_transactions_view(user):
             type_filter = st.multiselect("Type", ["All", "Expense", "Income"], default=["All"])
 
     account_ids = None
+    selected_accounts = None
     if account_filter and "All" not in account_filter:
         account_ids = [a['id'] for a in accounts if a['name'] in account_filter]
+        selected_accounts = [n for n in account_filter if n != "All"]
     types = None
     if type_filter and "All" not in type_filter:
         types = [t for t in type_filter if t != "All"]
 
-    tx_df = fetch_transactions(
-        month_filter=selected_month,
+    # The month is loaded once (and cached) as a compact ledger; filters
+    # only narrow it locally and just the matching rows become a frame
+    ledger = data.month_ledger(selected_month).filter(
         start_date=min_date,
         end_date=max_date,
-        account_ids=account_ids,
+        accounts=selected_accounts,
         types=types,
-        user_id=user["id"],
     )
+    tx_df = ledger.to_frame()
+    note_size("Month ledger", data.month_ledger(selected_month))
+    note_size("Filtered frame", tx_df)
+
+    # Totals behind the summary, metrics and charts: from the rollups or
+    # the server when enabled, else from the ledger (always while writes
+    # are queued, as the server has not seen them yet)
+    if (ROLLUPS_ENABLED or SERVER_AGGREGATES) and not has_pending(user["id"]):
+        dashboard = data.get(
+            fetch_rollup_aggregates if ROLLUPS_ENABLED else fetch_dashboard_aggregates,
+            month_filter=selected_month,
+            start_date=min_date,
+            end_date=max_date,
+            account_ids=account_ids,
+            types=types,
+            user_id=user["id"],
+        )
+    else:
+        dashboard = aggregates_from_ledger(ledger)
 
     # ------------- SHOW Transactions -------------
 
     st.write(f"Showing {len(tx_df)} transactions till {default_end}")
     if not tx_df.empty:
-        # Convert Date column to datetime.date
-        if 'Date' in tx_df.columns:
-            tx_df['Date'] = pd.to_datetime(tx_df['Date'], errors='coerce').dt.date
-
-        edited = st.data_editor(
-            tx_df,
-            num_rows="dynamic",
-            use_container_width=True,
-            column_config={
-                "Date": st.column_config.DateColumn("Date", format="YYYY-MM-DD"),
-                "Account": st.column_config.Column("Account", disabled=True),
-                "Category": st.column_config.TextColumn("Category"),
-                "Description": st.column_config.TextColumn("Description"),
-                "Type": st.column_config.SelectboxColumn("Type", options=["Expense", "Income"]),
-                "Amount": st.column_config.NumberColumn("Amount", min_value=0.0, format="%.2f"),
-                #"Transaction_ID": st.column_config.Column("Transaction_ID", disabled=True),
-            },
-            key="tx_editor",
-        )
-        # Save edits
-        if st.button("💾 Save edits"):
-            try:
-                new_ids = set(edited["Transaction_ID"].astype(str).tolist())
-                old_ids = set(tx_df["Transaction_ID"].astype(str).tolist())
-                deleted = old_ids - new_ids
-                for did in deleted:
-                    delete_transaction_by_uuid(did)
-
-                for _, row in edited.iterrows():
-                    txid = str(row.get("Transaction_ID", "") or "")
-                    if not txid:
-                        acc_name = row.get("Account")
-                        aid = next((a['id'] for a in accounts if a['name'] == acc_name), None)
-                        add_transaction(
-                            pd.to_datetime(row["Date"]).date(),
-                            aid,
-                            row.get("Category", ""),
-                            row.get("Description", ""),
-                            row.get("Type", "Expense"),
-                            float(row.get("Amount", 0.0)),
-                            user['id'],
-                        )
-                    else:
-                        updates = {
-                            "date": pd.to_datetime(row["Date"]).date().isoformat(),
-                            "amount": float(row.get("Amount", 0.0)),
-                            "category": row.get("Category", ""),
-                            "description": row.get("Description", ""),
-                            "type": row.get("Type", "Expense"),
-                        }
-                        update_transaction_by_uuid(txid, updates)
-                st.success("Saved changes")
-                st.rerun()
-            except Exception as e:
-                st.error(str(e))
+        show_transactions_grid(tx_df, accounts, user)
 
         # --- Account summary and visuals ---
         st.markdown("---")
         st.subheader(f"Account Summary for {selected_month}")
-        summary_rows = []
-        debit_opening, credit_opening = 0.0, 0.0
-        total_income_summary, total_spent_summary = 0.0, 0.0
-
-        # Ensure we have the right columns
-        if not tx_df.empty and "Account" in tx_df.columns and "Type" in tx_df.columns:
-            for a in accounts:
-                acc = a["name"]
-                acc_type = a["type"]
-                opening = get_opening(selected_month, a["id"], user["id"])
-                acc_data = tx_df[tx_df["Account"] == acc]
-
-                # Compute totals
-                income = float(acc_data[acc_data["Type"] == "Income"]["Amount"].sum()) if not acc_data.empty else 0.0
-                expense = float(acc_data[acc_data["Type"] == "Expense"]["Amount"].sum()) if not acc_data.empty else 0.0
-
-                if acc_type == "Debit":
-                    remaining = opening + income - expense
-                    debit_opening += opening
-                else:  # Credit
-                    remaining = opening + expense - income
-                    credit_opening += opening
-
-                summary_rows.append({
-                    "Account": acc,
-                    "Type": acc_type,
-                    "Opening Balance": opening,
-                    "Total Incoming (Payments)": income,
-                    "Total Spent": expense,
-                    "Remaining Balance": remaining
-                })
-                total_income_summary += income
-                total_spent_summary += expense
-
-        # Totals
-        total_opening = debit_opening - credit_opening
-        total_remaining = total_opening + total_income_summary - total_spent_summary
         try:
-            summary_df = pd.DataFrame(summary_rows)
-            debit_df = summary_df[summary_df["Type"] == "Debit"]
-            credit_df = summary_df[summary_df["Type"] == "Credit"]
+            openings = data.openings(selected_month)
+            summary = summarize_totals(dashboard.account_totals(), accounts, openings)
+            debit_df = summary.frame("Debit")
+            credit_df = summary.frame("Credit")
 
             # --- Debit section ---
             st.markdown("#### Debit Accounts")
             if not debit_df.empty:
-                st.dataframe(
-                    debit_df[
-                        ["Account", "Type", "Opening Balance", "Total Incoming (Payments)", "Total Spent", "Remaining Balance"]
-                    ],
-                    use_container_width=True,
-                )
+                st.dataframe(debit_df, use_container_width=True)
             else:
                 st.info("No debit accounts configured for this month.")
 
-            total_debit_opening = float(debit_df["Opening Balance"].sum()) if not debit_df.empty else 0.0
-            total_debit_remaining = float(debit_df["Remaining Balance"].sum()) if not debit_df.empty else 0.0
-            total_debit_spent = float(debit_df["Total Spent"].sum()) if not debit_df.empty else 0.0
-            total_debit_incoming = float(debit_df["Total Incoming (Payments)"].sum()) if not debit_df.empty else 0.0
+            total_debit_spent = summary.debit.expense
+            total_debit_remaining = summary.debit.remaining
             st.write(f"**Total Remaining Balance (Debit accounts):** ₹{total_debit_remaining:,.2f}")
 
             # --- Credit section ---
             st.markdown("#### Credit Cards")
             if not credit_df.empty:
-                st.dataframe(
-                    credit_df[
-                        ["Account", "Type", "Opening Balance", "Total Incoming (Payments)", "Total Spent", "Remaining Balance"]
-                    ],
-                    use_container_width=True,
-                )
+                st.dataframe(credit_df, use_container_width=True)
             else:
                 st.info("No credit accounts configured for this month.")
 
-            total_credit_opening = float(credit_df["Opening Balance"].sum()) if not credit_df.empty else 0.0
-            total_credit_remaining = float(credit_df["Remaining Balance"].sum()) if not credit_df.empty else 0.0
-            total_credit_spent = float(credit_df["Total Spent"].sum()) if not credit_df.empty else 0.0
-            total_credit_incoming = float(credit_df["Total Incoming (Payments)"].sum()) if not credit_df.empty else 0.0
+            total_credit_spent = summary.credit.expense
+            total_credit_remaining = summary.credit.remaining
             st.write(f"**Total Spent (Credit accounts):** ₹{total_credit_spent:,.2f}")
 
             # --- Overall Totals ---
+            total_remaining = summary.overall.remaining
             st.markdown(f"#### Total (All Accounts) for {selected_month}")
-            total_row = pd.DataFrame([
-                {
-                    "Account": "Total (All Accounts)",
-                    "Opening Balance": total_opening,
-                    "Total Spent": total_spent_summary,
-                    "Total Incoming (Payments)": total_income_summary,
-                    "Remaining Balance": total_remaining,
-                },
-                {
-                    "Account": "Debit Summary",
-                    "Opening Balance": total_debit_opening,
-                    "Total Spent": total_debit_spent,
-                    "Total Incoming (Payments)": total_debit_incoming,
-                    "Remaining Balance": total_debit_remaining,
-                },
-                {
-                    "Account": "Credit Summary",
-                    "Opening Balance": total_credit_opening,
-                    "Total Spent": total_credit_spent,
-                    "Total Incoming (Payments)": total_credit_incoming,
-                    "Remaining Balance": total_credit_remaining,
-                },
-            ])
-            st.dataframe(total_row, use_container_width=True)
+            st.dataframe(summary.totals_frame(), use_container_width=True)
 
             # --- Top-line balance display ---
             with metrics_bar:
@@ -262,11 +266,11 @@ def show_transactions_view(user):
     st.markdown("---")
     st.subheader("Monthly Metrics")
 
-    if not tx_df.empty and "Type" in tx_df.columns:
-        total_income = tx_df[tx_df["Type"] == "Income"]["Amount"].sum()
-        total_expense = tx_df[tx_df["Type"] == "Expense"]["Amount"].sum()
+    if not tx_df.empty and not dashboard.empty:
+        total_income = dashboard.total("Income")
+        total_expense = dashboard.total("Expense")
         net_flow = total_income - total_expense
-        total_transactions = int(tx_df.shape[0])
+        total_transactions = dashboard.count
         col_metrics1, col_metrics2, col_metrics3, col_metrics4 = st.columns(4)
         with col_metrics1:
             st.metric("Total Debit Spending", f'₹{total_debit_spent:,.2f}')
@@ -284,9 +288,6 @@ def show_transactions_view(user):
     else:
         st.info("No transaction data to display monthly metrics.")
 
-    import plotly.express as px
-    import plotly.graph_objects as go
-
     # ------------------------------------
     # --- 📊 INTERACTIVE VISUAL INSIGHTS ---
     # ------------------------------------
@@ -294,137 +295,6 @@ def show_transactions_view(user):
     st.subheader(f"📈 Visual Insights for {selected_month}")
 
     if not tx_df.empty:
-        # --- 1️⃣ Daily Expenses Trend (Line Chart) ---
-        st.markdown("#### Daily Expenses Trend")
-        daily_expenses = (
-            tx_df[tx_df["Type"] == "Expense"]
-            .groupby("Date")["Amount"]
-            .sum()
-            .reset_index()
-            .sort_values("Date")
-        )
-        if not daily_expenses.empty:
-            fig1 = px.line(
-                daily_expenses,
-                x="Date",
-                y="Amount",
-                title=f"Daily Expenses - {selected_month}",
-                markers=True,
-                labels={"Amount": "Amount (₹)", "Date": "Date"},
-            )
-            fig1.update_traces(line=dict(width=3))
-            fig1.update_layout(hovermode="x unified", xaxis_title=None)
-            st.plotly_chart(fig1, use_container_width=True)
-        else:
-            st.info("No expenses recorded for this month.")
-
-        # --- 2️⃣ Category-wise Spending (Pie Chart) ---
-        st.markdown("#### Category-wise Spending Distribution")
-        category_spend = (
-            tx_df[tx_df["Type"] == "Expense"]
-            .groupby("Category")["Amount"]
-            .sum()
-            .reset_index()
-            .sort_values("Amount", ascending=False)
-        )
-        if not category_spend.empty:
-            fig2 = px.pie(
-                category_spend,
-                names="Category",
-                values="Amount",
-                hole=0.4,
-                color_discrete_sequence=px.colors.qualitative.Pastel,
-                title="Spending by Category",
-            )
-            fig2.update_traces(textinfo="percent+label", pull=[0.05] * len(category_spend))
-            st.plotly_chart(fig2, use_container_width=True)
-        else:
-            st.info("No category data available for expenses.")
-
-        # --- 3️⃣ Account-wise Income vs Expense (Grouped Bar) ---
-        st.markdown("#### Income vs Expense by Account")
-
-        account_summary = (
-            tx_df.groupby(["Account", "Type"])["Amount"]
-            .sum()
-            .reset_index()
-            .pivot(index="Account", columns="Type", values="Amount")
-            .fillna(0)
-            .reset_index()
-        )
-
-        # ✅ Ensure both Income & Expense columns exist
-        for col in ["Income", "Expense"]:
-            if col not in account_summary.columns:
-                account_summary[col] = 0.0
-
-        if not account_summary.empty:
-            melted = account_summary.melt(
-                id_vars="Account",
-                value_vars=["Income", "Expense"],
-                var_name="Type",
-                value_name="Amount",
-            )
-
-            fig3 = px.bar(
-                melted,
-                x="Account",
-                y="Amount",
-                color="Type",
-                barmode="group",
-                text_auto=".2s",
-                title="Income vs Expense per Account",
-                labels={"Amount": "Amount (₹)", "Account": "Account"},
-                color_discrete_map={"Expense": "#EF553B", "Income": "#00CC96"},
-            )
-            fig3.update_layout(hovermode="x unified")
-            st.plotly_chart(fig3, use_container_width=True)
-        else:
-            st.info("No account data available for income/expense comparison.")
-
-
-        # --- Cumulative Spending Over Time (Line) ---
-        st.markdown("#### Cumulative Spending Over the Month")
-        if not daily_expenses.empty:
-            daily_expenses["Cumulative"] = daily_expenses["Amount"].cumsum()
-            fig4 = px.line(
-                daily_expenses,
-                x="Date",
-                y="Cumulative",
-                title="Cumulative Expenses Over the Month",
-                markers=True,
-                labels={"Cumulative": "Cumulative Spent (₹)"},
-            )
-            fig4.update_traces(line_color="#EF553B", line_width=3)
-            fig4.update_layout(hovermode="x unified")
-            st.plotly_chart(fig4, use_container_width=True)
-
-        st.markdown("### Financial Flow Overview")
-
-        categories = ["Total Income", "Total Expenses", "Net Flow"]
-        values = [total_income, total_expense, net_flow]
-
-        fig = go.Figure(
-            data=[
-                go.Bar(
-                    x=categories,
-                    y=values,
-                    text=[f"₹{v:,.2f}" for v in values],
-                    textposition="auto",
-                    marker_color=["#2E86C1", "#EF553B", "#58D68D"],
-                )
-            ]
-        )
-
-        fig.update_layout(
-            height=350,
-            title="Income vs Expenses vs Net Flow",
-            yaxis_title="Amount (₹)",
-            xaxis_title="Category",
-            margin=dict(t=50, b=30),
-        )
-
-        st.plotly_chart(fig, use_container_width=True)
-
+        show_visual_insights(dashboard, selected_month, user["id"])
     else:
         st.info("No data available to show visualizations.")